@@ -1,5 +1,5 @@
 # app/routes/__init__.py
-from . import auth_router, book_router, tag_router
+from . import auth_router, book_router, tag_router, job_router, upload_router, profile_router, metrics_router
 
 
-__all__ = ["auth_router", "book_router", "tag_router", ]
\ No newline at end of file
+__all__ = ["auth_router", "book_router", "tag_router", "job_router", "upload_router", "profile_router", "metrics_router", ]
\ No newline at end of file
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from app.schemas.audio_schema import Audio_Create, Audio_View
-from app.repositories.audio_repo import Audio_Repo
+from app.repositories.audio_repo import Audio_Repo, AsyncAudioRepo
 from app.models.audio import Audio
-from app.models.tag import Tag
-from app.database import get_db
-import os, shutil, uuid, asyncio
-from typing import Optional
+from app.database import get_async_db, get_db
+from app.dependencies.pagination import PageParams
+from app.repositories.tag_repo import TagRepo
+from app.schemas.page_schema import Page
+from app.services.blob_store import BlobStore
+from app.services.stream_service import StreamService
+import asyncio
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
 
 router = APIRouter(prefix="/audio", tags=["audio"])
 ALLOWED_AUDIO = {"mp3", "mp4", "wav", "ogg", "m4a", "aac", "flac"}
+AUDIO_DIR = Path("uploads") / "audio"
 
 def validate_audio(filename: str):
     ext = filename.rsplit(".", 1)[-1].lower()
@@ -26,25 +32,15 @@ def _build_audio_view(a: Audio) -> Audio_View:
         tags=[{"id": t.id, "name": t.name} for t in (a.tags or [])]
     )
 
-@router.get("/", response_model=list[Audio_View])
-def get_audio(db: Session = Depends(get_db)):
-    tracks = db.query(Audio).options(joinedload(Audio.tags)).filter(Audio.deleted_at == None).all()
-    return [_build_audio_view(a) for a in tracks]
-
-@router.post("/upload", response_model=Audio_View)
-async def upload_audio(
-    file: UploadFile = File(...),
-    tags: str = Form(""),
-    db: Session = Depends(get_db)
-):
-    validate_audio(file.filename)
-    upload_directory = "uploads/audio"
-    os.makedirs(upload_directory, exist_ok=True)
-    file_location = f"{upload_directory}/{uuid.uuid4()}_{file.filename}"
-    with open(file_location, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+def save_audio_upload(db: Session, fileobj: BinaryIO, filename: str, tags: str = "") -> Audio:
+    """Store an uploaded audio file and create its row. Blocking; async routes run it in a thread."""
+    # Identical uploads share one stored file
+    content_hash, relative_path = BlobStore(db, "audio", AUDIO_DIR).save_fileobj(
+        fileobj, filename.rsplit(".", 1)[-1]
+    )
+    file_location = str(AUDIO_DIR / relative_path)
 
-    title = file.filename.rsplit(".", 1)[0]
+    title = filename.rsplit(".", 1)[0]
     repo = Audio_Repo(db)
     
     tag_names = [t.strip() for t in tags.split(",") if t.strip()] if tags.strip() else []
@@ -53,81 +49,69 @@ async def upload_audio(
         title=title,
         description=None,
         file_path=file_location,
+        content_hash=content_hash,
     ))
     
-    for tag_name in tag_names:
-        tag = db.query(Tag).filter(Tag.name.ilike(tag_name)).first()
-        if not tag:
-            tag = Tag(name=tag_name.strip().lower())
-            db.add(tag)
-            db.flush()
-        if tag not in audio_db.tags:
-            audio_db.tags.append(tag)
+    audio_db.tags = TagRepo(db).get_or_create_tags(tag_names)
     db.commit()
     db.refresh(audio_db)
-    
-    return _build_audio_view(audio_db)
+    return audio_db
+
+def _save_audio_view(db: Session, file: UploadFile, tags: str = "") -> Audio_View:
+    # Built here so the tags are loaded in the same worker thread
+    return _build_audio_view(save_audio_upload(db, file.file, file.filename, tags))
+
+@router.get("/", response_model=Union[list[Audio_View], Page[Audio_View]])
+async def get_audio(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    tracks = await AsyncAudioRepo(db).list_audio(page.after_id, page.fetch_limit)
+    return page.respond(page.paginate(tracks, _build_audio_view), response)
+
+@router.post("/upload", response_model=Audio_View)
+async def upload_audio(
+    file: UploadFile = File(...),
+    tags: str = Form(""),
+    db: Session = Depends(get_db)
+):
+    validate_audio(file.filename)
+    return await asyncio.to_thread(_save_audio_view, db, file, tags)
 
 @router.post("/upload_multiple", response_model=list[Audio_View])
 async def upload_multiple(
     files: list[UploadFile] = File(...),
     db: Session = Depends(get_db)
 ):
-    upload_directory = "uploads/audio"
-    os.makedirs(upload_directory, exist_ok=True)
-    repo = Audio_Repo(db)
     results = []
     for file in files:
         validate_audio(file.filename)
-        file_location = f"{upload_directory}/{uuid.uuid4()}_{file.filename}"
-        with open(file_location, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        title = file.filename.rsplit(".", 1)[0]
-        audio_db = repo.create_audio(Audio_Create(
-            title=title, description=None, file_path=file_location
-        ))
-        db.refresh(audio_db)
-        results.append(_build_audio_view(audio_db))
+        results.append(await asyncio.to_thread(_save_audio_view, db, file))
     return results
 
 @router.patch("/{audio_id}", response_model=Audio_View)
-def update_audio(
+async def update_audio(
     audio_id: int,
     title: Optional[str] = None,
     description: Optional[str] = None,
     tags: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    audio = db.query(Audio).options(joinedload(Audio.tags)).filter(Audio.id == audio_id).first()
+    repo = AsyncAudioRepo(db)
+    audio = await repo.get_audio(audio_id)
     if not audio:
         raise HTTPException(status_code=404, detail="Audio not found")
-    if title is not None:
-        audio.title = title
-    if description is not None:
-        audio.description = description
-    if tags is not None:
-        tag_names = [t.strip() for t in tags.split(",") if t.strip()]
-        audio.tags.clear()
-        for tag_name in tag_names:
-            tag = db.query(Tag).filter(Tag.name.ilike(tag_name)).first()
-            if not tag:
-                tag = Tag(name=tag_name.strip().lower())
-                db.add(tag)
-                db.flush()
-            audio.tags.append(tag)
-    db.commit()
-    db.refresh(audio)
+    tag_names = [t.strip() for t in tags.split(",") if t.strip()] if tags is not None else None
+    audio = await repo.update_audio(audio, title, description, tag_names)
     return _build_audio_view(audio)
 
 @router.delete("/{audio_id}")
-def delete_audio(audio_id: int, db: Session = Depends(get_db)):
-    from app.repositories.audio_repo import Audio_Repo
-    repo = Audio_Repo(db)
-    return repo.delete_audio(audio_id)
+async def delete_audio(audio_id: int, db: AsyncSession = Depends(get_async_db)):
+    audio = await AsyncAudioRepo(db).delete_audio(audio_id)
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return audio
 
 
 @router.get("/stream/{audio_id}")
-def stream_audio(audio_id: int, db: Session = Depends(get_db)):
+def stream_audio(audio_id: int, request: Request, db: Session = Depends(get_db)):
     audio = db.query(Audio).filter(Audio.id == audio_id).first()
     if not audio:
         raise HTTPException(status_code=404, detail="Audio not found")
@@ -137,11 +121,7 @@ def stream_audio(audio_id: int, db: Session = Depends(get_db)):
         "ogg": "audio/ogg", "m4a": "audio/mp4", "aac": "audio/aac", "flac": "audio/flac"
     }
     media_type = media_types.get(ext, "audio/mpeg")
-    def iterfile():
-        with open(audio.file_path, "rb") as f:
-            while True:
-                chunk = f.read(1024 * 1024)
-                if not chunk:
-                    break
-                yield chunk
-    return StreamingResponse(iterfile(), media_type=media_type)
\ No newline at end of file
+    file_path = Path(audio.file_path)
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    return StreamService.file_response(request, file_path, media_type=media_type)
\ No newline at end of file
@@ -2,11 +2,13 @@ import random
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.schemas.auth_schema import Token, LoginRequest, SignUpRequest, ResetPasswordRequest, ChangePasswordRequest
+from app.schemas.auth_schema import Token, LoginRequest, SignUpRequest, ResetPasswordRequest, ChangePasswordRequest, Principal, HashOperationStats
 from app.services.auth_service import AuthService
 from app.models.account import Account
 from app.models.role import Role
 from app.dependencies.auth import get_current_user, RoleChecker
+from app.services.password_hasher import password_hasher
+from app.services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -31,12 +33,13 @@ def make_admin(username: str, db: Session = Depends(get_db)):
     if admin_role not in user.roles:
         user.roles.append(admin_role)
         db.commit()
+        principal_cache.invalidate(user.id)
     return {"message": f"{username} is now admin"}
 
 
 @router.post("/token", response_model=Token, status_code=status.HTTP_200_OK)
 async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = AuthService.authenticate_user(db, login_data.username, login_data.password)
+    user = await AuthService.authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
     access_token = AuthService.create_token_for_user(user)
@@ -48,15 +51,12 @@ async def signup(signup_data: SignUpRequest, db: Session = Depends(get_db)):
     existing = AuthService.get_user_by_username(db, signup_data.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already registered")
+    recovery_code = str(random.randint(100000, 999999))
     try:
-        user = AuthService.create_user(db, signup_data)
+        user = await AuthService.create_user(db, signup_data, recovery_code=recovery_code)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    recovery_code = str(random.randint(100000, 999999))
-    user.recovery_code_hash = AuthService.get_password_hash(recovery_code)
-    db.commit()
-
     access_token = AuthService.create_token_for_user(user)
     return {
         "access_token": access_token,
@@ -80,15 +80,12 @@ async def verify_recovery_code(
         raise HTTPException(status_code=404, detail="User not found")
     if not user.recovery_code_hash:
         raise HTTPException(status_code=400, detail="No recovery code set for this account")
-    if not AuthService.verify_password(otp, user.recovery_code_hash):
+    if not await AuthService.check_recovery_code(db, user, otp):
         raise HTTPException(status_code=400, detail="Invalid recovery code")
 
-    user.hashed_password = AuthService.get_password_hash(new_password)
+    await AuthService.set_password(user, new_password)
     db.commit()
-    db.refresh(user)
-
-    if not AuthService.verify_password(new_password, user.hashed_password):
-        raise HTTPException(status_code=500, detail="Password update failed — try again")
+    principal_cache.invalidate(user.id)
 
     return {"message": "Password reset successfully"}
 
@@ -104,23 +101,36 @@ def admin_exists(db: Session = Depends(get_db)):
 async def reset_password(
     reset_data: ResetPasswordRequest,
     db: Session = Depends(get_db),
-    current_user: Account = Depends(RoleChecker(["admin"]))
+    current_user: Principal = Depends(RoleChecker(["admin"]))
 ):
     try:
-        updated = AuthService.reset_password(db, reset_data.username, reset_data.new_password)
+        updated = await AuthService.reset_password(db, reset_data.username, reset_data.new_password)
         return {"message": f"Password reset for {updated.username}"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.post("/change-password", status_code=status.HTTP_200_OK)
+@router.post("/change-password", response_model=Token, status_code=status.HTTP_200_OK)
 async def change_own_password(
     change_data: ChangePasswordRequest,
     db: Session = Depends(get_db),
-    current_user: Account = Depends(RoleChecker(["admin"]))
+    current_user: Principal = Depends(RoleChecker(["admin"]))
 ):
-    if not AuthService.verify_password(change_data.old_password, current_user.hashed_password):
+    """
+    Change the caller's password. Tokens issued before the change stop working,
+    the caller's included, so the response carries a new one.
+    """
+    account = AuthService.get_user_by_id(db, current_user.id)
+    if not await AuthService.check_password(db, account, change_data.old_password):
         raise HTTPException(status_code=400, detail="Incorrect current password")
-    current_user.hashed_password = AuthService.get_password_hash(change_data.new_password)
+    await AuthService.set_password(account, change_data.new_password)
     db.commit()
-    return {"message": "Password changed successfully"}
\ No newline at end of file
+    principal_cache.invalidate(account.id)
+    access_token = AuthService.create_token_for_user(account)
+    return Token(access_token=access_token, token_type="bearer", username=account.username, roles=[r.name for r in account.roles])
+
+
+@router.get("/stats", response_model=dict[str, HashOperationStats])
+def get_auth_stats(current_user: Principal = Depends(RoleChecker(["admin"]))):
+    """Password hashing and login latencies in this process since startup."""
+    return password_hasher.get_stats()
@@ -1,26 +1,42 @@
 from pathlib import Path
-from typing import Iterator, Optional
+import uuid
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db
+from app.dependencies.auth import RoleChecker
+from app.dependencies.pagination import PageParams
+from app.dependencies.tag_filter import TagFilterParams
+from app.models.book import Book
 from app import settings
 from app.services.book_service import BookService
-from app.repositories.book_repo import BookRepo
-from app.schemas import BookUpload, BookBase
+from app.services.catalog_cache import catalog_cache
+from app.services.conversion_cache import conversion_cache
+from app.services.fitz_pool import FitzPoolBusy
+from app.services.fulltext_service import FullTextService
+from app.services.import_service import BulkImportService
+from app.services.job_service import job_queue
+from app.repositories.job_repo import JobRepo
+from app.services.stream_service import StreamService
+from app.repositories.book_repo import AsyncBookRepo, BookRepo
+from app.schemas import BookUpload, BookBase, BookRead, BookUploadResult, BulkImportStatus, CatalogCacheStats, FullTextResult, Page, Principal
 from app.schemas.tag_schema import TagCreate
 
 router = APIRouter(prefix="/books", tags=["books"])
-BOOK_STREAM_CHUNK_SIZE = 1024 * 256  # 256KB
 
 def get_book_service(db: Session = Depends(get_db)) -> BookService:
     book_repo = BookRepo(db)
     return BookService(book_repo)
 
+def get_async_book_service(db: Session = Depends(get_db), async_db: AsyncSession = Depends(get_async_db)) -> BookService:
+    """BookService for async routes: database reads and writes go through the AsyncSession."""
+    return BookService(BookRepo(db), AsyncBookRepo(async_db))
 
-def _get_book_file_path(db: Session, book_uid: str) -> Path:
+
+def _get_book_file_path(db: Session, book_uid: str) -> tuple[Book, Path]:
     book = BookRepo(db).get_book_by_uid(book_uid)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -32,22 +48,16 @@ def _get_book_file_path(db: Session, book_uid: str) -> Path:
     if not file_path.exists() or not file_path.is_file():
         raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
 
-    return file_path
-
+    return book, file_path
 
-def _iter_file_chunks(file_path: Path, chunk_size: int = BOOK_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
-    with file_path.open("rb") as stream:
-        while chunk := stream.read(chunk_size):
-            yield chunk
 
-@router.post("/upload", response_model=BookBase)
+@router.post("/upload", response_model=BookUploadResult)
 async def upload_new_book(
     title: Optional[str] = Form(None),
     tags: str = Form(""),
     file: UploadFile = File(...),
     book_service: BookService = Depends(get_book_service)
 ):
-    print("router hit")
     try:
         tag_list = []
         if tags.strip():
@@ -61,32 +71,115 @@ async def upload_new_book(
         file=file,
     )
 
-@router.get("/search/", response_model=list[BookBase])
-async def search_books(
+@router.post("/import", response_model=BulkImportStatus, status_code=202)
+async def import_books(
+    source: Optional[str] = Form(None, description="Directory or ZIP file on the server"),
+    tags: str = Form("", description="Comma-separated tags added to every imported book"),
+    archive: Optional[UploadFile] = File(None, description="ZIP of PDF/EPUB files"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(RoleChecker(["admin"]))
+):
+    """Queue a bulk import. Importing the same server source again resumes it."""
+    try:
+        tag_list = [TagCreate(name=t.strip()).name for t in tags.split(",") if t.strip()]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tags format: {str(e)}")
+
+    delete_source = False
+    if archive and archive.filename:
+        # Uploaded archives are staged next to resumable uploads until imported
+        settings.UPLOAD_SESSION_DIR.mkdir(parents=True, exist_ok=True)
+        source_path = settings.UPLOAD_SESSION_DIR / f"import-{uuid.uuid4().hex}.zip"
+        with source_path.open("wb") as buffer:
+            while chunk := await archive.read(1024 * 1024):
+                buffer.write(chunk)
+        delete_source = True
+    elif source:
+        source_path = Path(source)
+        if not source_path.exists():
+            raise HTTPException(status_code=404, detail=f"Import source not found: {source}")
+    else:
+        raise HTTPException(status_code=400, detail="Provide a source path or a ZIP archive")
+
+    manifest_path = BulkImportService.default_manifest_path(source_path)
+    job = job_queue.enqueue(db, "bulk_import", {
+        "source": str(source_path),
+        "manifest": str(manifest_path),
+        "tags": tag_list,
+        "delete_source": delete_source,
+    })
+    return BulkImportStatus(job_id=job.id, status=job.status, manifest=str(manifest_path))
+
+@router.get("/import/{job_id}", response_model=BulkImportStatus)
+def get_import_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(RoleChecker(["admin"]))
+):
+    job = JobRepo(db).get_job(job_id)
+    if not job or job.kind != "bulk_import":
+        raise HTTPException(status_code=404, detail="Import not found")
+
+    manifest_path = Path(job.payload["manifest"])
+    summary = {}
+    if manifest_path.exists():
+        manifest = BulkImportService.load_manifest(manifest_path, Path(job.payload["source"]))
+        summary = manifest.get("summary") or BulkImportService.summarize(manifest, len(manifest["items"]))
+    return BulkImportStatus(
+        job_id=job.id, status=job.status, manifest=str(manifest_path), summary=summary, last_error=job.last_error
+    )
+
+@router.get("/", response_model=Union[list[BookRead], Page[BookRead]])
+def list_books(
+    page: PageParams = Depends(),
+    book_service: BookService = Depends(get_book_service)
+):
+    """All books in upload order. Send limit/cursor for pages; see PageParams."""
+    return page.respond_json(book_service.get_all_books(page))
+
+@router.get("/cache/stats", response_model=CatalogCacheStats)
+def get_catalog_cache_stats():
+    """Hit/miss/eviction counts of the listing and search result cache in this process."""
+    return catalog_cache.get_stats()
+
+@router.get("/search/", response_model=Union[list[BookBase], Page[BookBase]])
+def search_books(
     title: Optional[str] = Query(None, description="Search by book title (case-insensitive, partial match)"),
-    tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
+    tag_filter: TagFilterParams = Depends(),
     file_type: Optional[str] = Query(None, description="Filter by file type (e.g., epub, pdf)"),
     extension: Optional[str] = Query(None, description="Filter by file extension"),
+    page: PageParams = Depends(),
     book_service: BookService = Depends(get_book_service)
 ):
     """
     Dynamic search endpoint for books with multiple optional filters.
     All parameters are optional - if none provided, returns all books.
+    Send limit/cursor for pages; plain calls return at most LEGACY_LIST_LIMIT books.
     """
-    # Parse tags if provided
-    tag_list = None
-    if tags:
-        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-    
-    return book_service.search_books(
+    return page.respond_json(book_service.search_books(
+        page,
         title=title,
-        tags=tag_list,
+        tags=tag_filter.tags,
         file_type=file_type,
-        extension=extension
-    )
+        extension=extension,
+        tag_mode=tag_filter.tag_mode,
+        exclude_tags=tag_filter.exclude_tags
+    ))
+
+@router.get("/search/fulltext", response_model=list[FullTextResult])
+def search_books_fulltext(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in book contents"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of books returned"),
+    db: Session = Depends(get_db)
+):
+    """
+    Search inside book contents. Books are ranked by their best matching page and
+    come with the page numbers and highlighted snippets of their top matches.
+    """
+    return FullTextService.search(db, q, limit)
 
 @router.get("/{book_uid}/epub")
-def serve_epub(book_uid: str, db: Session = Depends(get_db)):
+def serve_epub(book_uid: str, request: Request, db: Session = Depends(get_db)):
     book = BookRepo(db).get_book_by_uid(book_uid)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -95,18 +188,20 @@ def serve_epub(book_uid: str, db: Session = Depends(get_db)):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        path=str(file_path),
+    return StreamService.file_response(
+        request,
+        file_path,
         media_type="application/epub+zip",
-        headers={"Content-Disposition": f'inline; filename="{book.file_path}"'}
+        filename=BookService.download_name(book),
     )
 
 @router.get("/{book_uid}/stream")
-async def stream_book(
+def stream_book(
     book_uid: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    file_path = _get_book_file_path(db, book_uid)
+    book, file_path = _get_book_file_path(db, book_uid)
     extension = file_path.suffix.lower().lstrip(".")
 
     media_types = {
@@ -115,22 +210,20 @@ async def stream_book(
     }
     media_type = media_types.get(extension, "application/octet-stream")
 
-    return StreamingResponse(
-        _iter_file_chunks(file_path),
+    return StreamService.file_response(
+        request,
+        file_path,
         media_type=media_type,
-        headers={
-            "Content-Disposition": f'inline; filename="{file_path.name}"',
-            "Content-Length": str(file_path.stat().st_size),
-        },
+        filename=BookService.download_name(book),
     )
 
 @router.get("/{book_uid}", response_model=BookBase)
 async def get_book_details(
     book_uid: str,
-    book_service: BookService = Depends(get_book_service)
+    book_service: BookService = Depends(get_async_book_service)
 ):
     """Get book details by UID."""
-    book = book_service.get_book_by_uid(book_uid)
+    book = await book_service.get_book_by_uid_async(book_uid)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
@@ -141,7 +234,7 @@ async def update_book(
     title: Optional[str] = Form(None),
     tags: str = Form(""),
     cover: Optional[UploadFile] = File(None),
-    book_service: BookService = Depends(get_book_service)
+    book_service: BookService = Depends(get_async_book_service)
 ):
     """Teacher endpoint to update book metadata and optional cover."""
     # Convert tags_json string back to list for the schema
@@ -160,43 +253,45 @@ async def update_book(
 @router.delete("/{book_uid}", status_code=204)
 async def delete_book(
     book_uid: str,
-    book_service: BookService = Depends(get_book_service)
+    book_service: BookService = Depends(get_async_book_service)
 ):
     """Teacher endpoint to delete a book by UID."""
     try:
-        book_service.delete_book(book_uid)
+        await book_service.delete_book(book_uid)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     return
 
 @router.get("/{book_uid}/read")
-def read_book(book_uid: str, db: Session = Depends(get_db)):
+def read_book(book_uid: str, request: Request, db: Session = Depends(get_db)):
     book = BookRepo(db).get_book_by_uid(book_uid)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
     if book.extension == "epub":
-        # Look for the converted PDF
-        pdf_name = book.file_path.rsplit(".", 1)[0] + ".pdf"
-        file_path = settings.UPLOAD_DIR / pdf_name
+        epub_path = settings.UPLOAD_DIR / book.file_path
+        # PDFs converted at upload by older versions sit next to the EPUB
+        file_path = epub_path.with_suffix(".pdf")
         if not file_path.exists():
-            raise HTTPException(status_code=404, detail=f"Converted PDF not found — try re-uploading the EPUB")
+            if not epub_path.exists():
+                raise HTTPException(status_code=404, detail=f"File not found at {epub_path}")
+            try:
+                file_path = conversion_cache.get_pdf(BookService.conversion_key(book), epub_path)
+            except (FitzPoolBusy, TimeoutError):
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy converting books, try again shortly",
+                    headers={"Retry-After": "10"},
+                )
+            except RuntimeError as e:
+                raise HTTPException(status_code=500, detail=str(e))
     else:
         file_path = settings.UPLOAD_DIR / book.file_path
 
     if not file_path.exists():
         raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
 
-    def iterfile():
-        with open(file_path, "rb") as f:
-            while chunk := f.read(1024 * 1024):
-                yield chunk
-
-    return StreamingResponse(
-        iterfile(),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "inline"}
-    )
+    return StreamService.file_response(request, file_path, media_type="application/pdf")
 
 
 
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.repositories.job_repo import JobRepo
+from app.schemas.job_schema import JobRead, JobQueueStats
+from app.services.job_service import job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/stats", response_model=JobQueueStats)
+def get_job_stats(db: Session = Depends(get_db)):
+    return JobQueueStats(queue=JobRepo(db).count_by_status(), kinds=job_queue.get_stats())
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = JobRepo(db).get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.services.metrics import CONTENT_TYPE, registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=Response)
+def get_metrics():
+    """Prometheus text format: request latency, upload phases, PyMuPDF jobs, streams, pool waits and caches."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
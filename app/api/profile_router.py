@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.dependencies.auth import RoleChecker
+from app.schemas.auth_schema import Principal
+from app.schemas.profile_schema import RequestProfileRead
+from app.services.request_profiler import request_profiler
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+@router.get("/", response_model=list[RequestProfileRead])
+def list_profiles(current_user: Principal = Depends(RoleChecker(["admin"]))):
+    """Profiles of recent ?profile=1 requests made by admins, newest first."""
+    return list(request_profiler.recent)
+
+
+@router.get("/{profile_id}", response_model=RequestProfileRead)
+def get_profile(profile_id: str, current_user: Principal = Depends(RoleChecker(["admin"]))):
+    """One stored profile; its id is the X-Request-ID of the profiled response."""
+    profile = request_profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
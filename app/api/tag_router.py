@@ -1,12 +1,44 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.repositories.tag_repo import TagRepo
-from app.schemas.tag_schema import TagRead
-from typing import List
+from app.database import get_async_db, get_db
+from app.dependencies.auth import RoleChecker
+from app.dependencies.pagination import PageParams
+from app.dependencies.tag_filter import TagFilterParams
+from app.repositories.tag_repo import AsyncTagRepo
+from app.schemas.auth_schema import Principal
+from app.schemas.job_schema import JobRead
+from app.schemas.page_schema import Page
+from app.schemas.tag_schema import TagRead, TagFacet, TagFacets
+from app.services.tag_index import tag_index
+from app.services.tag_service import TagService
+from typing import List, Optional, Union
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
-@router.get("/", response_model=List[TagRead])
-def get_all_tags(db: Session = Depends(get_db)):
-    return TagRepo(db).get_all_tags()
\ No newline at end of file
+@router.get("/", response_model=Union[List[TagRead], Page[TagRead]])
+async def get_all_tags(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    tags = await AsyncTagRepo(db).get_all_tags(after_id=page.after_id, limit=page.fetch_limit)
+    return page.respond(page.paginate(tags, TagRead.model_validate), response)
+
+@router.get("/facets", response_model=TagFacets)
+def get_tag_facets(
+    tag_filter: TagFilterParams = Depends(),
+    top: Optional[int] = Query(None, ge=1, le=1000, description="Only the most common tags"),
+    db: Session = Depends(get_db)
+):
+    """
+    Book counts per tag among the books matching the tag filter (all books
+    without one), most common first. Served from the in-memory tag index.
+    """
+    tag_index.ensure_fresh(db)
+    matches = tag_index.filter(tag_filter.tags, tag_filter.tag_mode, tag_filter.exclude_tags)
+    counts = sorted(tag_index.facets(matches).items(), key=lambda item: (-item[1], item[0]))
+    if top:
+        counts = counts[:top]
+    return TagFacets(total=matches.bit_count(), facets=[TagFacet(name=name, count=count) for name, count in counts])
+
+@router.post("/gc", response_model=JobRead, status_code=202)
+def collect_unused_tags(db: Session = Depends(get_db), current_user: Principal = Depends(RoleChecker(["admin"]))):
+    """Queue a job deleting every tag that no book, audio or video uses."""
+    return TagService.schedule_sweep(db)
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models.upload_session import UploadSession
+from app.schemas import BookUploadResult
+from app.schemas.upload_schema import UploadSessionCreate, UploadSessionRead
+from app.schemas.video_schema import Video_View
+from app.services.upload_service import UploadService
+from app.services.video_service import build_video_view
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+TUS_VERSION = "1.0.0"
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def get_upload_service(db: Session = Depends(get_db)) -> UploadService:
+    return UploadService(db)
+
+
+def _upload_headers(upload: UploadSession) -> dict[str, str]:
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.size),
+        "Upload-Expires": upload.expires_at.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/", status_code=201, response_model=UploadSessionRead)
+def create_upload(
+    data: UploadSessionCreate,
+    response: Response,
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Start a resumable book or video upload. Send the bytes with PATCH to the returned Location."""
+    upload = upload_service.create_session(data)
+    response.headers.update(_upload_headers(upload))
+    response.headers["Location"] = f"{router.prefix}/{upload.id}"
+    return upload
+
+
+@router.head("/{upload_id}")
+def get_upload_offset(upload_id: str, upload_service: UploadService = Depends(get_upload_service)):
+    """Report how many bytes have been received, so a client can resume after a dropped connection."""
+    upload = upload_service.get_session(upload_id)
+    return Response(status_code=200, headers=_upload_headers(upload))
+
+
+@router.get("/{upload_id}", response_model=UploadSessionRead)
+def get_upload(upload_id: str, upload_service: UploadService = Depends(get_upload_service)):
+    return upload_service.get_session(upload_id)
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    upload_service: UploadService = Depends(get_upload_service)
+):
+    """Append the request body at Upload-Offset, which must match the current offset."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type != CHUNK_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {CHUNK_CONTENT_TYPE}")
+
+    upload = await upload_service.append_chunk(upload_id, upload_offset, request.stream())
+    return Response(status_code=204, headers=_upload_headers(upload))
+
+
+@router.post("/{upload_id}/finalize", response_model=Union[BookUploadResult, Video_View])
+async def finalize_upload(upload_id: str, upload_service: UploadService = Depends(get_upload_service)):
+    """Validate and store a completed upload, exactly as the direct upload endpoints do."""
+    result = await upload_service.finalize(upload_id)
+    if isinstance(result, BookUploadResult):
+        return result
+    # Loading the tags is a blocking query
+    return await asyncio.to_thread(build_video_view, result)
+
+
+@router.delete("/{upload_id}", status_code=204)
+def abort_upload(upload_id: str, upload_service: UploadService = Depends(get_upload_service)):
+    upload_service.abort(upload_id)
@@ -1,31 +1,30 @@
-from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException
-from app.schemas.video_schema import Video_Create, Video_View
-from app.repositories.video_repo import Video_Repo
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, File, UploadFile, Form, Depends, HTTPException, Request, Response
+from app.schemas.video_schema import Video_View
+from app.repositories.video_repo import AsyncVideoRepo
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from app.models.video import Video
-from app.models.tag import Tag
-import os, shutil, uuid, asyncio, mimetypes
-from fastapi.responses import StreamingResponse
-from app.database import get_db
+import asyncio, mimetypes
+from app.database import get_async_db, get_db
+from app.dependencies.pagination import PageParams
+from app.schemas.page_schema import Page
+from app.services.stream_service import StreamService
+from app.services.video_service import build_video_view, save_video_upload
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 router = APIRouter(prefix="/videos", tags=["videos"])
-VIDS_DIR = Path("uploads") / "vids"
 
-def _build_video_view(v: Video) -> Video_View:
-    return Video_View(
-        id=v.id,
-        title=v.title,
-        description=v.description,
-        video_url=f"/videos/stream/{v.id}",
-        tags=[{"id": t.id, "name": t.name} for t in (v.tags or [])]
-    )
+def _save_video_view(
+    db: Session, file: UploadFile, title: str, description: Optional[str], tags: str = ""
+) -> Video_View:
+    # Built here so the tags are loaded in the same worker thread
+    return build_video_view(save_video_upload(db, file.file, file.filename, title, description, tags))
 
-@router.get("/", response_model=list[Video_View])
-def get_videos(db: Session = Depends(get_db)):
-    videos = db.query(Video).options(joinedload(Video.tags)).filter(Video.deleted_at == None).all()
-    return [_build_video_view(v) for v in videos]
+@router.get("/", response_model=Union[list[Video_View], Page[Video_View]])
+async def get_videos(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    videos = await AsyncVideoRepo(db).list_videos(page.after_id, page.fetch_limit)
+    return page.respond(page.paginate(videos, build_video_view), response)
 
 @router.post("/upload", response_model=Video_View)
 async def upload_file(
@@ -35,86 +34,43 @@ async def upload_file(
     tags: str = Form(""),
     db: Session = Depends(get_db)
 ):
-    VIDS_DIR.mkdir(parents=True, exist_ok=True)
-    file_location = VIDS_DIR / f"{uuid.uuid4()}_{file.filename}"
-    with open(file_location, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-
-    repo = Video_Repo(db)
-    video_db = repo.create_video(Video_Create(
-        title=title, description=description, file_path=str(file_location)
-    ))
-
-    tag_names = [t.strip() for t in tags.split(",") if t.strip()] if tags.strip() else []
-    for tag_name in tag_names:
-        tag = db.query(Tag).filter(Tag.name.ilike(tag_name)).first()
-        if not tag:
-            tag = Tag(name=tag_name.strip().lower())
-            db.add(tag)
-            db.flush()
-        if tag not in video_db.tags:
-            video_db.tags.append(tag)
-    db.commit()
-    db.refresh(video_db)
-    return _build_video_view(video_db)
+    return await asyncio.to_thread(_save_video_view, db, file, title, description, tags)
 
 @router.post("/upload_multiple", response_model=list[Video_View])
 async def upload_multiple(
     files: list[UploadFile] = File(...),
     db: Session = Depends(get_db)
 ):
-    VIDS_DIR.mkdir(parents=True, exist_ok=True)
-    repo = Video_Repo(db)
     results = []
     for file in files:
-        file_location = VIDS_DIR / f"{uuid.uuid4()}_{file.filename}"
-        with open(file_location, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        video_db = repo.create_video(Video_Create(
-            title=file.filename.rsplit(".", 1)[0],
-            description=None,
-            file_path=str(file_location)
-        ))
-        db.refresh(video_db)
-        results.append(_build_video_view(video_db))
+        results.append(await asyncio.to_thread(_save_video_view, db, file, file.filename.rsplit(".", 1)[0], None))
     return results
 
 @router.patch("/{video_id}", response_model=Video_View)
-def update_video(
+async def update_video(
     video_id: int,
     title: Optional[str] = None,
     description: Optional[str] = None,
     tags: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    video = db.query(Video).options(joinedload(Video.tags)).filter(Video.id == video_id).first()
+    repo = AsyncVideoRepo(db)
+    video = await repo.get_video(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-    if title is not None:
-        video.title = title
-    if description is not None:
-        video.description = description
-    if tags is not None:
-        tag_names = [t.strip() for t in tags.split(",") if t.strip()]
-        video.tags.clear()
-        for tag_name in tag_names:
-            tag = db.query(Tag).filter(Tag.name.ilike(tag_name)).first()
-            if not tag:
-                tag = Tag(name=tag_name.strip().lower())
-                db.add(tag)
-                db.flush()
-            video.tags.append(tag)
-    db.commit()
-    db.refresh(video)
-    return _build_video_view(video)
+    tag_names = [t.strip() for t in tags.split(",") if t.strip()] if tags is not None else None
+    video = await repo.update_video(video, title, description, tag_names)
+    return build_video_view(video)
 
 @router.delete("/{video_id}")
-def delete_video(video_id: int, db: Session = Depends(get_db)):
-    repo = Video_Repo(db)
-    return repo.delete_video(video_id)
+async def delete_video(video_id: int, db: AsyncSession = Depends(get_async_db)):
+    video = await AsyncVideoRepo(db).delete_video(video_id)
+    if video is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return video
 
 @router.get("/stream/{video_id}")
-def stream_video(video_id: int, db: Session = Depends(get_db)):
+def stream_video(video_id: int, request: Request, db: Session = Depends(get_db)):
     video = db.query(Video).filter(Video.id == video_id).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
@@ -123,12 +79,7 @@ def stream_video(video_id: int, db: Session = Depends(get_db)):
     if not mime_type:
         mime_type = "application/octet-stream"
 
-    def iterfile():
-        with open(video.file_path, "rb") as f:
-            while True:
-                chunk = f.read(1024 * 1024)
-                if not chunk:
-                    break
-                yield chunk
-
-    return StreamingResponse(iterfile(), media_type=mime_type)
\ No newline at end of file
+    file_path = Path(video.file_path)
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="Video file not found")
+    return StreamService.file_response(request, file_path, media_type=mime_type)
\ No newline at end of file
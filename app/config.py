@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
-from typing import Set
+from typing import Literal, Set
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -12,14 +12,43 @@ class Settings(BaseSettings):
     
     # App settings
     DEBUG: bool = True
+
+    # Logging and profiling settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"  # json: one object per line, with the record's fields
+    LOG_SQL: bool = False  # Log every SQL statement (SQLAlchemy echo); very verbose
+    REQUEST_LOG: bool = True  # One record per request: wall time, DB time and statements, PyMuPDF time, bytes sent
+    SLOW_REQUEST_SECONDS: float = 1.0  # Requests slower than this are logged as warnings
+    PROFILE_MAX_STORED: int = 50  # Detailed profiles of ?profile=1 requests kept for GET /profiles/
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics at GET /metrics
     
     # Database settings
     DATABASE_URL: str = "sqlite:///./data/jirani_library.db"
+
+    # SQLite settings, applied to every connection (ignored for other databases)
+    SQLITE_WAL: bool = True  # Write-ahead log: reads are not blocked while a write commits
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"  # NORMAL with WAL may lose the last commits on power loss, never corrupts
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # How long a write waits for another writer before "database is locked"
+    SQLITE_CACHE_SIZE_MB: int = 16  # Page cache per connection
+    SQLITE_MMAP_SIZE_MB: int = 128  # Reads through memory-mapped I/O, 0 disables
+    SQLITE_POOL_SIZE: int = 8  # Connections kept open; WAL readers run side by side
+    SQLITE_MAINTENANCE_INTERVAL_SECONDS: float = 3600.0  # WAL checkpoint, ANALYZE and optimize, 0 disables
+    SQLITE_ANALYSIS_LIMIT: int = 1000  # Rows ANALYZE samples per index, 0 reads them all
     
     # Security settings
     SECRET_KEY: str = "dev-secret-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # database: roles are read from the account; claims: roles are trusted from the signed token.
+    # Either way the account state auth needs is cached for AUTH_PRINCIPAL_CACHE_TTL_SECONDS.
+    AUTH_MODE: Literal["database", "claims"] = "database"
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0  # Bounds staleness from changes made by other processes, 0 disables
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+
+    # Password hashing settings
+    BCRYPT_ROUNDS: int = 12  # Cost of new hashes (each +1 doubles it); existing hashes keep theirs
+    PASSWORD_HASH_WORKERS: int = 2  # Threads hashing at the same time, 0 runs inline on the event loop
+    PASSWORD_HASH_QUEUE_SIZE: int = 32  # Hashes allowed to wait for a thread; beyond that requests get 503
     
     # CORS settings
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:5173"]
@@ -32,6 +61,69 @@ class Settings(BaseSettings):
     COVER_DIR: Path = BASE_DIR / "uploads" / "covers"
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50MB
     MAX_COVER_SIZE: int = 5 * 1024 * 1024  # 5MB
+    COVER_CACHE_MAX_AGE: int = 365 * 24 * 60 * 60  # 1 year, covers are immutable
+    COVER_WIDTHS: list[int] = [160, 320, 640]  # Pixel widths covers are re-encoded to
+    COVER_QUALITY: int = 80  # JPEG/WebP quality
+    COVER_WEBP: bool = True  # Also write WebP variants (needs Pillow, the webp extra)
+    MAX_VIDEO_UPLOAD_SIZE: int = 4 * 1024 * 1024 * 1024  # 4GB, resumable uploads only
+
+    # Bulk import settings
+    BULK_IMPORT_WORKERS: int = 4  # Files validated/thumbnailed at the same time
+    BULK_IMPORT_BATCH_SIZE: int = 100  # Books inserted per transaction
+    BULK_IMPORT_MANIFEST_DIR: Path = BASE_DIR / "uploads" / "imports"  # Progress files for resuming imports
+
+    # List endpoint settings
+    DEFAULT_PAGE_SIZE: int = 50  # Page size when a cursor is sent without a limit
+    MAX_PAGE_SIZE: int = 200
+    LEGACY_LIST_LIMIT: int = 1000  # Cap for list calls that send neither limit nor cursor
+
+    # Catalog cache settings
+    CATALOG_CACHE_MAX_ENTRIES: int = 512  # Cached listing/search pages, 0 disables the cache
+    CATALOG_CACHE_TTL_SECONDS: float = 60.0  # Bounds staleness from writes by other processes
+
+    # Tag index settings
+    TAG_INDEX_REBUILD_SECONDS: float = 300.0  # Picks up writes from other processes, 0 disables
+    TAG_GC_DEFERRED: bool = False  # Delete unused tags in a background job instead of during the request
+
+    # Full-text search settings
+    FULLTEXT_INDEX: bool = True  # Extract page text at upload/import for /books/search/fulltext
+    FULLTEXT_MAX_RANKED_PAGES: int = 200  # Best matching pages considered per search
+    FULLTEXT_HITS_PER_BOOK: int = 3  # Pages (with snippets) returned for each book
+
+    # Resumable upload settings
+    UPLOAD_SESSION_DIR: Path = BASE_DIR / "uploads" / "partial"
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 60 * 60  # Idle uploads are removed after this
+
+    # File delivery settings
+    # stream: chunked reads in Python (works everywhere)
+    # sendfile: zero-copy os.sendfile via the ASGI zerocopysend extension (not offered by uvicorn), falls back to stream
+    # x-accel / x-sendfile: hand the file to a fronting nginx / Apache server
+    FILE_DELIVERY_BACKEND: Literal["stream", "sendfile", "x-accel", "x-sendfile"] = "stream"
+    X_ACCEL_ROOT: Path = BASE_DIR / "uploads"  # Directory nginx maps to X_ACCEL_PREFIX
+    X_ACCEL_PREFIX: str = "/protected"  # nginx `internal` location
+
+    # Background job settings
+    JOB_WORKERS: int = 2  # Jobs running at the same time
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0  # Doubled after each failed attempt
+    JOB_POLL_INTERVAL_SECONDS: float = 5.0
+    JOB_STALE_AFTER_SECONDS: float = 15 * 60  # Running jobs older than this are requeued
+
+    # PyMuPDF worker pool settings
+    FITZ_WORKERS: int = 4  # Worker processes for rendering/conversion, 0 runs inline
+    FITZ_QUEUE_SIZE: int = 8  # Jobs allowed to wait for a free worker
+    FITZ_ADMISSION_TIMEOUT_SECONDS: float = 2.0  # Wait for a queue slot before FitzPoolBusy (503 on /read)
+    FITZ_JOB_TIMEOUT_SECONDS: float = 300.0
+    FITZ_MAX_TASKS_PER_CHILD: int = 50  # Recycle workers to release leaked memory
+
+    # EPUB to PDF conversion settings
+    # streaming: convert in page batches appended to disk; whole: one convert_to_pdf() call in RAM
+    EPUB_CONVERT_MODE: Literal["streaming", "whole"] = "streaming"
+    EPUB_CONVERT_BATCH_PAGES: int = 50  # Pages held in memory per batch
+    EPUB_CONVERT_MAX_RSS_MB: int = 512  # Batches shrink while the worker is above this, 0 disables
+    EPUB_PRECONVERT: bool = False  # Convert at upload instead of on first read
+    CONVERSION_CACHE_DIR: Path = BASE_DIR / "uploads" / "conversions"
+    CONVERSION_CACHE_MAX_MB: int = 2048  # Disk budget for converted PDFs, 0 disables eviction
 
     @property
     def ALLOWED_EXTENSIONS(self) -> Set[str]:
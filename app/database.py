@@ -1,17 +1,92 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from .config import settings
+from .services.metrics import instrument_pool
 
-# Create engine with proper connection args for PostgreSQL
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before use
-    pool_recycle=300,    # Recycle connections every 5 minutes
-    echo=settings.DEBUG  # Log SQL queries in debug mode
-)
+# Async drivers for the DATABASE_URL backends
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+# Size the -wal file is truncated back to after a checkpoint
+SQLITE_JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def engine_options(database_url: str) -> dict:
+    """create_engine arguments for DATABASE_URL."""
+    url = make_url(database_url)
+    options = {"echo": settings.LOG_SQL}  # Every statement; request timings are in the request log
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_pre_ping=True,  # Verify connections before use
+            pool_recycle=300,    # Recycle connections every 5 minutes
+        )
+    elif not _is_memory_sqlite(url):
+        # A local file: connections never go stale, and each keeps its page cache
+        options.update(pool_size=settings.SQLITE_POOL_SIZE)
+    return options
+
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMAs run on every new SQLite connection, from the SQLITE_* settings."""
+    pragmas = [f"busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}"]
+    if settings.SQLITE_WAL:
+        pragmas.append("journal_mode = WAL")
+    pragmas += [
+        f"synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        f"cache_size = {-settings.SQLITE_CACHE_SIZE_MB * 1024}",  # Negative values are KiB, not pages
+        f"mmap_size = {settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        "temp_store = MEMORY",
+        f"journal_size_limit = {SQLITE_JOURNAL_SIZE_LIMIT}",
+    ]
+    return pragmas
+
+
+def apply_sqlite_profile(engine: Engine) -> None:
+    """Run sqlite_pragmas on each connection the engine opens; other databases are left as they are."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in sqlite_pragmas():
+                cursor.execute(f"PRAGMA {pragma}")
+        finally:
+            cursor.close()
+
+
+# Pool and connection settings depend on the backend, see engine_options
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+apply_sqlite_profile(engine)
+instrument_pool(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with the async driver for its backend (aiosqlite, asyncpg)."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver:
+        url = url.set(drivername=driver)
+    return url.render_as_string(hide_password=False)
+
+
+# Used by async endpoints, so queries are awaited instead of blocking the event loop
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL), **engine_options(settings.DATABASE_URL)
+)
+apply_sqlite_profile(async_engine.sync_engine)
+instrument_pool(async_engine.sync_engine, "async")
+
+# Attributes are not expired on commit: an async session cannot lazy-load them afterwards
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -20,3 +95,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,50 +1,86 @@
 # app/dependencies/auth.py
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.config import settings
 from app.database import get_db
 from app.models.account import Account
+from app.schemas.auth_schema import Principal
 from app.services.auth_service import AuthService
 
 security = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Account:
-
-    token = credentials.credentials  
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="couldn't validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+def resolve_principal(db: Session, token: str) -> Optional[Principal]:
+    """
+    The principal a bearer token stands for, or None when the token is
+    invalid, revoked or belongs to an inactive account. The account state
+    comes from the principal cache, so most calls do not touch the database.
+    In the "claims" AUTH_MODE the roles are taken from the signed token
+    instead of the account.
+    """
     try:
-    
         payload = jwt.decode(
             token, 
             settings.SECRET_KEY, 
             algorithms=[settings.ALGORITHM]
         )
-        username: str = payload.get("sub")  
-        
-        if username is None:
-            raise credentials_exception
-            
     except JWTError:
-        raise credentials_exception
+        return None
+
+    account_id = payload.get("user_id")
+    if payload.get("sub") is None or not isinstance(account_id, int):
+        return None
+
+    principal = AuthService.get_principal(db, account_id)
+    
+    if principal is None or not principal.is_active:
+        return None
+
+    # Tokens issued before the last password change are revoked
+    if principal.password_changed_at is not None:
+        issued_at = payload.get("iat")
+        if not isinstance(issued_at, int) or issued_at < principal.password_changed_at:
+            return None
+
+    if settings.AUTH_MODE == "claims":
+        return principal.model_copy(update={"roles": list(payload.get("roles") or [])})
+    return principal
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Validate the bearer token; see resolve_principal. A plain def, so FastAPI
+    runs it in the threadpool: a principal cache miss queries the database.
+    """
+    principal = resolve_principal(db, credentials.credentials)
     
-   
-    user = AuthService.get_user_by_username(db, username)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="couldn't validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> Account:
+    """The authenticated account itself, for handlers that change it."""
+    user = AuthService.get_user_by_id(db, principal.id)
     
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="couldn't validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
         
     return user
 
@@ -54,14 +90,10 @@ class RoleChecker:
     def __init__ (self, allowed_roles: list[str]):
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: Account = Depends(get_current_user)):
-        user_roles=[]
-        for role in current_user.roles:
-            user_roles.append(role.name)
-        
+    async def __call__(self, current_user: Principal = Depends(get_current_principal)):
         has_permission = False
 
-        for role in user_roles:
+        for role in current_user.roles:
             if role in self.allowed_roles:
                 has_permission = True
                 break
@@ -0,0 +1,76 @@
+# app/dependencies/pagination.py
+import base64
+import binascii
+from typing import Callable, Optional, Sequence
+from fastapi import HTTPException, Query, Response
+from app.config import settings
+from app.schemas.page_schema import Page
+from app.services import json_codec
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PageParams:
+    """
+    Keyset pagination for list endpoints, ordered by primary key.
+
+    Sending `limit` or `cursor` returns a Page ({items, next_cursor}). Calls
+    without either keep the plain list response but are capped at
+    LEGACY_LIST_LIMIT rows; when more exist, the cursor for the rest is sent
+    in the X-Next-Cursor header.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=settings.MAX_PAGE_SIZE, description="Items per page"),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    ):
+        self.paginated = limit is not None or cursor is not None
+        if limit is not None:
+            self.limit = limit
+        else:
+            self.limit = settings.DEFAULT_PAGE_SIZE if self.paginated else settings.LEGACY_LIST_LIMIT
+        self.after_id = decode_cursor(cursor) if cursor else None
+
+    @property
+    def fetch_limit(self) -> int:
+        # One extra row tells whether another page exists
+        return self.limit + 1
+
+    def paginate(self, rows: Sequence, build: Callable = lambda row: row) -> Page:
+        """Turn rows fetched with fetch_limit into a Page, building each item from its row."""
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        next_cursor = encode_cursor(rows[-1].id) if has_more else None
+        return Page(items=[build(row) for row in rows], next_cursor=next_cursor)
+
+    def respond(self, page: Page, response: Response):
+        """The Page for paginated calls; for legacy calls its items, with the cursor in a header."""
+        if self.paginated:
+            return page
+        if page.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return page.items
+
+    def respond_json(self, page: Page) -> Response:
+        """Like respond, for pages whose items are already plain dicts: encoded directly, skipping response_model."""
+        headers = {}
+        if self.paginated:
+            body = {"items": page.items, "next_cursor": page.next_cursor}
+        else:
+            body = page.items
+            if page.next_cursor:
+                headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return Response(content=json_codec.dumps(body), media_type="application/json", headers=headers)
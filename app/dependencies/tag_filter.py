@@ -0,0 +1,24 @@
+# app/dependencies/tag_filter.py
+from typing import Literal, Optional
+from fastapi import Query
+
+
+def split_tags(tags: Optional[str]) -> Optional[list[str]]:
+    """Parse a comma-separated tags query parameter."""
+    if not tags:
+        return None
+    return [t.strip() for t in tags.split(",") if t.strip()] or None
+
+
+class TagFilterParams:
+    """Tag filter query parameters shared by book search and tag facets."""
+
+    def __init__(
+        self,
+        tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
+        tag_mode: Literal["any", "all"] = Query("any", description="Match books with any of the tags, or with all of them"),
+        exclude_tags: Optional[str] = Query(None, description="Comma-separated list of tags books must not have"),
+    ):
+        self.tags = split_tags(tags)
+        self.tag_mode = tag_mode
+        self.exclude_tags = split_tags(exclude_tags)
@@ -1,21 +1,47 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from app.database import engine, Base
-from app.api import auth_router, book_router, video_router, tag_router, audio_router
+from app.database import async_engine, engine, Base
+from app.migrations import upgrade_schema
+from app.api import auth_router, book_router, video_router, tag_router, audio_router, job_router, upload_router, profile_router, metrics_router
+from app.database import SessionLocal
 from app import settings  # Import models to register them with Base
+from app.logging_config import configure_logging
+from app.services.fitz_pool import fitz_pool
+from app.services.job_service import job_queue
+from app.services.password_hasher import password_hasher
+from app.services.request_profiler import RequestProfilerMiddleware
+from app.services.sqlite_maintenance import sqlite_maintenance
+from app.services.cover_service import check_webp_support
+from app.services.stream_service import CoverStaticFiles, check_delivery_backend
+from app.services.tag_index import tag_index
+from app.services.upload_service import UploadService
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
+configure_logging()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
     settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     settings.COVER_DIR.mkdir(parents=True, exist_ok=True)
+    check_delivery_backend()
+    check_webp_support()
+    with SessionLocal() as db:
+        UploadService(db).cleanup_expired_throttled()
+        tag_index.build(db)
+    await job_queue.start()
+    await sqlite_maintenance.start()
     yield
     # Shutdown (if needed)
+    await sqlite_maintenance.stop()
+    await job_queue.stop()
+    fitz_pool.shutdown()
+    password_hasher.shutdown()
     engine.dispose()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -30,18 +56,26 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+# Added last so it wraps everything else and times the whole request
+app.add_middleware(RequestProfilerMiddleware)
 
 # Mount covers directory for public access (books require auth)
 
 os.makedirs(settings.UPLOAD_DIR / "covers", exist_ok=True)
-app.mount("/static/covers", StaticFiles(directory=str(settings.COVER_DIR)), name="covers")
+app.mount("/static/covers", CoverStaticFiles(directory=str(settings.COVER_DIR)), name="covers")
 
 app.include_router(auth_router.router)
 app.include_router(book_router.router)
 app.include_router(video_router.router)
 app.include_router(tag_router.router)
 app.include_router(audio_router.router)
+app.include_router(job_router.router)
+app.include_router(upload_router.router)
+app.include_router(profile_router.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router.router)
 
 
 @app.get("/")
@@ -0,0 +1,142 @@
+import logging
+from sqlalchemy import inspect, text
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Base.metadata.create_all only creates missing tables, never missing columns.
+# Columns added to existing tables are listed here as (table, column, DDL) and
+# applied on startup when an older database does not have them yet.
+COLUMN_PATCHES = [
+    ("books", "processing_state", "VARCHAR NOT NULL DEFAULT 'ready'"),
+    ("books", "content_hash", "VARCHAR(64)"),
+    ("audio", "content_hash", "VARCHAR(64)"),
+    ("video", "content_hash", "VARCHAR(64)"),
+    ("accounts", "password_changed_at", "TIMESTAMP"),
+]
+
+# Indexes added after the tables were first created, as (index name, table, columns).
+# Names match what create_all generates so fresh and upgraded databases end up the same.
+INDEX_PATCHES = [
+    ("ix_books_content_hash", "books", "content_hash"),
+    ("ix_audio_content_hash", "audio", "content_hash"),
+    ("ix_video_content_hash", "video", "content_hash"),
+    ("ix_books_file_type", "books", "file_type"),
+    ("ix_books_extension", "books", "extension"),
+    ("ix_book_tags_tag_id", "book_tags", "tag_id"),
+    ("ix_audio_tags_tag_id", "audio_tags", "tag_id"),
+    ("ix_video_tags_tag_id", "video_tags", "tag_id"),
+    ("ix_audio_deleted_at_id", "audio", "deleted_at, id"),
+    ("ix_video_deleted_at_id", "video", "deleted_at, id"),
+]
+
+# Tag names are unique regardless of case (ix_tags_name_lower on lower(name)).
+# Tags that differ only in case, created before the index existed, are merged
+# into the oldest one first; these tables link items to tags as (table, item column).
+TAG_LINK_TABLES = [("book_tags", "book_id"), ("audio_tags", "audio_id"), ("video_tags", "video_id")]
+
+# Search indexes that cannot be declared portably on the models, per dialect,
+# as (base table, SQLite index table, DDL, statement filling the index from
+# rows that already exist). Every DDL statement is idempotent; the fill only
+# runs when the index table is created. On Postgres, indexes cover existing rows.
+#
+# book_pages.content, for /books/search/fulltext. SQLite: an external-content
+# FTS5 table kept in sync by triggers. Postgres: a generated tsvector column
+# with a GIN index, using the 'simple' configuration (no stemming) since the
+# library holds several languages.
+#
+# books.title, for substring title search. SQLite: a trigram FTS5 table.
+# Postgres: pg_trgm GIN indexes (also on file_type), which ILIKE '%...%' uses directly.
+SEARCH_INDEXES = {
+    "sqlite": [
+        ("book_pages", "book_pages_fts", [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS book_pages_fts USING fts5("
+            "content, content='book_pages', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            "CREATE TRIGGER IF NOT EXISTS book_pages_ai AFTER INSERT ON book_pages BEGIN "
+            "INSERT INTO book_pages_fts(rowid, content) VALUES (new.id, new.content); END",
+            "CREATE TRIGGER IF NOT EXISTS book_pages_ad AFTER DELETE ON book_pages BEGIN "
+            "INSERT INTO book_pages_fts(book_pages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+            "CREATE TRIGGER IF NOT EXISTS book_pages_au AFTER UPDATE ON book_pages BEGIN "
+            "INSERT INTO book_pages_fts(book_pages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+            "INSERT INTO book_pages_fts(rowid, content) VALUES (new.id, new.content); END",
+        ], "INSERT INTO book_pages_fts(book_pages_fts) VALUES ('rebuild')"),
+        ("books", "books_title_fts", [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS books_title_fts USING fts5("
+            "title, content='books', content_rowid='id', tokenize='trigram')",
+            "CREATE TRIGGER IF NOT EXISTS books_title_ai AFTER INSERT ON books BEGIN "
+            "INSERT INTO books_title_fts(rowid, title) VALUES (new.id, new.title); END",
+            "CREATE TRIGGER IF NOT EXISTS books_title_ad AFTER DELETE ON books BEGIN "
+            "INSERT INTO books_title_fts(books_title_fts, rowid, title) VALUES ('delete', old.id, old.title); END",
+            "CREATE TRIGGER IF NOT EXISTS books_title_au AFTER UPDATE OF title ON books BEGIN "
+            "INSERT INTO books_title_fts(books_title_fts, rowid, title) VALUES ('delete', old.id, old.title); "
+            "INSERT INTO books_title_fts(rowid, title) VALUES (new.id, new.title); END",
+        ], "INSERT INTO books_title_fts(books_title_fts) VALUES ('rebuild')"),
+    ],
+    "postgresql": [
+        ("book_pages", None, [
+            "ALTER TABLE book_pages ADD COLUMN IF NOT EXISTS tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED",
+            "CREATE INDEX IF NOT EXISTS ix_book_pages_tsv ON book_pages USING GIN (tsv)",
+        ], None),
+        ("books", None, [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING GIN (title gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_books_file_type_trgm ON books USING GIN (file_type gin_trgm_ops)",
+        ], None),
+    ],
+}
+
+
+def _merge_case_duplicate_tags(conn, inspector) -> None:
+    groups = conn.execute(text(
+        "SELECT lower(name), min(id) FROM tags GROUP BY lower(name) HAVING count(*) > 1"
+    )).all()
+    links = [(table, column) for table, column in TAG_LINK_TABLES if inspector.has_table(table)]
+    for name, keep_id in groups:
+        duplicate_ids = conn.execute(
+            text("SELECT id FROM tags WHERE lower(name) = :name AND id != :keep_id"),
+            {"name": name, "keep_id": keep_id},
+        ).scalars().all()
+        for duplicate_id in duplicate_ids:
+            params = {"keep_id": keep_id, "duplicate_id": duplicate_id}
+            for table, column in links:
+                # Items that already have the kept tag just lose the duplicate
+                conn.execute(text(
+                    f"DELETE FROM {table} WHERE tag_id = :duplicate_id "
+                    f"AND {column} IN (SELECT {column} FROM {table} WHERE tag_id = :keep_id)"
+                ), params)
+                conn.execute(text(f"UPDATE {table} SET tag_id = :keep_id WHERE tag_id = :duplicate_id"), params)
+            conn.execute(text("DELETE FROM tags WHERE id = :duplicate_id"), params)
+        logger.info("Merged %d tag(s) into '%s'", len(duplicate_ids), name)
+
+
+def upgrade_schema() -> None:
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl in COLUMN_PATCHES:
+            if not inspector.has_table(table):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        for name, table, columns in INDEX_PATCHES:
+            if inspector.has_table(table):
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        if inspector.has_table("tags"):
+            _merge_case_duplicate_tags(conn, inspector)
+            conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_tags_name_lower ON tags (lower(name))"))
+
+    for table, index_table, statements, fill in SEARCH_INDEXES.get(engine.dialect.name, []):
+        if not inspector.has_table(table):
+            continue
+        created = index_table is not None and not inspector.has_table(index_table)
+        try:
+            with engine.begin() as conn:
+                for ddl in statements:
+                    conn.execute(text(ddl))
+                if created and fill:
+                    conn.execute(text(fill))
+        except Exception as e:
+            # e.g. SQLite without FTS5, or no permission to create pg_trgm;
+            # the affected searches fail or fall back, everything else works
+            logger.warning("Failed to create search index on %s: %s", table, e)
\ No newline at end of file
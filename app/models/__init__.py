@@ -11,10 +11,15 @@ from .audio import Audio
 from .audio_tag import AudioTag
 from .video import Video
 from .video_tag import VideoTag
+from .job import Job
+from .blob import Blob
+from .upload_session import UploadSession
+from .book_page import BookPage
 
 __all__ = [
     "Account", "Role", "AccountRole",
     "Book", "Tag", "BookTag",
     "Audio", "AudioTag",
     "Video", "VideoTag",
+    "Job", "Blob", "UploadSession", "BookPage",
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, DateTime, Integer, String, Boolean
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -13,6 +13,8 @@ class Account(Base):
     last_name = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     recovery_code_hash = Column(String, nullable=True)
+    # Tokens issued before this are rejected
+    password_changed_at = Column(DateTime, nullable=True)
 
     roles = relationship(
         "Role",
@@ -0,0 +1,18 @@
+from app.database import Base
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, UniqueConstraint
+from datetime import datetime, timezone
+
+
+class Blob(Base):
+    """A stored file identified by its SHA-256; ref_count is the number of rows pointing at it."""
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    namespace = Column(String, nullable=False)  # books | audio | video
+    sha256 = Column(String(64), nullable=False)
+    extension = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (UniqueConstraint("namespace", "sha256"),)
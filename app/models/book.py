@@ -10,7 +10,9 @@ class Book(Base):
     title = Column(String, nullable=False)
     cover_path = Column(String, nullable=True)
     file_path = Column(String, nullable=False)
-    file_type = Column(String, nullable=False)
-    extension = Column(String, nullable=False)
+    file_type = Column(String, nullable=False, index=True)
+    extension = Column(String, nullable=False, index=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the stored blob
+    processing_state = Column(String, nullable=False, default="ready", server_default="ready")  # pending | processing | ready | failed
 
     tags = relationship("Tag", secondary="book_tags", back_populates="books")
\ No newline at end of file
@@ -0,0 +1,15 @@
+from app.database import Base
+from sqlalchemy import Column, Integer, ForeignKey, Text
+
+
+class BookPage(Base):
+    """
+    Extracted text of one page, the unit the full-text index works on.
+    The index itself is dialect specific and added by app.migrations.
+    """
+    __tablename__ = "book_pages"
+
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False, index=True)
+    page = Column(Integer, nullable=False)  # 1-based, as shown by readers
+    content = Column(Text, nullable=False)
@@ -6,7 +6,7 @@ class BookTag(Base):
     
     id = Column(Integer, primary_key=True) 
     book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
-    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False, index=True)
     is_active = Column(Boolean, default=True)
     
     __table_args__ = (UniqueConstraint('book_id', 'tag_id'),)
\ No newline at end of file
@@ -0,0 +1,27 @@
+from app.database import Base
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, Index
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    # Naive UTC so comparisons behave the same on SQLite and PostgreSQL
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pending")  # pending | running | succeeded | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    last_error = Column(String, nullable=True)
+    run_after = Column(DateTime, nullable=False, default=utcnow)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
@@ -1,5 +1,5 @@
 from app.database import Base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String, func
 from sqlalchemy.orm import relationship
 
 class Tag(Base):
@@ -8,4 +8,7 @@ class Tag(Base):
     name = Column(String, unique=True, index=True, nullable=False)
     books = relationship("Book", secondary="book_tags", back_populates="tags")
     audio_tracks = relationship("Audio", secondary="audio_tags", back_populates="tags")
-    videos = relationship("Video", secondary="video_tags", back_populates="tags")
\ No newline at end of file
+    videos = relationship("Video", secondary="video_tags", back_populates="tags")
+
+    # Tag names are unique regardless of case, and looked up by lower(name)
+    __table_args__ = (Index("ix_tags_name_lower", func.lower(name), unique=True),)
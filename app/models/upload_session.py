@@ -0,0 +1,18 @@
+from app.database import Base
+from app.models.job import utcnow
+from sqlalchemy import Column, String, DateTime, BigInteger, JSON
+
+
+class UploadSession(Base):
+    """A resumable upload in progress; its bytes are collected in UPLOAD_SESSION_DIR/<id>.part."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    kind = Column(String, nullable=False)  # book | video
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=False)  # Upload-Length
+    offset = Column(BigInteger, nullable=False, default=0)  # Bytes received so far
+    upload_metadata = Column(JSON, nullable=False, default=dict)  # title, tags, description
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
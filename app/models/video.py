@@ -1,5 +1,5 @@
 from app.database import Base
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -9,6 +9,10 @@ class Video(Base):
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the stored blob
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     deleted_at = Column(DateTime, nullable=True, default=None)
-    tags = relationship("Tag", secondary="video_tags", back_populates="videos")
\ No newline at end of file
+    tags = relationship("Tag", secondary="video_tags", back_populates="videos")
+
+    # Listings page through rows that are not deleted, in id order
+    __table_args__ = (Index("ix_video_deleted_at_id", "deleted_at", "id"),)
\ No newline at end of file
@@ -5,5 +5,5 @@ class VideoTag(Base):
     __tablename__ = "video_tags"
     id = Column(Integer, primary_key=True)
     video_id = Column(Integer, ForeignKey("video.id", ondelete="CASCADE"), nullable=False)
-    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False, index=True)
     __table_args__ = (UniqueConstraint('video_id', 'tag_id'),)
\ No newline at end of file
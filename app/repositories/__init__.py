@@ -1,5 +1,9 @@
-from .book_repo import BookRepo
-from .tag_repo import TagRepo
+from .book_repo import AsyncBookRepo, BookRepo
+from .tag_repo import AsyncTagRepo, TagRepo
+from .job_repo import JobRepo
+from .blob_repo import BlobRepo
+from .upload_session_repo import UploadSessionRepo
+from .fulltext_repo import FullTextRepo
 
 
-__all__ = ["BookRepo", "TagRepo"]
\ No newline at end of file
+__all__ = ["BookRepo", "AsyncBookRepo", "TagRepo", "AsyncTagRepo", "JobRepo", "BlobRepo", "UploadSessionRepo", "FullTextRepo"]
\ No newline at end of file
@@ -1,6 +1,12 @@
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app.models.audio import Audio
+from app.repositories.keyset import keyset_page
+from app.repositories.tag_repo import AsyncTagRepo
 from app.schemas.audio_schema import Audio_Create
+from app.services.tag_service import TagService
 from datetime import datetime, timezone
 
 class Audio_Repo:
@@ -29,4 +35,42 @@ class Audio_Repo:
             audio.description = description
         self.db_session.commit()
         self.db_session.refresh(audio)
-        return audio
\ No newline at end of file
+        return audio
+
+
+class AsyncAudioRepo:
+    """Audio_Repo for an AsyncSession, used by async endpoints. Tags are always loaded eagerly."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_audio(self, audio_id: int) -> Optional[Audio]:
+        query = select(Audio).options(selectinload(Audio.tags)).where(Audio.id == audio_id)
+        return (await self.db_session.scalars(query)).first()
+
+    async def list_audio(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> list[Audio]:
+        query = select(Audio).options(selectinload(Audio.tags)).where(Audio.deleted_at == None)
+        return list(await self.db_session.scalars(keyset_page(query, Audio.id, after_id, limit)))
+
+    async def update_audio(
+        self, audio: Audio, title: Optional[str], description: Optional[str], tag_names: Optional[list[str]]
+    ) -> Audio:
+        """Apply the given fields; unused tags removed from the audio are collected. Commits."""
+        if title is not None:
+            audio.title = title
+        if description is not None:
+            audio.description = description
+        if tag_names is not None:
+            removed_tag_ids = {tag.id for tag in audio.tags}
+            audio.tags = await AsyncTagRepo(self.db_session).get_or_create_tags(tag_names)
+            await TagService.collect_orphans_async(self.db_session, removed_tag_ids - {tag.id for tag in audio.tags})
+        await self.db_session.commit()
+        return audio
+
+    async def delete_audio(self, audio_id: int) -> Optional[Audio]:
+        audio = await self.get_audio(audio_id)
+        if audio is None:
+            return None
+        audio.deleted_at = datetime.now(timezone.utc)
+        await self.db_session.commit()
+        return audio
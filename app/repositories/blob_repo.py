@@ -0,0 +1,81 @@
+from collections import Counter
+from typing import Optional
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.blob import Blob
+
+
+class BlobRepo:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def get_blob(self, namespace: str, sha256: str) -> Optional[Blob]:
+        return self.db_session.query(Blob).filter(Blob.namespace == namespace, Blob.sha256 == sha256).first()
+
+    def acquire(self, namespace: str, sha256: str, extension: str, size: int) -> tuple[Blob, bool]:
+        """Add a reference to a blob, creating it if needed. Returns (blob, created)."""
+        if self._increment(namespace, sha256):
+            return self.get_blob(namespace, sha256), False
+
+        blob = Blob(namespace=namespace, sha256=sha256, extension=extension, size=size, ref_count=1)
+        self.db_session.add(blob)
+        try:
+            self.db_session.commit()
+        except IntegrityError:
+            # A concurrent upload of the same content created it first
+            self.db_session.rollback()
+            self._increment(namespace, sha256)
+            return self.get_blob(namespace, sha256), False
+        self.db_session.refresh(blob)
+        return blob, True
+
+    def acquire_many(self, namespace: str, entries: list[tuple[str, str, int]]) -> dict[str, Blob]:
+        """
+        Add one reference per (sha256, extension, size) entry inside the current
+        transaction, for batched inserts. The caller commits. Returns blobs by sha256.
+        """
+        counts = Counter(sha256 for sha256, _, _ in entries)
+        blobs = {
+            blob.sha256: blob
+            for blob in self.db_session.query(Blob).filter(Blob.namespace == namespace, Blob.sha256.in_(counts))
+        }
+        for sha256, n in counts.items():
+            if sha256 in blobs:
+                blobs[sha256].ref_count = Blob.ref_count + n
+        for sha256, extension, size in entries:
+            if sha256 not in blobs:
+                blobs[sha256] = Blob(namespace=namespace, sha256=sha256, extension=extension, size=size, ref_count=counts[sha256])
+                self.db_session.add(blobs[sha256])
+        self.db_session.flush()
+        return blobs
+
+    def _increment(self, namespace: str, sha256: str) -> bool:
+        result = self.db_session.execute(
+            update(Blob)
+            .where(Blob.namespace == namespace, Blob.sha256 == sha256)
+            .values(ref_count=Blob.ref_count + 1)
+        )
+        self.db_session.commit()
+        return result.rowcount == 1
+
+    def release(self, namespace: str, sha256: str) -> Optional[str]:
+        """
+        Drop a reference. When it was the last one the row is deleted and its
+        extension returned, so the caller can remove the file; otherwise None.
+        """
+        blob = self.get_blob(namespace, sha256)
+        if blob is None:
+            return None
+        extension = blob.extension
+        self.db_session.execute(
+            update(Blob)
+            .where(Blob.namespace == namespace, Blob.sha256 == sha256, Blob.ref_count > 0)
+            .values(ref_count=Blob.ref_count - 1)
+        )
+        # Conditional, so a reference acquired concurrently keeps the row (and the file)
+        result = self.db_session.execute(
+            delete(Blob).where(Blob.namespace == namespace, Blob.sha256 == sha256, Blob.ref_count == 0)
+        )
+        self.db_session.commit()
+        return extension if result.rowcount == 1 else None
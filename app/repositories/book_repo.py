@@ -1,19 +1,141 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
-from app.models import Book, Tag
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import Row, and_, column, delete, func, literal_column, select, text
+from app.models import Book, BookPage, BookTag, Tag
+from app.repositories.keyset import keyset_page
+from app.repositories.tag_repo import AsyncTagRepo, TagRepo, normalize_tag_name
 from app.schemas.book_schema import BookCreate
-from typing import Optional
+from app.services.catalog_cache import catalog_cache
+from app.services.tag_index import tag_index
+from app.services.tag_service import TagService
+from typing import Optional, Union
 
-class BookRepo:
+# The SQLite trigram tokenizer only indexes terms of at least three characters
+TRIGRAM_MIN_LENGTH = 3
+# Columns listings need (BookBase fields plus id for the cursor)
+LISTING_COLUMNS = (
+    Book.id, Book.title, Book.uid, Book.file_type, Book.extension, Book.cover_path, Book.processing_state,
+)
+
+class BookQueries:
+    """Statement builders shared by BookRepo and AsyncBookRepo."""
+    db_session: Union[Session, AsyncSession]
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        """Make user input match literally inside a LIKE pattern."""
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    def _title_filter(self, title: str):
+        title = title.strip()
+        if self.db_session.get_bind().dialect.name == "sqlite" and len(title) >= TRIGRAM_MIN_LENGTH:
+            # A quoted string is matched as one substring by the trigram tokenizer
+            matching_ids = text(
+                "SELECT rowid FROM books_title_fts WHERE books_title_fts MATCH :title_query"
+            ).bindparams(title_query='"' + title.replace('"', '""') + '"').columns(column("rowid"))
+            return Book.id.in_(matching_ids)
+        return Book.title.ilike(f"%{self._escape_like(title)}%", escape="\\")
+
+    @staticmethod
+    def _tagged_book_ids(tag_names: set[str]):
+        return select(BookTag.book_id).join(Tag, Tag.id == BookTag.tag_id).where(Tag.name.in_(tag_names))
+
+    def _search_filters(
+        self,
+        title: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        file_type: Optional[str] = None,
+        extension: Optional[str] = None,
+        tag_mode: str = "any",
+        exclude_tags: Optional[list[str]] = None
+    ) -> list:
+        """WHERE criteria on Book for the search filters; see search_books."""
+        # Apply filters dynamically
+        filters = []
+        
+        if title:
+            filters.append(self._title_filter(title))
+        
+        if file_type:
+            if "/" in file_type:
+                # A full media type: exact match on the indexed column
+                filters.append(Book.file_type == file_type.strip().lower())
+            else:
+                filters.append(Book.file_type.ilike(f"%{self._escape_like(file_type)}%", escape="\\"))
+        
+        if extension:
+            # Extensions are stored lower-case
+            filters.append(Book.extension == extension.strip().lower())
+        
+        # Handle tag filtering separately (subqueries, so a book matching several tags is one row)
+        if tags:
+            # Normalize tag names
+            normalized_tags = {tag.strip().lower() for tag in tags}
+            tagged_ids = self._tagged_book_ids(normalized_tags)
+            if tag_mode == "all":
+                tagged_ids = tagged_ids.group_by(BookTag.book_id).having(func.count(BookTag.tag_id) == len(normalized_tags))
+            filters.append(Book.id.in_(tagged_ids))
+
+        if exclude_tags:
+            excluded_ids = self._tagged_book_ids({tag.strip().lower() for tag in exclude_tags})
+            filters.append(Book.id.not_in(excluded_ids))
+
+        return filters
+
+    def _listing_tags_column(self):
+        """Tags of each row as one JSON array, aggregated by the database."""
+        if self.db_session.get_bind().dialect.name == "postgresql":
+            aggregate = func.coalesce(
+                func.json_agg(func.json_build_object("name", Tag.name, "id", Tag.id)), literal_column("'[]'::json")
+            )
+        else:
+            # SQLite returns '[]' for a book without tags
+            aggregate = func.json_group_array(func.json_object("name", Tag.name, "id", Tag.id))
+        return (
+            select(aggregate)
+            .select_from(BookTag)
+            .join(Tag, Tag.id == BookTag.tag_id)
+            .where(BookTag.book_id == Book.id)
+            .scalar_subquery()
+            .label("tags")
+        )
+
+    def _listing_query(
+        self,
+        title: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        file_type: Optional[str] = None,
+        extension: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        tag_mode: str = "any",
+        exclude_tags: Optional[list[str]] = None,
+        book_ids: Optional[list[int]] = None
+    ):
+        """The SELECT behind search_book_rows, or None when no row can match."""
+        filters = self._search_filters(title, tags, file_type, extension, tag_mode, exclude_tags)
+        if book_ids is not None:
+            if not book_ids:
+                return None
+            filters.append(Book.id.in_(book_ids))
+        if after_id is not None:
+            filters.append(Book.id > after_id)
+        query = select(*LISTING_COLUMNS, self._listing_tags_column()).where(*filters).order_by(Book.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+class BookRepo(BookQueries):
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
     def get_book_by_uid(self, book_uid: str) -> Book:
-        return self.db_session.query(Book).options(joinedload(Book.tags)).filter(Book.uid == book_uid).first()
+        # selectinload: with joinedload, LIMIT 1 wraps the book in a subquery and SQLite scans all of book_tags
+        return self.db_session.query(Book).options(selectinload(Book.tags)).filter(Book.uid == book_uid).first()
 
     def create_book(self, book_create: BookCreate) -> Book:
         tag_data = book_create.tags
-        book_dict = book_create.model_dump(exclude={"tags", "cover_url"})
+        book_dict = book_create.model_dump(exclude={"tags", "cover_url", "cover_srcset"})
         
         existing = self.db_session.query(Book).filter(Book.uid == book_create.uid).first()
         if existing:
@@ -22,38 +144,81 @@ class BookRepo:
         new_book = Book(**book_dict)
         
         if tag_data:
-            for tag_in in tag_data:
-                tag = self.db_session.query(Tag).filter(Tag.name.ilike(tag_in.name)).first()
-                if not tag:
-                    tag = Tag(name=tag_in.name.strip().lower())
-                new_book.tags.append(tag)
+            new_book.tags = TagRepo(self.db_session).get_or_create_tags(tag_in.name for tag_in in tag_data)
 
         try:
             self.db_session.add(new_book)
             self.db_session.commit()
             self.db_session.refresh(new_book)
+            tag_index.set_book(new_book.id, [tag.name for tag in new_book.tags])
+            catalog_cache.bump()
             return new_book
         except Exception as e:
             self.db_session.rollback()
             raise Exception(f"Failed to create book in database: {str(e)}")
     
-    def get_all_books(self) -> list[Book]:
-        return self.db_session.query(Book).options(joinedload(Book.tags)).all()
-    
-    def cleanup_orphan_tags(self) -> None:
-        """Delete tags that are no longer attached to any book."""
-        orphans = self.db_session.query(Tag).filter(~Tag.books.any()).all()
-        for tag in orphans:
-            self.db_session.delete(tag)
+    def set_processing_state(self, book_uid: str, state: str) -> None:
+        self.db_session.query(Book).filter(Book.uid == book_uid).update({Book.processing_state: state})
         self.db_session.commit()
+        catalog_cache.bump()
+
+    def finish_processing(
+        self, book_uid: str, started_cover: Optional[str], cover_path: Optional[str], tag_names: list[str]
+    ) -> Optional[Book]:
+        """
+        Record the results of post-upload processing on the current row: the
+        cover (unless it was replaced since started_cover was read), tag_names
+        added to the book's tags, and the "ready" state. Title and existing tags
+        are left as they are. Returns None when the book was deleted meanwhile.
+        """
+        # populate_existing: the job read this row minutes ago and the session still holds that copy
+        book = (
+            self.db_session.query(Book)
+            .options(selectinload(Book.tags))
+            .filter(Book.uid == book_uid)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        if not book:
+            self.db_session.rollback()
+            return None
+
+        if book.cover_path == started_cover:
+            book.cover_path = cover_path
+        book.processing_state = "ready"
+        current = {tag.name.lower() for tag in book.tags}
+        new_names = [name for name in tag_names if normalize_tag_name(name) not in current]
+        if new_names:
+            book.tags = list(book.tags) + TagRepo(self.db_session).get_or_create_tags(new_names)
 
+        try:
+            self.db_session.commit()
+            self.db_session.refresh(book)
+            tag_index.set_book(book.id, [tag.name for tag in book.tags])
+            catalog_cache.bump()
+            return book
+        except Exception as e:
+            self.db_session.rollback()
+            raise Exception(f"Failed to update book in database: {str(e)}")
+
+    def get_all_books(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> list[Book]:
+        query = self.db_session.query(Book).options(joinedload(Book.tags))
+        return keyset_page(query, Book.id, after_id, limit).all()
+    
     def delete_book(self, book_uid: str) -> None:
         book = self.get_book_by_uid(book_uid)
         if not book:
             raise ValueError(f"Book with UID {book_uid} does not exist")
+        # SQLite does not enforce ON DELETE CASCADE, and the FTS5 index is kept in sync by triggers on these rows
+        self.db_session.query(BookPage).filter(BookPage.book_id == book.id).delete(synchronize_session=False)
+        book_id = book.id
+        tag_ids = [tag.id for tag in book.tags]
         self.db_session.delete(book)
+        TagService.collect_orphans(self.db_session, tag_ids)
         self.db_session.commit()
-        self.cleanup_orphan_tags()
+        tag_index.remove_book(book_id)
+        catalog_cache.bump()
         
     def update_book(self, book_uid: str, book_update: BookCreate) -> Book:
         book = self.get_book_by_uid(book_uid)
@@ -61,61 +226,140 @@ class BookRepo:
             raise ValueError(f"Book with UID {book_uid} does not exist")
         
         tag_data = book_update.tags
-        book_dict = book_update.model_dump(exclude={"tags", "cover_url"})
+        book_dict = book_update.model_dump(exclude={"tags", "cover_url", "cover_srcset"})
         
         for key, value in book_dict.items():
             setattr(book, key, value)
         
+        removed_tag_ids = set()
         if tag_data is not None:
-            book.tags.clear()
-            for tag_in in tag_data:
-                tag = self.db_session.query(Tag).filter(Tag.name.ilike(tag_in.name)).first()
-                if not tag:
-                    tag = Tag(name=tag_in.name.strip().lower())
-                book.tags.append(tag)
+            removed_tag_ids = {tag.id for tag in book.tags}
+            book.tags = TagRepo(self.db_session).get_or_create_tags(tag_in.name for tag_in in tag_data)
+            removed_tag_ids -= {tag.id for tag in book.tags}
         
         try:
+            TagService.collect_orphans(self.db_session, removed_tag_ids)
             self.db_session.commit()
             self.db_session.refresh(book)
-            self.cleanup_orphan_tags()
+            tag_index.set_book(book.id, [tag.name for tag in book.tags])
+            catalog_cache.bump()
             return book
         except Exception as e:
             self.db_session.rollback()
             raise Exception(f"Failed to update book in database: {str(e)}")
     
+    def search_book_rows(
+        self,
+        title: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        file_type: Optional[str] = None,
+        extension: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        tag_mode: str = "any",
+        exclude_tags: Optional[list[str]] = None,
+        book_ids: Optional[list[int]] = None
+    ) -> list[Row]:
+        """
+        Read-only variant of search_books for listings: plain rows holding only
+        the columns of BookBase, with tags as a JSON array. No ORM objects are
+        built. book_ids restricts the rows to those ids.
+        """
+        query = self._listing_query(title, tags, file_type, extension, after_id, limit, tag_mode, exclude_tags, book_ids)
+        if query is None:
+            return []
+        return self.db_session.execute(query).all()
+
     def search_books(
         self,
         title: Optional[str] = None,
         tags: Optional[list[str]] = None,
         file_type: Optional[str] = None,
-        extension: Optional[str] = None
+        extension: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        tag_mode: str = "any",
+        exclude_tags: Optional[list[str]] = None
     ) -> list[Book]:
         """
         Dynamic search with multiple optional filters.
-        Filters are combined using AND logic.
+        Filters are combined using AND logic; results are ordered by id.
+        Books need any of `tags` (tag_mode "any") or all of them ("all"), and none of `exclude_tags`.
+        Title matching is a case-insensitive substring search served by an index:
+        the trigram FTS5 table on SQLite, pg_trgm on Postgres (see app.migrations).
         """
         query = self.db_session.query(Book).options(joinedload(Book.tags))
-        
-        # Apply filters dynamically
-        filters = []
-        
-        if title:
-            filters.append(Book.title.ilike(f"%{title}%"))
-        
-        if file_type:
-            filters.append(Book.file_type.ilike(f"%{file_type}%"))
-        
-        if extension:
-            filters.append(Book.extension.ilike(extension))
-        
-        # Apply all non-tag filters
+        filters = self._search_filters(title, tags, file_type, extension, tag_mode, exclude_tags)
         if filters:
             query = query.filter(and_(*filters))
         
-        # Handle tag filtering separately (requires join)
-        if tags:
-            # Normalize tag names
-            normalized_tags = [tag.strip().lower() for tag in tags]
-            query = query.join(Book.tags).filter(Tag.name.in_(normalized_tags))
-        
-        return query.all()
\ No newline at end of file
+        return keyset_page(query, Book.id, after_id, limit).all()
+
+class AsyncBookRepo(BookQueries):
+    """BookRepo for an AsyncSession, used by async endpoints. Tags are always loaded eagerly."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_book_by_uid(self, book_uid: str) -> Optional[Book]:
+        query = select(Book).options(selectinload(Book.tags)).where(Book.uid == book_uid)
+        return (await self.db_session.scalars(query)).first()
+
+    async def search_book_rows(
+        self,
+        title: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        file_type: Optional[str] = None,
+        extension: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        tag_mode: str = "any",
+        exclude_tags: Optional[list[str]] = None,
+        book_ids: Optional[list[int]] = None
+    ) -> list[Row]:
+        """See BookRepo.search_book_rows."""
+        query = self._listing_query(title, tags, file_type, extension, after_id, limit, tag_mode, exclude_tags, book_ids)
+        if query is None:
+            return []
+        return (await self.db_session.execute(query)).all()
+
+    async def delete_book(self, book_uid: str) -> None:
+        book = await self.get_book_by_uid(book_uid)
+        if not book:
+            raise ValueError(f"Book with UID {book_uid} does not exist")
+        # Same order as BookRepo.delete_book: pages first, for SQLite and the FTS5 triggers
+        await self.db_session.execute(delete(BookPage).where(BookPage.book_id == book.id))
+        book_id = book.id
+        tag_ids = [tag.id for tag in book.tags]
+        await self.db_session.delete(book)
+        await TagService.collect_orphans_async(self.db_session, tag_ids)
+        await self.db_session.commit()
+        tag_index.remove_book(book_id)
+        catalog_cache.bump()
+
+    async def update_book(self, book_uid: str, book_update: BookCreate) -> Book:
+        book = await self.get_book_by_uid(book_uid)
+        if not book:
+            raise ValueError(f"Book with UID {book_uid} does not exist")
+
+        tag_data = book_update.tags
+        book_dict = book_update.model_dump(exclude={"tags", "cover_url", "cover_srcset"})
+
+        for key, value in book_dict.items():
+            setattr(book, key, value)
+
+        removed_tag_ids = set()
+        if tag_data is not None:
+            removed_tag_ids = {tag.id for tag in book.tags}
+            book.tags = await AsyncTagRepo(self.db_session).get_or_create_tags(tag_in.name for tag_in in tag_data)
+            removed_tag_ids -= {tag.id for tag in book.tags}
+
+        try:
+            await TagService.collect_orphans_async(self.db_session, removed_tag_ids)
+            await self.db_session.commit()
+            tag_index.set_book(book.id, [tag.name for tag in book.tags])
+            catalog_cache.bump()
+            return book
+        except Exception as e:
+            await self.db_session.rollback()
+            raise Exception(f"Failed to update book in database: {str(e)}")
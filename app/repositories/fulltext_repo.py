@@ -0,0 +1,108 @@
+import html
+import re
+from typing import Iterable
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models import BookPage
+
+# The database marks matches with private-use characters, which cannot form
+# markup; snippets are HTML-escaped before they become <mark> tags
+SNIPPET_START = "\ue000"
+SNIPPET_STOP = "\ue001"
+SNIPPET_WORDS = 24
+
+
+def render_snippet(snippet: str) -> str:
+    """Escape a snippet from the index as HTML text and turn its match delimiters into <mark></mark>."""
+    return html.escape(snippet).replace(SNIPPET_START, "<mark>").replace(SNIPPET_STOP, "</mark>")
+
+
+def strip_snippet_delimiters(content: str) -> str:
+    """Page text without the characters reserved for match delimiters."""
+    return content.replace(SNIPPET_START, "").replace(SNIPPET_STOP, "")
+
+
+class FullTextRepo:
+    """
+    Page text of books and the ranked search over it.
+    The index is created per dialect by app.migrations (FTS5 on SQLite,
+    tsvector + GIN on Postgres), so searches are written in plain SQL.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+        self.dialect = db_session.get_bind().dialect.name
+
+    def add_pages(self, book_id: int, pages: Iterable[tuple[int, str]]) -> None:
+        """Queue the pages of a book for insert; committed with the caller's transaction."""
+        rows = [
+            {"book_id": book_id, "page": page, "content": strip_snippet_delimiters(content)}
+            for page, content in pages
+        ]
+        if rows:
+            self.db_session.execute(BookPage.__table__.insert(), rows)
+
+    def delete_pages(self, book_id: int) -> None:
+        self.db_session.query(BookPage).filter(BookPage.book_id == book_id).delete(synchronize_session=False)
+
+    def replace_pages(self, book_id: int, pages: Iterable[tuple[int, str]]) -> None:
+        try:
+            self.delete_pages(book_id)
+            self.add_pages(book_id, pages)
+            self.db_session.commit()
+        except Exception:
+            self.db_session.rollback()
+            raise
+
+    def indexed_book_ids(self) -> set[int]:
+        return {book_id for (book_id,) in self.db_session.query(BookPage.book_id).distinct()}
+
+    @staticmethod
+    def _fts5_query(query: str) -> str:
+        # User input is reduced to quoted terms (all required) so FTS5 syntax
+        # characters cannot break the query; the last term also matches as a prefix
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return ""
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search(self, query: str, limit: int) -> list[tuple[int, int, float, str]]:
+        """
+        Best matching pages first, as (book_id, page, score, snippet); higher
+        scores rank higher. Snippets are HTML-escaped, see render_snippet.
+        """
+        if self.dialect == "sqlite":
+            match = self._fts5_query(query)
+            if not match:
+                return []
+            sql = text(
+                "SELECT p.book_id, p.page, -bm25(book_pages_fts) AS score, "
+                "snippet(book_pages_fts, 0, :start, :stop, '…', :words) AS snippet "
+                "FROM book_pages_fts JOIN book_pages p ON p.id = book_pages_fts.rowid "
+                "WHERE book_pages_fts MATCH :query "
+                "ORDER BY bm25(book_pages_fts) LIMIT :limit"
+            )
+            params = {"query": match, "start": SNIPPET_START, "stop": SNIPPET_STOP, "words": SNIPPET_WORDS}
+        elif self.dialect == "postgresql":
+            # Headlines are expensive, so they are only built for the pages that made the cut
+            sql = text(
+                "SELECT hit.book_id, hit.page, hit.score, "
+                "ts_headline('simple', p.content, hit.q, :options) AS snippet "
+                "FROM (SELECT p.id, p.book_id, p.page, ts_rank_cd(p.tsv, q) AS score, q "
+                "      FROM book_pages p, websearch_to_tsquery('simple', :query) q "
+                "      WHERE p.tsv @@ q ORDER BY score DESC LIMIT :limit) hit "
+                "JOIN book_pages p ON p.id = hit.id "
+                "ORDER BY hit.score DESC"
+            )
+            params = {
+                "query": query,
+                "options": f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, "
+                           f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=1",
+            }
+        else:
+            raise NotImplementedError(f"Full-text search is not available on {self.dialect}")
+
+        rows = self.db_session.execute(sql, {**params, "limit": limit})
+        return [(book_id, page, float(score), render_snippet(snippet)) for book_id, page, score, snippet in rows]
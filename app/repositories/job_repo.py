@@ -0,0 +1,87 @@
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from app.models.job import Job, utcnow
+
+
+class JobRepo:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def create_job(self, kind: str, payload: dict, max_attempts: int = 3) -> Job:
+        job = Job(kind=kind, payload=payload, max_attempts=max_attempts)
+        self.db_session.add(job)
+        self.db_session.commit()
+        self.db_session.refresh(job)
+        return job
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        return self.db_session.query(Job).filter(Job.id == job_id).first()
+
+    def claim_next_job(self) -> Optional[Job]:
+        """
+        Atomically move the oldest runnable job from pending to running.
+        The conditional UPDATE makes this safe with several app workers sharing one database.
+        """
+        now = utcnow()
+        candidates = (
+            self.db_session.query(Job.id)
+            .filter(Job.status == "pending", Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .limit(5)
+            .all()
+        )
+        for (job_id,) in candidates:
+            result = self.db_session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "pending")
+                .values(status="running", started_at=now, attempts=Job.attempts + 1)
+            )
+            self.db_session.commit()
+            if result.rowcount == 1:
+                return self.get_job(job_id)
+        return None
+
+    def mark_succeeded(self, job: Job, duration_seconds: float) -> Job:
+        job.status = "succeeded"
+        job.last_error = None
+        job.finished_at = utcnow()
+        job.duration_seconds = duration_seconds
+        self.db_session.commit()
+        return job
+
+    def mark_failed(self, job: Job, error: str, duration_seconds: float, retry_delay_seconds: float) -> Job:
+        """Schedule a retry with backoff, or fail for good once attempts are used up."""
+        job.last_error = error[:2000]
+        job.duration_seconds = duration_seconds
+        if job.attempts < job.max_attempts:
+            job.status = "pending"
+            job.run_after = utcnow() + timedelta(seconds=retry_delay_seconds)
+        else:
+            job.status = "failed"
+            job.finished_at = utcnow()
+        self.db_session.commit()
+        return job
+
+    def heartbeat(self, job_id: int) -> None:
+        """Keep a long-running job from being requeued as stale."""
+        self.db_session.execute(
+            update(Job).where(Job.id == job_id, Job.status == "running").values(started_at=utcnow())
+        )
+        self.db_session.commit()
+
+    def requeue_stale_jobs(self, stale_after_seconds: float) -> int:
+        """Jobs left running by a crash or restart go back to the queue."""
+        cutoff = utcnow() - timedelta(seconds=stale_after_seconds)
+        result = self.db_session.execute(
+            update(Job)
+            .where(Job.status == "running", Job.started_at < cutoff)
+            .values(status="pending", run_after=utcnow())
+        )
+        self.db_session.commit()
+        return result.rowcount
+
+    def count_by_status(self) -> dict[str, int]:
+        rows = self.db_session.query(Job.status, func.count(Job.id)).group_by(Job.status).all()
+        return {status: count for status, count in rows}
@@ -0,0 +1,12 @@
+from typing import Optional
+from sqlalchemy.orm import Query
+
+
+def keyset_page(query: Query, id_column, after_id: Optional[int] = None, limit: Optional[int] = None) -> Query:
+    """Order by id and continue after the last id of the previous page; served by the primary key index."""
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    query = query.order_by(id_column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
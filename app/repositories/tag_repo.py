@@ -1,7 +1,29 @@
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from app.models import Book, Tag
+from typing import Iterable, Optional
+from app.models import AudioTag, Book, BookTag, Tag, VideoTag
+from app.repositories.keyset import keyset_page
 from app.schemas.book_schema import TagCreate
 
+# Dialects with INSERT ... ON CONFLICT DO NOTHING ... RETURNING
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def normalize_tag_name(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+def _wanted_names(names: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(normalize_tag_name(name) for name in names if name and name.strip()))
+
+def _unused_tags():
+    """Criteria matching tags that no book, audio or video uses."""
+    return (
+        ~exists().where(BookTag.tag_id == Tag.id),
+        ~exists().where(AudioTag.tag_id == Tag.id),
+        ~exists().where(VideoTag.tag_id == Tag.id),
+    )
+
 class TagRepo:
     def __init__(self, db_session: Session):
         self.db_session = db_session
@@ -16,6 +38,108 @@ class TagRepo:
         self.db_session.refresh(new_tag)
         return new_tag
     
-    def get_all_tags(self) -> list[Tag]:
-        return self.db_session.query(Tag).all()
+    def get_all_tags(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> list[Tag]:
+        return keyset_page(self.db_session.query(Tag), Tag.id, after_id, limit).all()
+
+    def delete_orphans(self, tag_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Delete, in one statement, the tags among tag_ids (every tag when None)
+        that no book, audio or video uses. Returns how many were deleted;
+        nothing is committed.
+        """
+        query = self.db_session.query(Tag).filter(*_unused_tags())
+        if tag_ids is not None:
+            tag_ids = set(tag_ids)
+            if not tag_ids:
+                return 0
+            query = query.filter(Tag.id.in_(tag_ids))
+        # Pending link changes must reach the database before the check
+        self.db_session.flush()
+        return query.delete(synchronize_session=False)
+
+    def get_or_create_tags(self, names: Iterable[str]) -> list[Tag]:
+        """
+        Tags for the given names, in order and without repeats, creating the
+        missing ones. Names match case-insensitively. One SELECT, plus one
+        INSERT ... ON CONFLICT DO NOTHING when some are new; nothing is committed.
+        """
+        wanted = _wanted_names(names)
+        if not wanted:
+            return []
+
+        found = self._find(wanted)
+        missing = [name for name in wanted if name not in found]
+        if missing:
+            for tag in self._insert(missing):
+                found[tag.name.lower()] = tag
+            # Created by another transaction between the SELECT and the INSERT
+            raced = [name for name in missing if name not in found]
+            if raced:
+                found.update(self._find(raced))
+        return [found[name] for name in wanted]
+
+    def _find(self, names: list[str]) -> dict[str, Tag]:
+        tags = self.db_session.query(Tag).filter(func.lower(Tag.name).in_(names))
+        return {tag.name.lower(): tag for tag in tags}
+
+    def _insert(self, names: list[str]) -> list[Tag]:
+        insert = UPSERT_INSERTS.get(self.db_session.get_bind().dialect.name)
+        if insert is None:
+            tags = [Tag(name=name) for name in names]
+            self.db_session.add_all(tags)
+            self.db_session.flush()
+            return tags
+        stmt = insert(Tag).values([{"name": name} for name in names]).on_conflict_do_nothing().returning(Tag)
+        return list(self.db_session.scalars(stmt))
+
+
+class AsyncTagRepo:
+    """TagRepo for an AsyncSession, used by async endpoints."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_all_tags(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> list[Tag]:
+        return list(await self.db_session.scalars(keyset_page(select(Tag), Tag.id, after_id, limit)))
+
+    async def delete_orphans(self, tag_ids: Optional[Iterable[int]] = None) -> int:
+        """See TagRepo.delete_orphans."""
+        stmt = delete(Tag).where(*_unused_tags())
+        if tag_ids is not None:
+            tag_ids = set(tag_ids)
+            if not tag_ids:
+                return 0
+            stmt = stmt.where(Tag.id.in_(tag_ids))
+        await self.db_session.flush()
+        result = await self.db_session.execute(stmt.execution_options(synchronize_session=False))
+        return result.rowcount
+
+    async def get_or_create_tags(self, names: Iterable[str]) -> list[Tag]:
+        """See TagRepo.get_or_create_tags."""
+        wanted = _wanted_names(names)
+        if not wanted:
+            return []
+
+        found = await self._find(wanted)
+        missing = [name for name in wanted if name not in found]
+        if missing:
+            for tag in await self._insert(missing):
+                found[tag.name.lower()] = tag
+            raced = [name for name in missing if name not in found]
+            if raced:
+                found.update(await self._find(raced))
+        return [found[name] for name in wanted]
+
+    async def _find(self, names: list[str]) -> dict[str, Tag]:
+        tags = await self.db_session.scalars(select(Tag).where(func.lower(Tag.name).in_(names)))
+        return {tag.name.lower(): tag for tag in tags}
 
+    async def _insert(self, names: list[str]) -> list[Tag]:
+        insert = UPSERT_INSERTS.get(self.db_session.get_bind().dialect.name)
+        if insert is None:
+            tags = [Tag(name=name) for name in names]
+            self.db_session.add_all(tags)
+            await self.db_session.flush()
+            return tags
+        stmt = insert(Tag).values([{"name": name} for name in names]).on_conflict_do_nothing().returning(Tag)
+        return list(await self.db_session.scalars(stmt))
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models.upload_session import UploadSession
+
+
+class UploadSessionRepo:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def create_session(self, upload_session: UploadSession) -> UploadSession:
+        self.db_session.add(upload_session)
+        self.db_session.commit()
+        self.db_session.refresh(upload_session)
+        return upload_session
+
+    def get_session(self, upload_id: str) -> Optional[UploadSession]:
+        return self.db_session.query(UploadSession).filter(UploadSession.id == upload_id).first()
+
+    def advance_offset(self, upload_id: str, old_offset: int, new_offset: int, expires_at: datetime) -> bool:
+        """Move the offset forward, only if nobody else moved it since old_offset was read."""
+        result = self.db_session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.offset == old_offset)
+            .values(offset=new_offset, expires_at=expires_at)
+        )
+        self.db_session.commit()
+        return result.rowcount == 1
+
+    def get_expired_sessions(self, now: datetime) -> list[UploadSession]:
+        return self.db_session.query(UploadSession).filter(UploadSession.expires_at <= now).all()
+
+    def delete_session(self, upload_id: str) -> None:
+        self.db_session.query(UploadSession).filter(UploadSession.id == upload_id).delete()
+        self.db_session.commit()
@@ -1,6 +1,12 @@
-from sqlalchemy.orm import Session
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app.models.video import Video
+from app.repositories.keyset import keyset_page
+from app.repositories.tag_repo import AsyncTagRepo
 from app.schemas.video_schema import Video_Create
+from app.services.tag_service import TagService
 from datetime import datetime, timezone
 
 class Video_Repo:
@@ -22,4 +28,40 @@ class Video_Repo:
         self.db_session.refresh(video)
         return video
 
-    
\ No newline at end of file
+
+class AsyncVideoRepo:
+    """Video_Repo for an AsyncSession, used by async endpoints. Tags are always loaded eagerly."""
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_video(self, video_id: int) -> Optional[Video]:
+        query = select(Video).options(selectinload(Video.tags)).where(Video.id == video_id)
+        return (await self.db_session.scalars(query)).first()
+
+    async def list_videos(self, after_id: Optional[int] = None, limit: Optional[int] = None) -> list[Video]:
+        query = select(Video).options(selectinload(Video.tags)).where(Video.deleted_at == None)
+        return list(await self.db_session.scalars(keyset_page(query, Video.id, after_id, limit)))
+
+    async def update_video(
+        self, video: Video, title: Optional[str], description: Optional[str], tag_names: Optional[list[str]]
+    ) -> Video:
+        """Apply the given fields; unused tags removed from the video are collected. Commits."""
+        if title is not None:
+            video.title = title
+        if description is not None:
+            video.description = description
+        if tag_names is not None:
+            removed_tag_ids = {tag.id for tag in video.tags}
+            video.tags = await AsyncTagRepo(self.db_session).get_or_create_tags(tag_names)
+            await TagService.collect_orphans_async(self.db_session, removed_tag_ids - {tag.id for tag in video.tags})
+        await self.db_session.commit()
+        return video
+
+    async def delete_video(self, video_id: int) -> Optional[Video]:
+        video = await self.get_video(video_id)
+        if video is None:
+            return None
+        video.deleted_at = datetime.now(timezone.utc)
+        await self.db_session.commit()
+        return video
@@ -1,9 +1,13 @@
 # Pydantic Schemas
 # This package contains request/response schemas using Pydantic
 
-from .auth_schema import LoginRequest, SignUpRequest, Token, RoleSchema, UserWithRoles
-from .book_schema import BookBase, BookCreate, BookRead, BookDetail, BookUpload
-from .tag_schema import TagBase, TagRead, TagCreate
+from .auth_schema import LoginRequest, SignUpRequest, Token, RoleSchema, UserWithRoles, Principal, HashOperationStats
+from .book_schema import BookBase, BookCreate, BookRead, BookDetail, BookUpload, BookUploadResult, BulkImportStatus, CatalogCacheStats, FullTextHit, FullTextResult
+from .tag_schema import TagBase, TagRead, TagCreate, TagFacet, TagFacets
+from .job_schema import JobRead, JobQueueStats
+from .upload_schema import UploadSessionCreate, UploadSessionRead
+from .page_schema import Page
+from .profile_schema import RequestProfileRead
 
 
 __all__ = [
@@ -13,15 +17,34 @@ __all__ = [
     "Token",
     "RoleSchema",
     "UserWithRoles",
+    "Principal",
+    "HashOperationStats",
     # Book schemas
     "BookBase",
     "BookCreate",
     "BookRead",
     "BookDetail",
     "BookUpload",
+    "BookUploadResult",
+    "BulkImportStatus",
+    "CatalogCacheStats",
+    "FullTextHit",
+    "FullTextResult",
     # Tag schemas
     "TagBase",
     "TagRead",
     "TagCreate",
+    "TagFacet",
+    "TagFacets",
+    # Job schemas
+    "JobRead",
+    "JobQueueStats",
+    # Upload schemas
+    "UploadSessionCreate",
+    "UploadSessionRead",
+    # Pagination
+    "Page",
+    # Profiling
+    "RequestProfileRead",
 
 ]
\ No newline at end of file
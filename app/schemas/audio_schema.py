@@ -6,6 +6,7 @@ class Audio_Create(BaseModel):
     title: str
     description: Optional[str] = None
     file_path: str  # no tags here — tags handled separately in router
+    content_hash: Optional[str] = None
 
 class Audio_View(BaseModel):
     id: int
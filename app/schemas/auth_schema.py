@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 
 class LoginRequest(BaseModel):
@@ -42,4 +42,24 @@ class UserWithRoles(BaseModel):
     is_active: bool
     roles: List[RoleSchema]
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class Principal(BaseModel):
+    """What auth checks need to know about an account; cached between requests."""
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    username: str
+    roles: List[str]
+    is_active: bool
+    password_changed_at: Optional[int] = None  # Unix time, whole seconds like JWT iat
+
+class HashOperationStats(BaseModel):
+    succeeded: int
+    failed: int  # For login: wrong username or password
+    rejected: int  # Turned away with 503 while the hashing pool was full
+    total_seconds: float
+    max_seconds: float
+    queue_seconds: float  # Spent waiting for a hashing thread
+    avg_seconds: float
+    avg_queue_seconds: float
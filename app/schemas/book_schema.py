@@ -1,6 +1,7 @@
 from pydantic import BaseModel, ConfigDict, field_validator, Field, computed_field
-from typing import List, Optional
+from typing import List, Optional, Union
 from app.schemas.tag_schema import TagRead, TagCreate
+from app.services.cover_service import CoverService
 import re
 
 class BookBase(BaseModel):
@@ -10,6 +11,7 @@ class BookBase(BaseModel):
     extension: str
     tags: List[TagRead] = []
     cover_path: Optional[str] = Field(None)    
+    processing_state: str = "ready"
     model_config = ConfigDict(from_attributes=True, str_strip_whitespace=True)
 
     @computed_field
@@ -19,10 +21,17 @@ class BookBase(BaseModel):
             return None
         return f"/static/covers/{self.cover_path}"
 
+    @computed_field
+    @property
+    def cover_srcset(self) -> Optional[dict[str, str]]:
+        # srcset per media type ("image/webp", "image/jpeg"); None for covers not yet normalized
+        return CoverService.srcsets(self.cover_path)
+
 class BookCreate(BookBase):
     # These are only used internally by the Service/Repo 
     # after the file is saved to the disk.
     file_path: str 
+    content_hash: Optional[str] = None
     tags: List[TagCreate] = []
 
 class BookRead(BookBase):
@@ -37,7 +46,41 @@ class BookRead(BookBase):
 
 class BookDetail(BookRead):
     tags: List[TagRead] = []
+
+class BookUploadResult(BookBase):
+    # Post-upload processing (thumbnail, conversion, tag extraction) runs as this job
+    job_id: Optional[int] = None
     
+class BulkImportStatus(BaseModel):
+    job_id: int
+    status: str  # Job status: pending | running | succeeded | failed
+    manifest: str
+    summary: dict[str, Union[int, float]] = {}
+    last_error: Optional[str] = None
+
+class CatalogCacheStats(BaseModel):
+    hits: int
+    misses: int
+    evictions: int  # Dropped to stay within CATALOG_CACHE_MAX_ENTRIES
+    expirations: int  # Found older than CATALOG_CACHE_TTL_SECONDS
+    invalidations: int  # Catalog writes, each clearing the cache
+    entries: int
+    version: int
+
+class FullTextHit(BaseModel):
+    page: int  # 1-based page of the PDF served by /books/{uid}/read
+    snippet: str  # HTML: page text is escaped, and only matched terms are wrapped in <mark></mark>
+
+class FullTextResult(BaseModel):
+    """
+    A book matching a full-text search. Snippets in hits are safe to render as
+    HTML: the page text is escaped, and <mark></mark> around matched terms is
+    the only markup. Clients showing plain text should strip the tags and unescape.
+    """
+    book: BookBase
+    score: float  # Relevance of the best matching page; only comparable within one search
+    hits: List[FullTextHit] = []
+
 class BookUpload(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=255)
     tags: List[TagCreate] = Field(default_factory=list, max_length=20)
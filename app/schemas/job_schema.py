@@ -0,0 +1,33 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+from datetime import datetime
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    run_after: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobKindStats(BaseModel):
+    succeeded: int
+    failed: int
+    retried: int
+    total_seconds: float
+    max_seconds: float
+    avg_seconds: float
+
+
+class JobQueueStats(BaseModel):
+    queue: dict[str, int]  # Job counts by status in the database
+    kinds: dict[str, JobKindStats]  # Runs in this process since startup
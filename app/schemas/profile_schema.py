@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class StatementTiming(BaseModel):
+    sql: str
+    ms: float
+
+
+class FitzJobTiming(BaseModel):
+    function: str
+    ms: float
+
+
+class RequestProfileRead(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    db_ms: float
+    db_statements: int
+    slowest_sql: Optional[str] = None
+    slowest_sql_ms: float
+    fitz_ms: float
+    fitz_jobs: int
+    bytes_sent: int
+    statements: list[StatementTiming] = []  # Every statement, in the order they ran
+    fitz: list[FitzJobTiming] = []  # Every PyMuPDF job
@@ -8,6 +8,14 @@ class TagBase(BaseModel):
 class TagRead(TagBase):
     id: int
   
+class TagFacet(BaseModel):
+    name: str
+    count: int  # Matching books that have this tag
+
+class TagFacets(BaseModel):
+    total: int  # Books matching the filter
+    facets: list[TagFacet] = []
+
 class TagCreate(TagBase):
     name: str = Field(..., min_length=1, max_length=50)
     
@@ -0,0 +1,23 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Literal, Optional
+
+
+class UploadSessionCreate(BaseModel):
+    kind: Literal["book", "video"]
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0, description="Total size of the file in bytes")
+    content_type: Optional[str] = None
+    title: Optional[str] = Field(None, max_length=255)
+    description: Optional[str] = None
+    tags: str = Field("", description="Comma-separated tags, as on the direct upload endpoints")
+
+
+class UploadSessionRead(BaseModel):
+    id: str
+    kind: str
+    filename: str
+    size: int
+    offset: int
+    expires_at: datetime
+    model_config = ConfigDict(from_attributes=True)
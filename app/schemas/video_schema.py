@@ -6,6 +6,7 @@ class Video_Create(BaseModel):
     title: str
     description: Optional[str] = None
     file_path: str
+    content_hash: Optional[str] = None
 
 class Video_View(BaseModel):
     id: int
@@ -0,0 +1,97 @@
+# app/scripts/backfill_covers.py
+"""
+Re-encode existing book covers into the standard sizes (COVER_WIDTHS, JPEG and WebP).
+
+    python app/scripts/backfill_covers.py [--force] [--missing]
+
+Covers that are already normalized are skipped unless --force is given (use it
+after changing COVER_WIDTHS). --missing also generates covers for books without one.
+"""
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.book import Book
+from app.services.book_service import BookService
+from app.services.cover_service import CoverService, VARIANT_PATTERN
+from app.services.fitz_pool import fitz_pool
+
+COMMIT_EVERY = 100
+
+
+def cover_stem(book: Book) -> str:
+    if book.cover_path:
+        match = VARIANT_PATTERN.match(book.cover_path)
+        return match.group("stem") if match else Path(book.cover_path).stem
+    return book.content_hash[:16] if book.content_hash else book.uid
+
+
+def render(book: Book, stem: str) -> tuple[str, str | None]:
+    """Normalize the current cover file, or rebuild the cover from the book when the file is gone."""
+    cover_dir = settings.COVER_DIR
+    if book.cover_path and (cover_dir / book.cover_path).exists():
+        return stem, fitz_pool.run(CoverService.normalize_file, cover_dir / book.cover_path, cover_dir, stem)
+    book_path = settings.UPLOAD_DIR / book.file_path
+    if not book_path.exists():
+        return stem, None
+    return stem, fitz_pool.run(BookService._generate_thumbnail, book_path, cover_dir, stem, book.extension)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-encode book covers into standard sizes")
+    parser.add_argument("--force", action="store_true", help="Also re-encode covers that are already normalized")
+    parser.add_argument("--missing", action="store_true", help="Generate covers for books without one")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        books = [
+            book for book in db.query(Book).all()
+            if (book.cover_path and (args.force or not CoverService.is_normalized(book.cover_path)))
+            or (not book.cover_path and args.missing)
+        ]
+        # Books sharing a cover (duplicate content) are rendered once
+        by_stem: dict[str, list[Book]] = {}
+        for book in books:
+            by_stem.setdefault(cover_stem(book), []).append(book)
+        print(f"{len(books)} books, {len(by_stem)} covers to process")
+
+        old_names = {book.cover_path for book in books if book.cover_path}
+        updated = failed = 0
+        with ThreadPoolExecutor(max_workers=max(settings.FITZ_WORKERS, 1)) as executor:
+            jobs = [executor.submit(render, group[0], stem) for stem, group in by_stem.items()]
+            for i, job in enumerate(jobs, 1):
+                stem, cover_name = job.result()
+                if not cover_name:
+                    failed += 1
+                    print(f"  failed: {stem}")
+                    continue
+                for book in by_stem[stem]:
+                    book.cover_path = cover_name
+                    updated += 1
+                if i % COMMIT_EVERY == 0:
+                    db.commit()
+                    print(f"  {i}/{len(jobs)} covers")
+        db.commit()
+
+        # Remove the raw images that no book points to anymore
+        removed = 0
+        referenced = {name for (name,) in db.query(Book.cover_path).filter(Book.cover_path.in_(old_names))}
+        for name in old_names - referenced:
+            if not CoverService.is_normalized(name):
+                (settings.COVER_DIR / name).unlink(missing_ok=True)
+                removed += 1
+    finally:
+        db.close()
+        fitz_pool.shutdown()
+
+    print(f"Done: {updated} books updated, {failed} covers failed, {removed} old cover files removed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# app/scripts/backfill_fulltext.py
+"""
+Index the text of books uploaded before full-text search existed.
+
+    python app/scripts/backfill_fulltext.py [--force]
+
+Books that already have indexed pages are skipped unless --force is given.
+Books without extractable text (e.g. scanned PDFs) are retried on every run.
+"""
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.database import SessionLocal, engine, Base
+from app.migrations import upgrade_schema
+from app.models.book import Book
+from app.repositories.fulltext_repo import FullTextRepo
+from app.services.fitz_pool import fitz_pool
+from app.services.fulltext_service import FullTextService
+
+
+def extract(file_path: str) -> tuple[str, list[tuple[int, str]] | None]:
+    book_path = settings.UPLOAD_DIR / file_path
+    if not book_path.exists():
+        return file_path, None
+    return file_path, fitz_pool.run(FullTextService.extract_pages, book_path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extract and index the text of existing books")
+    parser.add_argument("--force", action="store_true", help="Re-index books that are already indexed")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+
+    db = SessionLocal()
+    try:
+        repo = FullTextRepo(db)
+        indexed = set() if args.force else repo.indexed_book_ids()
+        books = [book for book in db.query(Book).all() if book.id not in indexed]
+        # Books sharing a stored file (duplicate content) are extracted once
+        by_file: dict[str, list[int]] = {}
+        for book in books:
+            by_file.setdefault(book.file_path, []).append(book.id)
+        print(f"{len(books)} books, {len(by_file)} files to index")
+
+        updated = failed = empty = 0
+        with ThreadPoolExecutor(max_workers=max(settings.FITZ_WORKERS, 1)) as executor:
+            jobs = [executor.submit(extract, file_path) for file_path in by_file]
+            for i, job in enumerate(jobs, 1):
+                file_path, pages = job.result()
+                if pages is None:
+                    failed += 1
+                    print(f"  missing file: {file_path}")
+                    continue
+                if not pages:
+                    empty += 1
+                for book_id in by_file[file_path]:
+                    repo.replace_pages(book_id, pages)
+                    updated += 1
+                if i % 100 == 0:
+                    print(f"  {i}/{len(jobs)} files")
+    finally:
+        db.close()
+        fitz_pool.shutdown()
+
+    print(f"Done: {updated} books indexed, {empty} files without text, {failed} files missing")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
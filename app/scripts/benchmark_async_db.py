@@ -0,0 +1,175 @@
+# app/scripts/benchmark_async_db.py
+"""
+Compare concurrent book reads inside async handlers: blocking Session versus AsyncSession.
+
+    python app/scripts/benchmark_async_db.py [--books 10000] [--requests 2000] [--concurrency 32]
+
+Builds a throwaway SQLite catalog (or uses --database-url, which must point to
+an empty database) and serves --requests simulated requests from --concurrency
+clients on one event loop. Each request loads one book with its tags and one
+page of a tag search:
+
+  sync   BookRepo on a Session, called from the coroutine as the async book
+         routes used to; the event loop waits for every query
+  async  AsyncBookRepo on an AsyncSession (aiosqlite / asyncpg); other
+         coroutines run while a query is in flight
+
+A ticker coroutine measures how late the event loop wakes it, which is the
+delay any other request (a file stream, a health check) would see. Prints
+throughput, request latency and event loop lag for each path.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, async_database_url
+from app.models import Book, BookTag, Tag
+from app.repositories.book_repo import AsyncBookRepo, BookRepo
+
+TAG_NAMES = [f"tag {i}" for i in range(200)]
+# Interval of the event loop lag ticker
+TICK_SECONDS = 0.001
+
+
+def populate(session_factory, books: int, tags_per_book: int) -> list[str]:
+    rng = random.Random(42)
+    uids = [uuid.uuid4().hex[:8] for _ in range(books)]
+    with session_factory() as db:
+        db.execute(insert(Tag), [{"id": i + 1, "name": name} for i, name in enumerate(TAG_NAMES)])
+        db.execute(insert(Book), [
+            {
+                "id": i + 1,
+                "uid": uid,
+                "title": f"Book {i}",
+                "file_path": f"blobs/{i:02x}/{i}.pdf",
+                "file_type": "application/pdf",
+                "extension": "pdf",
+                "processing_state": "ready",
+            }
+            for i, uid in enumerate(uids)
+        ])
+        db.execute(insert(BookTag), [
+            {"book_id": i + 1, "tag_id": tag_id}
+            for i in range(books)
+            for tag_id in rng.sample(range(1, len(TAG_NAMES) + 1), tags_per_book)
+        ])
+        db.commit()
+    return uids
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def measure(handler, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+    pending = iter(range(requests))
+
+    async def client():
+        for i in pending:
+            started = time.perf_counter()
+            # The server reads the next request from the socket in between; the
+            # latency includes waiting for the event loop to get back to it
+            await asyncio.sleep(0)
+            await handler(i)
+            latencies.append(time.perf_counter() - started)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return {
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "lag_p99": percentile(lags, 0.99),
+        "lag_max": max(lags),
+    }
+
+
+async def run(args, uids: list[str], session_factory, async_session_factory) -> dict:
+    page_size = args.page_size
+
+    async def sync_request(i: int) -> None:
+        with session_factory() as db:
+            repo = BookRepo(db)
+            repo.get_book_by_uid(uids[i % len(uids)])
+            repo.search_book_rows(tags=[TAG_NAMES[i % len(TAG_NAMES)]], limit=page_size)
+
+    async def async_request(i: int) -> None:
+        async with async_session_factory() as db:
+            repo = AsyncBookRepo(db)
+            await repo.get_book_by_uid(uids[i % len(uids)])
+            await repo.search_book_rows(tags=[TAG_NAMES[i % len(TAG_NAMES)]], limit=page_size)
+
+    results = {}
+    for name, handler in (("sync", sync_request), ("async", async_request)):
+        await measure(handler, min(args.requests, 100), args.concurrency)  # Warm up
+        results[name] = await measure(handler, args.requests, args.concurrency)
+        r = results[name]
+        print(f"  {name:<6} {r['throughput']:>8,.0f} req/s  latency p50 {r['p50'] * 1000:6.1f} ms  "
+              f"p95 {r['p95'] * 1000:6.1f} ms  loop lag p99 {r['lag_p99'] * 1000:6.1f} ms  "
+              f"max {r['lag_max'] * 1000:6.1f} ms")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark sync versus async database access from async handlers")
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--tags-per-book", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--database-url", help="Empty database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{tmp}/catalog.db"
+        engine = create_engine(database_url)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        uids = populate(session_factory, args.books, args.tags_per_book)
+        async_engine = create_async_engine(async_database_url(database_url))
+        async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+        print(f"{args.books} books, {args.requests} requests from {args.concurrency} concurrent clients, "
+              f"{async_engine.dialect.driver}")
+
+        async def bench() -> dict:
+            try:
+                return await run(args, uids, session_factory, async_session_factory)
+            finally:
+                await async_engine.dispose()
+
+        results = asyncio.run(bench())
+        engine.dispose()
+
+    print(f"  loop lag p99 {results['sync']['lag_p99'] / max(results['async']['lag_p99'], 1e-6):.0f}x lower with async, "
+          f"throughput {results['async']['throughput'] / results['sync']['throughput']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
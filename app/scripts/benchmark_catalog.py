@@ -0,0 +1,132 @@
+# app/scripts/benchmark_catalog.py
+"""
+Compare catalog listing throughput: ORM + pydantic versus column projection.
+
+    python app/scripts/benchmark_catalog.py [--books 10000] [--page-size 1000] [--rounds 5]
+
+Builds a throwaway SQLite catalog (or uses --database-url, which must point to
+an empty database) and pages through it with both listing paths:
+
+  orm         BookRepo.search_books with joinedload tags, BookBase.model_validate
+              per row, then response_model validation and encoding as FastAPI does
+  projection  BookRepo.search_book_rows with tags aggregated in SQL, plain dicts,
+              encoded with orjson when installed (json otherwise)
+
+Prints rows/sec for each path. Caches are not involved.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Book, BookTag, Tag
+from app.repositories.book_repo import BookRepo
+from app.schemas import BookBase
+from app.services import json_codec
+from app.services.book_service import BookService
+
+TAG_NAMES = [f"tag {i}" for i in range(200)]
+
+
+def populate(session_factory, books: int, tags_per_book: int) -> None:
+    rng = random.Random(42)
+    with session_factory() as db:
+        db.execute(insert(Tag), [{"id": i + 1, "name": name} for i, name in enumerate(TAG_NAMES)])
+        db.execute(insert(Book), [
+            {
+                "id": i + 1,
+                "uid": uuid.uuid4().hex[:8],
+                "title": f"Book {i} about {rng.choice(TAG_NAMES)}",
+                "file_path": f"blobs/{i:02x}/{i}.pdf",
+                "file_type": "application/pdf",
+                "extension": "pdf",
+                "cover_path": f"{i:016x}-640.jpg" if i % 3 else None,
+                "processing_state": "ready",
+            }
+            for i in range(books)
+        ])
+        db.execute(insert(BookTag), [
+            {"book_id": i + 1, "tag_id": tag_id}
+            for i in range(books)
+            for tag_id in rng.sample(range(1, len(TAG_NAMES) + 1), tags_per_book)
+        ])
+        db.commit()
+
+
+def run_orm(db, page_size: int) -> int:
+    repo = BookRepo(db)
+    adapter = TypeAdapter(list[BookBase])
+    rows = 0
+    after_id = None
+    while True:
+        books = repo.search_books(after_id=after_id, limit=page_size)
+        if not books:
+            return rows
+        items = [BookBase.model_validate(book) for book in books]
+        # What FastAPI does with a list[BookBase] response_model
+        json.dumps(adapter.dump_python(adapter.validate_python(items), mode="json")).encode()
+        rows += len(books)
+        after_id = books[-1].id
+
+
+def run_projection(db, page_size: int) -> int:
+    repo = BookRepo(db)
+    rows = 0
+    after_id = None
+    while True:
+        listing = repo.search_book_rows(after_id=after_id, limit=page_size)
+        if not listing:
+            return rows
+        json_codec.dumps([BookService._listing_item(row) for row in listing])
+        rows += len(listing)
+        after_id = listing[-1].id
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark catalog listing paths")
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--tags-per-book", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--database-url", help="Empty database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(args.database_url or f"sqlite:///{tmp}/catalog.db")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        populate(session_factory, args.books, args.tags_per_book)
+        print(f"{args.books} books, {args.tags_per_book} tags each, pages of {args.page_size}, "
+              f"encoder: {'orjson' if json_codec.orjson else 'json'}")
+
+        results = {}
+        for name, run in (("orm", run_orm), ("projection", run_projection)):
+            run(session_factory(), args.page_size)  # Warm up
+            best = None
+            for _ in range(args.rounds):
+                # A fresh session per round, as each request gets
+                with session_factory() as db:
+                    started = time.perf_counter()
+                    rows = run(db, args.page_size)
+                    elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = rows / best
+            print(f"  {name:<11} {rows / best:>10,.0f} rows/s  ({best * 1000:.0f} ms for {rows} rows, best of {args.rounds})")
+        engine.dispose()
+
+    print(f"  speed-up    {results['projection'] / results['orm']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
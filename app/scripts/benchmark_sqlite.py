@@ -0,0 +1,154 @@
+# app/scripts/benchmark_sqlite.py
+"""
+Compare catalog reads during concurrent writes: SQLite defaults versus the tuned profile.
+
+    python app/scripts/benchmark_sqlite.py [--books 10000] [--readers 4] [--writers 1] [--write-rate 20] [--batch 1] [--seconds 10]
+
+Builds a throwaway SQLite catalog for each profile (in --dir, to test the disk the
+library runs on) and, for --seconds, runs --readers threads that page through
+listings and load books by uid while --writers threads insert books with tags,
+up to --write-rate commits/sec each (0: as fast as possible). A commit holds one
+book as an upload does, or --batch books as bulk imports do (BULK_IMPORT_BATCH_SIZE):
+
+  default  create_engine with SQLAlchemy's defaults: rollback journal,
+           synchronous=FULL, 2 MB page cache
+  tuned    engine_options and apply_sqlite_profile from app.database: WAL,
+           synchronous=NORMAL, mmap, larger cache, busy_timeout, pool size
+
+Prints reads/sec, read latency, commits/sec and "database is locked" errors.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, apply_sqlite_profile, engine_options
+from app.models import Book, BookTag
+from app.repositories.book_repo import BookRepo
+from app.scripts.benchmark_catalog import TAG_NAMES, populate
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def reader(session_factory, books: int, page_size: int, stop: threading.Event, stats: dict, seed: int) -> None:
+    rng = random.Random(seed)
+    with session_factory() as db:
+        uids = [row.uid for row in BookRepo(db).search_book_rows(limit=200)]
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with session_factory() as db:
+                repo = BookRepo(db)
+                repo.search_book_rows(after_id=rng.randrange(books), limit=page_size)
+                repo.get_book_by_uid(rng.choice(uids))
+        except OperationalError:
+            stats["read_errors"] += 1
+            continue
+        stats["read_latencies"].append(time.perf_counter() - started)
+
+
+def writer(session_factory, write_rate: float, batch: int, stop: threading.Event, stats: dict, seed: int) -> None:
+    rng = random.Random(seed)
+    next_write = time.perf_counter()
+    while not stop.is_set():
+        if write_rate:
+            next_write += 1 / write_rate
+            stop.wait(max(next_write - time.perf_counter(), 0))
+        started = time.perf_counter()
+        try:
+            with session_factory() as db:
+                for _ in range(batch):
+                    book_id = db.execute(insert(Book).values(
+                        uid=uuid.uuid4().hex[:8],
+                        title=f"New book {rng.random()}",
+                        file_path="blobs/new.pdf",
+                        file_type="application/pdf",
+                        extension="pdf",
+                        processing_state="ready",
+                    )).inserted_primary_key[0]
+                    db.execute(insert(BookTag), [
+                        {"book_id": book_id, "tag_id": tag_id}
+                        for tag_id in rng.sample(range(1, len(TAG_NAMES) + 1), 3)
+                    ])
+                db.commit()
+        except OperationalError:
+            stats["write_errors"] += 1
+            continue
+        stats["write_latencies"].append(time.perf_counter() - started)
+
+
+def run_profile(engine, args) -> dict:
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    populate(session_factory, args.books, args.tags_per_book)
+
+    stats = {"read_latencies": [], "read_errors": 0, "write_latencies": [], "write_errors": 0}
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=reader, args=(session_factory, args.books, args.page_size, stop, stats, i))
+        for i in range(args.readers)
+    ] + [
+        threading.Thread(target=writer, args=(session_factory, args.write_rate, args.batch, stop, stats, 1000 + i))
+        for i in range(args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SQLite catalog reads during concurrent writes")
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--tags-per-book", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--write-rate", type=float, default=20.0)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--dir", help="Directory for the test databases (default: a temporary directory)")
+    args = parser.parse_args()
+
+    print(f"{args.books} books, {args.readers} reader and {args.writers} writer threads "
+          f"({args.write_rate:g} commits/s each, {args.batch} book(s) per commit) for {args.seconds:g}s")
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for name in ("default", "tuned"):
+            url = f"sqlite:///{tmp}/{name}.db"
+            if name == "default":
+                engine = create_engine(url)
+            else:
+                engine = create_engine(url, **dict(engine_options(url), echo=False))
+                apply_sqlite_profile(engine)
+            stats = run_profile(engine, args)
+            latencies = stats["read_latencies"]
+            writes = stats["write_latencies"]
+            results[name] = len(latencies) / args.seconds
+            print(f"  {name:<8} {len(latencies) / args.seconds:>7,.0f} reads/s  "
+                  f"read p50 {percentile(latencies, 0.5) * 1000:5.1f} ms  p99 {percentile(latencies, 0.99) * 1000:6.1f} ms  "
+                  f"| {len(writes) / args.seconds:>5,.0f} commits/s  p50 {percentile(writes, 0.5) * 1000:5.1f} ms  "
+                  f"p99 {percentile(writes, 0.99) * 1000:6.1f} ms  | locked errors {stats['read_errors'] + stats['write_errors']}")
+
+    print(f"  reads/s    {results['tuned'] / max(results['default'], 1e-9):.1f}x with the tuned profile")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# app/scripts/bulk_import.py
+"""
+Import a directory or ZIP of PDF/EPUB books.
+
+    python app/scripts/bulk_import.py /media/usb/library --tags "grade 5"
+
+Progress is saved to a manifest after every batch; running the same command
+again after an interruption skips the books that were already imported.
+"""
+import argparse
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.database import SessionLocal, engine, Base
+from app.migrations import upgrade_schema
+import app.models  # noqa: F401  Register models with Base
+from app.services.fitz_pool import fitz_pool
+from app.services.import_service import BulkImportService
+
+
+def print_progress(summary: dict) -> None:
+    done = summary["imported"] + summary["duplicate"] + summary["failed"]
+    rate = done / summary["seconds"] if summary["seconds"] else 0.0
+    print(
+        f"[{done}/{summary['total']}] imported={summary['imported']} duplicate={summary['duplicate']} "
+        f"failed={summary['failed']} ({rate:.1f} files/s)",
+        flush=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import PDF/EPUB books into the library")
+    parser.add_argument("source", type=Path, help="Directory or ZIP file to import")
+    parser.add_argument("--manifest", type=Path, help="Progress file (default: one per source under BULK_IMPORT_MANIFEST_DIR)")
+    parser.add_argument("--workers", type=int, default=settings.BULK_IMPORT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_IMPORT_BATCH_SIZE)
+    parser.add_argument("--tags", default="", help="Comma-separated tags added to every imported book")
+    parser.add_argument("--preconvert", action="store_true", help="Convert EPUBs to PDF now instead of on first read")
+    args = parser.parse_args()
+
+    if not args.source.exists():
+        print(f"Source not found: {args.source}")
+        return 1
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    settings.COVER_DIR.mkdir(parents=True, exist_ok=True)
+
+    db = SessionLocal()
+    try:
+        service = BulkImportService(
+            db,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            preconvert=args.preconvert or None,
+            extra_tags=[t.strip() for t in args.tags.split(",") if t.strip()],
+        )
+        manifest_path = args.manifest or service.default_manifest_path(args.source)
+        print(f"Importing {args.source} (manifest: {manifest_path})")
+        summary = service.run(args.source, manifest_path, on_progress=print_progress)
+    finally:
+        db.close()
+        fitz_pool.shutdown()
+
+    print(
+        f"Done in {summary['seconds']}s: imported={summary['imported']} "
+        f"duplicate={summary['duplicate']} failed={summary['failed']}"
+    )
+    if summary["failed"]:
+        print(f"Failed files are listed in {manifest_path}; run again to retry them")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
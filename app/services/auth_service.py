@@ -1,37 +1,109 @@
+import asyncio
+import time
+from calendar import timegm
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import HTTPException
 from jose import jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, object_session
 from app.config import settings
 from app.models.account import Account
-from app.schemas.auth_schema import SignUpRequest
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.models.job import utcnow
+from app.schemas.auth_schema import Principal, SignUpRequest
+from app.services.password_hasher import password_hasher
+from app.services.principal_cache import principal_cache
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
 class AuthService:
+    # Blocking; for scripts. Request handlers use the async versions below.
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_hasher.verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return password_hasher.hash(password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.verify_async(plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        return await password_hasher.hash_async(password)
+
+    @staticmethod
+    def _release_connection(db: Session) -> None:
+        """
+        End the read transaction before a slow hash, so the request does not hold
+        a pooled connection while it waits; the session reconnects when next used.
+        """
+        db.commit()
+
+    @staticmethod
+    async def check_password(db: Session, account: Account, password: str) -> bool:
+        hashed_password = account.hashed_password
+        AuthService._release_connection(db)
+        return await AuthService.verify_password_async(password, hashed_password)
+
+    @staticmethod
+    async def check_recovery_code(db: Session, account: Account, code: str) -> bool:
+        recovery_code_hash = account.recovery_code_hash
+        AuthService._release_connection(db)
+        return await AuthService.verify_password_async(code, recovery_code_hash)
+
+    @staticmethod
+    async def set_password(account: Account, password: str) -> None:
+        """Hash and store a new password; tokens issued before now stop working. Not committed."""
+        db = object_session(account)
+        if db is not None:
+            AuthService._release_connection(db)
+        account.hashed_password = await AuthService.get_password_hash_async(password)
+        account.password_changed_at = utcnow()
 
     @staticmethod
     def get_user_by_username(db: Session, username: str) -> Optional[Account]:
         return db.query(Account).filter(Account.username == username).first()
 
     @staticmethod
-    def create_user(db: Session, signup_data: SignUpRequest) -> Account:
-        hashed_password = AuthService.get_password_hash(signup_data.password)
+    def get_user_by_id(db: Session, account_id: int) -> Optional[Account]:
+        return db.query(Account).options(joinedload(Account.roles)).filter(Account.id == account_id).first()
+
+    @staticmethod
+    def get_principal(db: Session, account_id: int) -> Optional[Principal]:
+        """The principal for an account id, from the principal cache when possible."""
+        principal = principal_cache.get(account_id)
+        if principal is not None:
+            return principal
+        account = AuthService.get_user_by_id(db, account_id)
+        if account is None:
+            return None
+        changed_at = account.password_changed_at
+        principal = Principal(
+            id=account.id,
+            username=account.username,
+            roles=[role.name for role in account.roles],
+            is_active=bool(account.is_active),
+            password_changed_at=timegm(changed_at.utctimetuple()) if changed_at else None,
+        )
+        principal_cache.put(principal)
+        return principal
+
+    @staticmethod
+    async def create_user(db: Session, signup_data: SignUpRequest, recovery_code: Optional[str] = None) -> Account:
+        AuthService._release_connection(db)
+        # Both hashes are computed at the same time
+        hashes = [AuthService.get_password_hash_async(signup_data.password)]
+        if recovery_code is not None:
+            hashes.append(AuthService.get_password_hash_async(recovery_code))
+        hashed_password, *recovery_code_hash = await asyncio.gather(*hashes)
         new_account = Account(
             username=signup_data.username,
             hashed_password=hashed_password,
             first_name=signup_data.first_name,
             last_name=signup_data.last_name,
-            is_active=True
+            is_active=True,
+            recovery_code_hash=recovery_code_hash[0] if recovery_code_hash else None,
         )
         db.add(new_account)
         db.commit()
@@ -39,22 +111,27 @@ class AuthService:
         return new_account
 
     @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> Optional[Account]:
+    async def authenticate_user(db: Session, username: str, password: str) -> Optional[Account]:
+        started = time.perf_counter()
         account = db.query(Account).filter(
             Account.username == username,
             Account.is_active == True
         ).first()
-        if not account:
-            return None
-        if not AuthService.verify_password(password, account.hashed_password):
-            return None
+        try:
+            if account and not await AuthService.check_password(db, account, password):
+                account = None
+        except HTTPException:
+            password_hasher.record("login", "rejected", 0.0)
+            raise
+        password_hasher.record("login", "succeeded" if account else "failed", time.perf_counter() - started)
         return account
 
     @staticmethod
     def create_access_token(data: dict) -> str:
         to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
+        issued_at = datetime.utcnow()
+        expire = issued_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        to_encode.update({"exp": expire, "iat": issued_at})
         return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
     @staticmethod
@@ -68,11 +145,12 @@ class AuthService:
         return AuthService.create_access_token(token_data)
 
     @staticmethod
-    def reset_password(db: Session, username: str, new_password: str) -> Account:
+    async def reset_password(db: Session, username: str, new_password: str) -> Account:
         user = db.query(Account).filter(Account.username == username).one_or_none()
         if not user:
             raise ValueError("User not found")
-        user.hashed_password = AuthService.get_password_hash(new_password)
+        await AuthService.set_password(user, new_password)
         db.commit()
         db.refresh(user)
+        principal_cache.invalidate(user.id)
         return user
\ No newline at end of file
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional
+from sqlalchemy.orm import Session
+from app.repositories.blob_repo import BlobRepo
+
+BLOB_DIR_NAME = "blobs"
+COPY_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class BlobWriter:
+    """Streams an upload to a temp file while computing its SHA-256."""
+
+    def __init__(self, store: "BlobStore", extension: str):
+        self.store = store
+        self.extension = extension.lower()
+        self.size = 0
+        self._hash = hashlib.sha256()
+        tmp_dir = store.root / BLOB_DIR_NAME / ".tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = tmp_dir / f"{uuid.uuid4().hex}.part"
+        self._file = self.tmp_path.open("wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def discard(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+    def finish(self) -> str:
+        """Close the temp file and return the SHA-256 of everything written."""
+        self._file.close()
+        return self._hash.hexdigest()
+
+    def commit(self) -> tuple[str, str]:
+        """Store the content, reusing an existing identical blob. Returns (sha256, relative path)."""
+        sha256 = self.finish()
+        blob, _ = self.store.repo.acquire(self.store.namespace, sha256, self.extension, self.size)
+        return sha256, self.store.place(self.tmp_path, sha256, blob.extension)
+
+
+class BlobStore:
+    """
+    Content-addressed file storage with upload deduplication.
+    Files live under `<root>/blobs/<sha[:2]>/<sha>.<ext>`. Each stored file has a
+    row in `blobs` with a reference count; the file is removed only when the
+    last row referencing it releases it.
+    """
+
+    def __init__(self, db_session: Session, namespace: str, root: Path):
+        self.repo = BlobRepo(db_session)
+        self.namespace = namespace
+        self.root = Path(root)
+
+    @staticmethod
+    def relative_path(sha256: str, extension: str) -> str:
+        return f"{BLOB_DIR_NAME}/{sha256[:2]}/{sha256}.{extension}"
+
+    def place(self, tmp_path: Path, sha256: str, extension: str) -> str:
+        """Move a finished temp file to its content address. Returns the relative path."""
+        relative_path = self.relative_path(sha256, extension)
+        final_path = self.root / relative_path
+        if final_path.exists():
+            # Duplicate upload: keep the stored copy, drop the new one
+            tmp_path.unlink()
+        else:
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, final_path)
+        return relative_path
+
+    def open_writer(self, extension: str) -> BlobWriter:
+        return BlobWriter(self, extension)
+
+    def save_fileobj(self, fileobj: BinaryIO, extension: str) -> tuple[str, str]:
+        """Copy a file object into the store. Returns (sha256, relative path)."""
+        writer = self.open_writer(extension)
+        try:
+            while chunk := fileobj.read(COPY_CHUNK_SIZE):
+                writer.write(chunk)
+        except Exception:
+            writer.discard()
+            raise
+        return writer.commit()
+
+    def release(self, sha256: str) -> Optional[Path]:
+        """Drop a reference. Deletes the file and returns its path once nothing references it."""
+        extension = self.repo.release(self.namespace, sha256)
+        if extension is None:
+            return None
+        path = self.root / self.relative_path(sha256, extension)
+        if path.exists():
+            path.unlink()
+        return path
@@ -2,17 +2,38 @@ from importlib.metadata import metadata
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
 import uuid
-from typing import Optional
-from app.repositories import BookRepo
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from app.repositories import AsyncBookRepo, BookRepo, FullTextRepo, JobRepo
 from app import settings
-from app.schemas import BookDetail, BookRead, BookCreate, BookUpload, BookBase, TagCreate
+from app.dependencies.pagination import PageParams
+from app.models.job import Job
+from app.schemas import BookDetail, BookRead, BookCreate, BookUpload, BookBase, BookUploadResult, Page, TagCreate
+from app.services import json_codec
+from app.services.blob_store import BlobStore
+from app.services.catalog_cache import catalog_cache
+from app.services.conversion_cache import conversion_cache
+from app.services.cover_service import CoverService
+from app.services.fitz_pool import fitz_pool
+from app.services.fulltext_service import FullTextService
+from app.services.job_service import job_queue
+from app.services.metrics import upload_phase_seconds
+from app.services.tag_index import tag_index
+import asyncio
+import io
+import logging
+import os
 import re
+import time
 import fitz  # PyMuPDF
-import asyncio
+
+logger = logging.getLogger(__name__)
 
 class BookService:
-    def __init__(self, book_repo: BookRepo):
+    def __init__(self, book_repo: BookRepo, async_repo: Optional[AsyncBookRepo] = None):
         self.book_repo = book_repo
+        # Required by the async methods (get_book_by_uid_async, update_book, delete_book)
+        self.async_repo = async_repo
         self.cover_path = settings.COVER_DIR
         self.upload_path = settings.UPLOAD_DIR
         self.max_upload_size = settings.MAX_UPLOAD_SIZE
@@ -27,32 +48,107 @@ class BookService:
         if not book:
             return None
         return BookDetail.model_validate(book)
+
+    async def get_book_by_uid_async(self, book_uid: str) -> Optional[BookDetail]:
+        book = await self.async_repo.get_book_by_uid(book_uid)
+        if not book:
+            return None
+        return BookDetail.model_validate(book)
     
     
     
-    def get_all_books(self) -> list[BookRead]:
-        books = self.book_repo.get_all_books()
-        return [BookRead.model_validate(book) for book in books]
+    @staticmethod
+    def _listing_item(row) -> dict:
+        """BookBase as a plain dict, built straight from a listing row (see BookRepo.search_book_rows)."""
+        tags = row.tags
+        if isinstance(tags, (str, bytes)):
+            tags = json_codec.loads(tags)
+        cover_path = row.cover_path
+        return {
+            "title": row.title,
+            "uid": row.uid,
+            "file_type": row.file_type,
+            "extension": row.extension,
+            "tags": tags,
+            "cover_path": cover_path,
+            "processing_state": row.processing_state,
+            "cover_url": f"/static/covers/{cover_path}" if cover_path else None,
+            "cover_srcset": CoverService.srcsets(cover_path),
+        }
+
+    def get_all_books(self, page: PageParams) -> Page[dict]:
+        """All books, one page at a time, as BookRead-shaped dicts ready for JSON encoding."""
+        def load() -> Page[dict]:
+            rows = self.book_repo.search_book_rows(after_id=page.after_id, limit=page.fetch_limit)
+            return page.paginate(rows, self._listing_item)
+        return catalog_cache.get_or_load(("all", page.after_id, page.limit), load)
+
+    @staticmethod
+    def _normalize_tags(tags: Optional[list[str]]) -> Optional[list[str]]:
+        return sorted({t.strip().lower() for t in tags}) if tags else None
     
     def search_books(
         self,
+        page: PageParams,
         title: Optional[str] = None,
         tags: Optional[list[str]] = None,
         file_type: Optional[str] = None,
-        extension: Optional[str] = None
-    ) -> list[BookBase]:
+        extension: Optional[str] = None,
+        tag_mode: str = "any",
+        exclude_tags: Optional[list[str]] = None
+    ) -> Page[dict]:
         """
         Dynamic search for books with multiple optional filters.
-        If no filters are provided, returns all books.
+        If no filters are provided, returns all books, one page at a time.
+        Items are BookBase-shaped dicts read through column projection, without ORM objects.
+        Tag-only searches are answered from the in-memory tag index; the page
+        of ids it returns is then loaded by primary key. Results are cached
+        per normalized set of filters until the catalog changes.
         """
-        books = self.book_repo.search_books(
-            title=title,
-            tags=tags,
-            file_type=file_type,
-            extension=extension
+        # Equivalent filters share one cache entry
+        title = " ".join(title.split()) if title else None
+        tags = self._normalize_tags(tags)
+        exclude_tags = self._normalize_tags(exclude_tags)
+        key = (
+            "search",
+            title.lower() if title else None,
+            tuple(tags or ()),
+            tag_mode if tags else None,
+            tuple(exclude_tags or ()),
+            file_type.strip().lower() if file_type else None,
+            extension.strip().lower() if extension else None,
+            page.after_id,
+            page.limit,
         )
-        return [BookBase.model_validate(book) for book in books]
+
+        def load() -> Page[dict]:
+            if (tags or exclude_tags) and not (title or file_type or extension):
+                tag_index.ensure_fresh(self.book_repo.db_session)
+                matches = tag_index.filter(tags, tag_mode, exclude_tags)
+                book_ids = tag_index.page_ids(matches, page.after_id, page.fetch_limit)
+                rows = self.book_repo.search_book_rows(book_ids=book_ids)
+            else:
+                rows = self.book_repo.search_book_rows(
+                    title=title,
+                    tags=tags,
+                    file_type=file_type,
+                    extension=extension,
+                    after_id=page.after_id,
+                    limit=page.fetch_limit,
+                    tag_mode=tag_mode,
+                    exclude_tags=exclude_tags
+                )
+            return page.paginate(rows, self._listing_item)
+
+        return catalog_cache.get_or_load(key, load)
     
+    @staticmethod
+    def _title_from_filename(filename: str) -> str:
+        # Get filename without extension: "lesson_1.pdf" -> "lesson_1"
+        raw_name = Path(filename).stem
+        # Replace underscores/dashes with spaces and capitalize for a "clean" look
+        return raw_name.replace('_', ' ').replace('-', ' ').title().strip()
+
     @staticmethod
     def _file_name_generator(title: str, uid: str, extension: str) -> str:
         """Generate a safe filename from title, UID and extension"""
@@ -60,29 +156,111 @@ class BookService:
         clean_title = re.sub(r'[-\s]+', '_', clean_title)
         
         return f"{clean_title}_{uid}.{extension}"
-    def _convert_epub_to_pdf(self, epub_path: Path, pdf_path: Path) -> bool:
+    @staticmethod
+    def _current_rss_bytes() -> int:
+        """Resident memory of this process, 0 where /proc is not available."""
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    @staticmethod
+    def _render_pages_to_pdf(doc: fitz.Document, start: int, end: int) -> bytes:
+        """Render pages start..end-1 of any fitz document into a standalone PDF."""
+        buffer = io.BytesIO()
+        writer = fitz.DocumentWriter(buffer)
+        for page_number in range(start, end):
+            page = doc.load_page(page_number)
+            device = writer.begin_page(page.rect)
+            # Page.run() rejects DocumentWriter devices in current PyMuPDF, so call MuPDF directly
+            fitz.mupdf.fz_run_page(page.this, device.this, fitz.mupdf.FzMatrix(), fitz.mupdf.FzCookie())
+            writer.end_page()
+        writer.close()
+        return buffer.getvalue()
+
+    @staticmethod
+    def _convert_epub_to_pdf(epub_path: Path, pdf_path: Path) -> Optional[dict]:
+        """
+        Convert an EPUB to PDF and return conversion stats, or None on failure.
+        In streaming mode pages are converted in batches and appended to a temp file
+        with incremental saves, so only one batch is in memory at a time. The temp
+        file is renamed into place once complete.
+        """
+        # Unique temp name: another worker process may be converting the same book
+        tmp_path = pdf_path.with_name(f"{pdf_path.name}.{uuid.uuid4().hex[:8]}.part")
+        started = time.perf_counter()
+        peak_rss = BookService._current_rss_bytes()
         try:
             doc = fitz.open(str(epub_path))
-            # convert_to_pdf() returns bytes of a PDF
-            pdf_bytes = doc.convert_to_pdf()
+            page_count = doc.page_count
+
+            if settings.EPUB_CONVERT_MODE == "whole":
+                # convert_to_pdf() returns bytes of the whole PDF
+                pdf_bytes = doc.convert_to_pdf()
+                peak_rss = max(peak_rss, BookService._current_rss_bytes())
+                with open(str(tmp_path), "wb") as f:
+                    f.write(pdf_bytes)
+                del pdf_bytes
+                batches = 1
+            else:
+                batch_pages = max(settings.EPUB_CONVERT_BATCH_PAGES, 1)
+                max_rss = settings.EPUB_CONVERT_MAX_RSS_MB * 1024 * 1024
+                batches = 0
+                start = 0
+                while start < page_count:
+                    end = min(start + batch_pages, page_count)
+                    chunk = fitz.open("pdf", BookService._render_pages_to_pdf(doc, start, end))
+                    if start == 0:
+                        chunk.save(str(tmp_path), garbage=1, deflate=True)
+                    else:
+                        # Reopen per batch so earlier pages are not kept in memory
+                        out = fitz.open(str(tmp_path))
+                        out.insert_pdf(chunk)
+                        out.saveIncr()
+                        out.close()
+                    chunk.close()
+                    batches += 1
+                    start = end
+
+                    rss = BookService._current_rss_bytes()
+                    peak_rss = max(peak_rss, rss)
+                    if max_rss and rss > max_rss and batch_pages > 1:
+                        batch_pages = max(batch_pages // 2, 1)
+
+                # Batches are rendered without links, so restore the table of contents
+                toc = doc.get_toc()
+                if toc:
+                    out = fitz.open(str(tmp_path))
+                    try:
+                        out.set_toc(toc)
+                        out.saveIncr()
+                    except Exception as e:
+                        logger.warning("Failed to copy EPUB table of contents: %s", e)
+                    out.close()
+
             doc.close()
-            
-            with open(str(pdf_path), "wb") as f:
-                f.write(pdf_bytes)
-            
-            print(f"EPUB converted to PDF: {pdf_path.exists()}")
-            return True
+            os.replace(tmp_path, pdf_path)
+
+            stats = {
+                "pages": page_count,
+                "batches": batches,
+                "seconds": round(time.perf_counter() - started, 3),
+                "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+                "size_mb": round(pdf_path.stat().st_size / (1024 * 1024), 2),
+            }
+            logger.info("EPUB converted to PDF: %s %s", pdf_path.name, stats)
+            return stats
         except Exception as e:
-            print(f"EPUB to PDF failed: {e}")
-            return False
+            logger.warning("EPUB to PDF failed: %s", e)
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return None
     
-    async def upload_book(self, metadata: BookUpload, file: UploadFile, cover: Optional[UploadFile] = None) -> BookBase:
+    async def upload_book(self, metadata: BookUpload, file: UploadFile, cover: Optional[UploadFile] = None) -> BookUploadResult:
         """Upload book and cover with validation and error handling"""
         if not metadata.title or not metadata.title.strip():
-            # Get filename without extension: "lesson_1.pdf" -> "lesson_1"
-            raw_name = Path(file.filename).stem 
-            # Replace underscores/dashes with spaces and capitalize for a "clean" look
-            metadata.title = raw_name.replace('_', ' ').replace('-', ' ').title().strip()
+            metadata.title = self._title_from_filename(file.filename)
         # Validate file parameter
         if not file:
             raise HTTPException(status_code=400, detail="Book file is required")
@@ -108,42 +286,45 @@ class BookService:
         # Validate book file content type from header
         self._validate_book_content(file_header, file_extension)
         
-        # Generate unique ID and filename
+        # Generate unique ID
         book_uid = str(uuid.uuid4())[:8]
-        file_name = self._file_name_generator(metadata.title, book_uid, file_extension)
-        file_path = self.upload_path / file_name
+        blob_store = BlobStore(self.book_repo.db_session, "books", self.upload_path)
         
         # Variables for cleanup
-        saved_file_path = None
+        content_hash = None
         saved_cover_path = None
         
         try:
-            print("1. starting file save")
-            # Save book file while checking size
-            total_size = len(file_header)
-            with file_path.open("wb") as buffer:
+            # Save book file while checking size, hashing it as it is written
+            save_started = time.perf_counter()
+            writer = blob_store.open_writer(file_extension)
+            try:
                 # Write the header we already read
-                buffer.write(file_header)
+                writer.write(file_header)
                 
                 # Stream the rest of the file in chunks
                 while True:
                     chunk = await file.read(8192)  # 8KB chunks
                     if not chunk:
                         break
-                    total_size += len(chunk)
-                    if total_size > self.max_upload_size:
+                    if writer.size + len(chunk) > self.max_upload_size:
+                        total_size = writer.size + len(chunk)
                         raise HTTPException(
                             status_code=400,
                             detail=f"File too large ({total_size / (1024*1024):.2f}MB). Max: {self.max_upload_size / (1024*1024):.0f}MB"
                         )
-                    buffer.write(chunk)
+                    writer.write(chunk)
+            except Exception:
+                writer.discard()
+                raise
             
-            saved_file_path = file_path
-            print("2. file saved")
+            # Identical content already stored is reused instead of written again
+            # Blob store and repository calls use the sync session, so they run in a worker thread
+            content_hash, file_name = await asyncio.to_thread(writer.commit)
+            upload_phase_seconds.labels("save").observe(time.perf_counter() - save_started)
 
             # Handle cover upload if provided
             if cover and cover.filename:
-                print("3a manual cover branch")
                 # Validate cover extension
                 if '.' not in cover.filename:
                     raise HTTPException(status_code=400, detail="Cover file must have an extension")
@@ -186,30 +367,10 @@ class BookService:
                         buffer.write(chunk)
                 
                 saved_cover_path = cover_path
-            else: 
-                cover_name = f"{book_uid}.jpg"
-                gen_cover_path = self.cover_path / cover_name
-                await asyncio.get_event_loop().run_in_executor(
-                    None, self._generate_thumbnail, file_path, gen_cover_path, file_extension
-                )
-                saved_cover_path = gen_cover_path
+            else:
+                # Generated by the post-upload job
+                cover_name = None
 
-                if file_extension == "epub":
-                    pdf_name = file_name.replace(".epub", ".pdf")
-                    pdf_path = self.upload_path / pdf_name
-                    await asyncio.get_event_loop().run_in_executor(
-                        None, self._convert_epub_to_pdf, file_path, pdf_path
-                    )
-            
-            extracted_tags = []
-            if file_extension == "epub":
-                extracted_tags = self._extract_epub_tags(file_path)
-            all_tag_names = {t.name.lower(): t for t in metadata.tags}
-            for t_name in extracted_tags:
-                if t_name.lower() not in all_tag_names:
-                    all_tag_names[t_name.lower()] = TagCreate(name=t_name)
-            
-            final_tags = list(all_tag_names.values())
             # Create book data for database
             book_data = BookCreate(
                 title=metadata.title,
@@ -218,24 +379,36 @@ class BookService:
                 extension=file_extension,
                 file_path=file_name,  # Store relative path, not absolute
                 cover_path=cover_name,  # Store relative path, not absolute
-                tags=final_tags,
+                content_hash=content_hash,
+                tags=metadata.tags,
+                processing_state="pending",
             )
             
             # Save to database
-            created_book = self.book_repo.create_book(book_data)
-            return BookBase.model_validate(created_book)
+            with upload_phase_seconds.time("db_commit"):
+                created_book = await asyncio.to_thread(self.book_repo.create_book, book_data)
+                result = BookUploadResult.model_validate(created_book)
+
+                # Thumbnail, EPUB conversion and tag extraction run in the background
+                job = await asyncio.to_thread(job_queue.enqueue, self.book_repo.db_session, "process_book", {
+                    "book_uid": book_uid,
+                    "generate_thumbnail": cover_name is None,
+                })
+
+            result.job_id = job.id
+            return result
             
         except HTTPException:
             # Clean up uploaded files on validation error
-            if saved_file_path and saved_file_path.exists():
-                saved_file_path.unlink()
+            if content_hash:
+                await asyncio.to_thread(blob_store.release, content_hash)
             if saved_cover_path and saved_cover_path.exists():
                 saved_cover_path.unlink()
             raise
         except Exception as e:
             # Clean up uploaded files on any error
-            if saved_file_path and saved_file_path.exists():
-                saved_file_path.unlink()
+            if content_hash:
+                await asyncio.to_thread(blob_store.release, content_hash)
             if saved_cover_path and saved_cover_path.exists():
                 saved_cover_path.unlink()
             raise HTTPException(
@@ -243,8 +416,95 @@ class BookService:
                 detail=f"Failed to upload book: {str(e)}"
             )
     
+    @staticmethod
+    def download_name(book) -> str:
+        """Readable filename for downloads; stored files are named by content hash."""
+        return BookService._file_name_generator(book.title, book.uid, book.extension)
+
+    @staticmethod
+    def conversion_key(book) -> str:
+        """Converted PDFs are shared by every book with the same content."""
+        return book.content_hash or book.uid
+
+    @staticmethod
+    def _generated_cover_name(book) -> str:
+        stem = book.content_hash[:16] if book.content_hash else book.uid
+        return CoverService.cover_name(stem)
+
+    def _normalize_cover(self, cover_name: str) -> str:
+        """Replace a raw cover image with its normalized variants; keeps the raw one if unreadable."""
+        raw_path = self.cover_path / cover_name
+        normalized = fitz_pool.run(CoverService.normalize_file, raw_path, self.cover_path, raw_path.stem)
+        if not normalized:
+            return cover_name
+        raw_path.unlink(missing_ok=True)
+        return normalized
+
+    def _is_shared_cover(self, book) -> bool:
+        return bool(book.content_hash) and book.cover_path == self._generated_cover_name(book)
+
+    def process_uploaded_book(
+        self, book_uid: str, generate_thumbnail: bool = True, heartbeat: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Post-upload work: thumbnail, EPUB tag extraction, text indexing and optional EPUB to PDF conversion.
+        heartbeat is called after each phase; each can take up to FITZ_JOB_TIMEOUT_SECONDS.
+        """
+        beat = heartbeat or (lambda: None)
+        book = self.book_repo.get_book_by_uid(book_uid)
+        if not book:
+            # Deleted before processing started
+            return
+        self.book_repo.set_processing_state(book_uid, "processing")
+
+        file_path = self.upload_path / book.file_path
+        started_cover = cover_name = book.cover_path
+        # All PyMuPDF work runs in the dedicated process pool
+        with upload_phase_seconds.time("thumbnail"):
+            if generate_thumbnail:
+                gen_cover_name = self._generated_cover_name(book)
+                # Duplicate uploads share the thumbnail generated for the first copy
+                if (self.cover_path / gen_cover_name).exists():
+                    cover_name = gen_cover_name
+                else:
+                    stem = gen_cover_name.rsplit("-", 1)[0]
+                    cover_name = fitz_pool.run(
+                        BookService._generate_thumbnail, file_path, self.cover_path, stem, book.extension
+                    ) or cover_name
+            elif cover_name and not CoverService.is_normalized(cover_name):
+                # Uploaded covers are re-encoded into the standard sizes too
+                cover_name = self._normalize_cover(cover_name)
+        beat()
+
+        epub_tags = []
+        if book.extension == "epub":
+            # The PDF for /read is otherwise built on first read
+            if settings.EPUB_PRECONVERT:
+                with upload_phase_seconds.time("convert"):
+                    conversion_cache.get_pdf(self.conversion_key(book), file_path)
+                beat()
+
+            with upload_phase_seconds.time("tag_extraction"):
+                for t_name in fitz_pool.run(BookService._extract_epub_tags, file_path):
+                    try:
+                        epub_tags.append(TagCreate(name=t_name).name)
+                    except ValueError:
+                        # Skip subjects that are not valid tag names
+                        continue
+            beat()
+
+        if settings.FULLTEXT_INDEX:
+            with upload_phase_seconds.time("text_index"):
+                pages = fitz_pool.run(FullTextService.extract_pages, file_path)
+                FullTextRepo(self.book_repo.db_session).replace_pages(book.id, pages)
+            beat()
+
+        with upload_phase_seconds.time("finish_commit"):
+            # Title and tags may have been edited while the job ran, so only its own results are written
+            self.book_repo.finish_processing(book_uid, started_cover, cover_name, epub_tags)
+
     async def update_book(self, book_uid: str, metadata: BookUpload, cover: Optional[UploadFile] = None) -> BookBase:
-        existing_book = self.book_repo.get_book_by_uid(book_uid)
+        existing_book = await self.async_repo.get_book_by_uid(book_uid)
         if not existing_book:
             raise HTTPException(status_code=404, detail="Book not found")
         
@@ -255,14 +515,9 @@ class BookService:
         
         # Handle cover update if provided
         if cover and cover.filename:
-            # Delete old cover image if it exists
-            if existing_book.cover_path:
-                old_cover_path = self.cover_path / existing_book.cover_path
-                if old_cover_path.exists():
-                    try:
-                        old_cover_path.unlink()
-                    except Exception as e:
-                        print(f"Warning: Failed to delete old cover: {e}")
+            # Delete old cover image if it exists; shared thumbnails go with their blob
+            if existing_book.cover_path and not self._is_shared_cover(existing_book):
+                self._delete_cover(existing_book.cover_path)
             
             # Validate cover extension
             if '.' not in cover.filename:
@@ -283,8 +538,8 @@ class BookService:
             # Validate cover content type
             self._validate_image_content(cover_header, cover_extension)
             
-            # Save new cover file while checking size
-            cover_name = f"{book_uid}.{cover_extension}"
+            # Save new cover under a new name: cover URLs are cached as immutable
+            cover_name = f"{book_uid}-{uuid.uuid4().hex[:8]}.{cover_extension}"
             cover_path = self.cover_path / cover_name
             total_cover_size = len(cover_header)
             
@@ -305,7 +560,7 @@ class BookService:
                         )
                     buffer.write(chunk)
             
-            existing_book.cover_path = cover_name
+            existing_book.cover_path = await asyncio.to_thread(self._normalize_cover, cover_name)
         if metadata.tags is not None:
             all_tag_names = {t.name.lower(): t for t in metadata.tags}
             final_tags = list(all_tag_names.values())
@@ -318,11 +573,13 @@ class BookService:
             extension=existing_book.extension,
             file_path=existing_book.file_path,
             cover_path=existing_book.cover_path,
-            tags=final_tags
+            content_hash=existing_book.content_hash,
+            tags=final_tags,
+            processing_state=existing_book.processing_state,
         )
         # Save updates to database
         try:    
-            updated_book = self.book_repo.update_book(book_uid, book_updated)
+            updated_book = await self.async_repo.update_book(book_uid, book_updated)
             return BookBase.model_validate(updated_book)
         except Exception as e:
             raise HTTPException(
@@ -331,38 +588,62 @@ class BookService:
             )
             
             
-    def delete_book(self, book_uid: str) -> None:
-        existing_book = self.book_repo.get_book_by_uid(book_uid)
+    async def delete_book(self, book_uid: str) -> None:
+        existing_book = await self.async_repo.get_book_by_uid(book_uid)
         if not existing_book:
             raise HTTPException(status_code=404, detail="Book not found")
         
-        # Delete book file
         book_path = self.upload_path / existing_book.file_path
-        if book_path.exists():
-            try:
-                book_path.unlink()
-            except Exception as e:
-                print(f"Warning: Failed to delete book file: {e}")
-        
-        # Delete cover file
-        if existing_book.cover_path:
-            cover_path = self.cover_path / existing_book.cover_path
-            if cover_path.exists():
-                try:
-                    cover_path.unlink()
-                except Exception as e:
-                    print(f"Warning: Failed to delete cover file: {e}")
-        
-        # Delete from database
+        content_hash = existing_book.content_hash
+        extension = existing_book.extension
+        cover_name = existing_book.cover_path
+        shared_cover = self._is_shared_cover(existing_book)
+        shared_cover_name = self._generated_cover_name(existing_book)
+
+        # Delete from database first: the stored file may be shared with other books
         try:
-            self.book_repo.delete_book(book_uid)
+            await self.async_repo.delete_book(book_uid)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to delete book: {str(e)}"
             )
-    
-    def _validate_book_content(self, content: bytes, extension: str):
+
+        if content_hash:
+            # Files derived from the content are removed with the last reference to it
+            blob_store = BlobStore(self.book_repo.db_session, "books", self.upload_path)
+            freed = await asyncio.to_thread(blob_store.release, content_hash)
+            if freed:
+                if extension == "epub":
+                    conversion_cache.discard(content_hash)
+                self._delete_cover(shared_cover_name)
+        else:
+            # Books stored before content addressing own their file outright
+            if book_path.exists():
+                try:
+                    book_path.unlink()
+                except Exception as e:
+                    logger.warning("Failed to delete book file: %s", e)
+            
+            # Delete converted PDF, cached or left next to the EPUB by older versions
+            if extension == "epub":
+                conversion_cache.discard(book_uid)
+                legacy_pdf_path = book_path.with_suffix(".pdf")
+                if legacy_pdf_path.exists():
+                    try:
+                        legacy_pdf_path.unlink()
+                    except Exception as e:
+                        logger.warning("Failed to delete converted PDF: %s", e)
+
+        # Delete cover file
+        if cover_name and not shared_cover:
+            self._delete_cover(cover_name)
+
+    def _delete_cover(self, cover_name: str) -> None:
+        CoverService.delete(self.cover_path, cover_name)
+
+    @staticmethod
+    def _validate_book_content(content: bytes, extension: str):
         """Validate book file content matches its extension"""
         # Check PDF signature
         if extension == "pdf":
@@ -394,19 +675,20 @@ class BookService:
                 detail=f"File does not appear to be a valid {extension.upper()} image"
             )
             
-    def _generate_thumbnail(self, book_path: Path, output_path: Path, extension: str) -> bool:
-        print(f"THUMBNAIL INPUT: {book_path} | exists={book_path.exists()}")
-        print(f"THUMBNAIL OUTPUT: {output_path}")
+    @staticmethod
+    def _generate_thumbnail(book_path: Path, cover_dir: Path, stem: str, extension: str) -> Optional[str]:
+        """Build the cover variants for stem from the book itself. Returns the cover name, or None."""
+        logger.debug("Thumbnail input: %s", book_path)
+        logger.debug("Thumbnail output: %s", cover_dir / CoverService.cover_name(stem))
         try:
             doc = fitz.open(str(book_path))
 
             if extension == "pdf":
-                page = doc.load_page(0)
-                pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))
-                pix.save(str(output_path))
+                pix = CoverService.render_page(doc)
                 doc.close()
-                print(f"THUMBNAIL SAVED: {output_path.exists()}")
-                return True
+                cover_name = CoverService.save_variants(pix, cover_dir, stem)
+                logger.debug("Thumbnail saved: %s", cover_name)
+                return cover_name
             elif extension == "epub":
                 doc.close()
                 import zipfile
@@ -446,16 +728,16 @@ class BookService:
                             if strip_ns(item.tag) == "item":
                                 if "cover-image" in item.get("properties", ""):
                                     cover_href = item.get("href")
-                                    print(f"DEBUG: found via properties=cover-image: {cover_href}")
+                                    logger.debug("Cover found via properties=cover-image: %s", cover_href)
                                     break
                                 if cover_id and item.get("id") == cover_id:
                                     cover_href = item.get("href")
-                                    print(f"DEBUG: found via cover_id match: {cover_href}")
+                                    logger.debug("Cover found via cover_id match: %s", cover_href)
                                     break
 
                         if cover_href:
                             full_cover_path = f"{opf_dir}/{cover_href}".replace("\\", "/")
-                            print(f"DEBUG: full_cover_path: {full_cover_path}, in names: {full_cover_path in names}")
+                            logger.debug("Cover path: %s, in archive: %s", full_cover_path, full_cover_path in names)
 
                             if full_cover_path in names:
                                 content = z.read(full_cover_path)
@@ -476,10 +758,10 @@ class BookService:
                                         img_path = "/".join(resolved)
                                         if img_path in names:
                                             cover_bytes = z.read(img_path)
-                                            print(f"DEBUG: found cover via xhtml img: {img_path}")
+                                            logger.debug("Cover found via xhtml img: %s", img_path)
                                 else:
                                     cover_bytes = content
-                                    print(f"DEBUG: found cover via manifest direct image: {full_cover_path}")
+                                    logger.debug("Cover found via manifest image: %s", full_cover_path)
 
                         if not cover_bytes:
                             for ref in opf.iter():
@@ -506,7 +788,7 @@ class BookService:
                                                     img_path = "/".join(resolved)
                                                     if img_path in names:
                                                         cover_bytes = z.read(img_path)
-                                                        print(f"DEBUG: found cover via guide xhtml: {img_path}")
+                                                        logger.debug("Cover found via guide xhtml: %s", img_path)
                                         break
 
                     # Fallback: cover in filename
@@ -516,7 +798,7 @@ class BookService:
                             if any(lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png']):
                                 if any(k in lower for k in ['cover', 'front', 'thumb']):
                                     cover_bytes = z.read(name)
-                                    print(f"DEBUG: found cover by filename: {name}")
+                                    logger.debug("Cover found by filename: %s", name)
                                     break
 
                     # Fallback: first image
@@ -525,31 +807,33 @@ class BookService:
                             lower = name.lower()
                             if any(lower.endswith(ext) for ext in ['.jpg', '.jpeg', '.png']):
                                 cover_bytes = z.read(name)
-                                print(f"DEBUG: using first image found: {name}")
+                                logger.debug("Cover: using first image found: %s", name)
                                 break
 
                 if cover_bytes:
-                    with open(output_path, "wb") as f:
-                        f.write(cover_bytes)
-                    print(f"DEBUG: cover saved: {output_path.exists()}")
-                    return True
+                    # Re-encoded whatever the embedded format or size
+                    try:
+                        cover_name = CoverService.save_variants(CoverService.load_image(cover_bytes), cover_dir, stem)
+                        logger.debug("Cover saved: %s", cover_name)
+                        return cover_name
+                    except Exception as e:
+                        logger.debug("Embedded cover unreadable (%s), rendering first page", e)
 
-                print("DEBUG: no image found, rendering first page")
+                logger.debug("No cover image found, rendering first page")
                 doc = fitz.open(str(book_path))
-                page = doc.load_page(0)
-                pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5))
-                pix.save(str(output_path))
+                pix = CoverService.render_page(doc)
                 doc.close()
-                return True
+                return CoverService.save_variants(pix, cover_dir, stem)
                         
 
         except Exception as e:
-            print(f"Thumbnail extraction failed: {e}")
-            return False
+            logger.warning("Thumbnail extraction failed: %s", e)
+            return None
                             
                 
         
-    def _extract_epub_tags(self, book_path: Path) -> list[str]:
+    @staticmethod
+    def _extract_epub_tags(book_path: Path) -> list[str]:
         """Extracts subjects/tags from EPUB metadata."""
         try:
             doc = fitz.open(str(book_path))
@@ -562,6 +846,23 @@ class BookService:
                 return [t.strip() for t in re.split(r'[,;]+', subjects) if t.strip()]
             return []
         except Exception as e:
-            print(f"Tag extraction failed: {e}")
+            logger.warning("Tag extraction failed: %s", e)
             return []
-        
\ No newline at end of file
+
+
+@job_queue.handler("process_book")
+def process_book_job(db: Session, job: Job) -> None:
+    service = BookService(BookRepo(db))
+    job_id = job.id
+    try:
+        service.process_uploaded_book(
+            job.payload["book_uid"],
+            job.payload.get("generate_thumbnail", True),
+            # Keeps the job from being requeued as stale while a long phase runs
+            heartbeat=lambda: JobRepo(db).heartbeat(job_id),
+        )
+    except Exception:
+        db.rollback()
+        state = "failed" if job.attempts >= job.max_attempts else "pending"
+        service.book_repo.set_processing_state(job.payload["book_uid"], state)
+        raise
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+from app.config import settings
+from app.services.metrics import registry
+
+T = TypeVar("T")
+
+
+class CatalogCache:
+    """
+    TTL + LRU cache for catalog listing and search results.
+
+    Results are stored with the catalog version they were read at. Every write
+    to the catalog (upload, processing, edit, delete, import) bumps the version,
+    so no entry read before a write is ever served after it. TTL bounds how long
+    writes made by another process (e.g. the bulk import CLI) can go unseen.
+    """
+
+    def __init__(self):
+        self.max_entries = settings.CATALOG_CACHE_MAX_ENTRIES
+        self.ttl = settings.CATALOG_CACHE_TTL_SECONDS
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[int, float, object]] = OrderedDict()
+        self._version = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> None:
+        """Mark the catalog as changed; every cached result becomes stale."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], T]) -> T:
+        if not self.max_entries:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, expires_at, value = entry
+                if version == self._version and now < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            version = self._version
+
+        # Loaded outside the lock; a write meanwhile makes the version stale, so it is not stored
+        value = loader()
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (version, time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "version": self._version}
+
+
+catalog_cache = CatalogCache()
+registry.register_cache("catalog", catalog_cache.get_stats)
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from app.config import settings
+from app.services.fitz_pool import fitz_pool
+from app.services.metrics import registry
+
+
+class ConversionCache:
+    """
+    On-demand EPUB to PDF conversions, kept on disk under a size budget.
+
+    The PDF is built the first time a book is read. Concurrent readers of the
+    same book wait for the one in-flight conversion instead of starting their
+    own (single-flight, per process). Least recently read conversions are
+    evicted once the cache directory exceeds CONVERSION_CACHE_MAX_MB. Recency
+    is tracked in the file's atime so mtime, and therefore the ETag, stays stable.
+    """
+
+    def __init__(self):
+        self.cache_dir = settings.CONVERSION_CACHE_DIR
+        self.max_bytes = settings.CONVERSION_CACHE_MAX_MB * 1024 * 1024
+
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "failures": 0}
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pdf"
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        stat_result = path.stat()
+        os.utime(path, (time.time(), stat_result.st_mtime))
+
+    def get_pdf(self, key: str, epub_path: Path) -> Path:
+        """Return the converted PDF for key, converting epub_path on a miss. Blocking."""
+        pdf_path = self.path_for(key)
+        if pdf_path.exists():
+            self._stats["hits"] += 1
+            self._touch(pdf_path)
+            return pdf_path
+
+        with self._lock_for(key):
+            # Another request may have finished the conversion while we waited
+            if pdf_path.exists():
+                self._stats["hits"] += 1
+                self._touch(pdf_path)
+                return pdf_path
+
+            self._stats["misses"] += 1
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Imported here: book_service imports this module
+            from app.services.book_service import BookService
+            if not fitz_pool.run(BookService._convert_epub_to_pdf, epub_path, pdf_path):
+                self._stats["failures"] += 1
+                raise RuntimeError("EPUB to PDF conversion failed")
+
+        self.evict(keep=pdf_path)
+        return pdf_path
+
+    def discard(self, key: str) -> None:
+        pdf_path = self.path_for(key)
+        if pdf_path.exists():
+            pdf_path.unlink()
+        with self._locks_guard:
+            self._locks.pop(key, None)
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Delete least recently read conversions until the cache fits its budget."""
+        if not self.max_bytes or not self.cache_dir.exists():
+            return
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.pdf"):
+            try:
+                stat_result = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat_result.st_atime, stat_result.st_size, path))
+            total += stat_result.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._stats["evictions"] += 1
+
+    def get_stats(self) -> dict[str, int]:
+        return dict(self._stats)
+
+
+conversion_cache = ConversionCache()
+registry.register_cache("conversion", conversion_cache.get_stats)
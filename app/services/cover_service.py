@@ -0,0 +1,154 @@
+import io
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional
+import fitz  # PyMuPDF
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image  # Optional (the webp extra): WebP variants and WebP uploads
+except ImportError:
+    Image = None
+
+# Normalized covers are stored as <stem>-<width>.<jpg|webp>; cover_path holds the largest JPEG
+VARIANT_PATTERN = re.compile(r"^(?P<stem>.+)-(?P<width>\d+)\.jpg$")
+FORMAT_MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+def check_webp_support() -> None:
+    """
+    Called at startup. WebP variants, and uploaded WebP covers, need Pillow
+    (the "webp" extra); without it covers are JPEG only, so say so.
+    """
+    if settings.COVER_WEBP and Image is None:
+        logger.warning(
+            "COVER_WEBP is set but Pillow is not installed: covers are written as JPEG only and "
+            "uploaded WebP covers cannot be read. Install the webp extra (pip install '.[webp]')."
+        )
+
+
+class CoverService:
+    """
+    Cover images re-encoded at ingest into a few bounded widths (COVER_WIDTHS),
+    as JPEG and, when Pillow is installed, WebP. Runs in the PyMuPDF worker pool.
+    """
+
+    @staticmethod
+    def widths() -> list[int]:
+        return sorted(set(settings.COVER_WIDTHS))
+
+    @staticmethod
+    def formats() -> list[str]:
+        if settings.COVER_WEBP and Image is not None:
+            return ["webp", "jpg"]
+        return ["jpg"]
+
+    @staticmethod
+    def cover_name(stem: str) -> str:
+        return f"{stem}-{CoverService.widths()[-1]}.jpg"
+
+    @staticmethod
+    def is_normalized(cover_name: Optional[str]) -> bool:
+        match = VARIANT_PATTERN.match(cover_name or "")
+        return bool(match) and int(match.group("width")) == CoverService.widths()[-1]
+
+    @staticmethod
+    def srcsets(cover_name: Optional[str]) -> Optional[dict[str, str]]:
+        """srcset strings by media type, for <picture><source type=... srcset=...>."""
+        if not CoverService.is_normalized(cover_name):
+            return None
+        stem = VARIANT_PATTERN.match(cover_name).group("stem")
+        return {
+            FORMAT_MEDIA_TYPES[fmt]: ", ".join(
+                f"/static/covers/{stem}-{width}.{fmt} {width}w" for width in CoverService.widths()
+            )
+            for fmt in CoverService.formats()
+        }
+
+    @staticmethod
+    def variant_paths(cover_dir: Path, cover_name: str) -> list[Path]:
+        match = VARIANT_PATTERN.match(cover_name)
+        if not match:
+            return [cover_dir / cover_name]
+        stem = match.group("stem")
+        return [cover_dir / f"{stem}-{width}.{fmt}" for width in CoverService.widths() for fmt in ("webp", "jpg")]
+
+    @staticmethod
+    def delete(cover_dir: Path, cover_name: str) -> None:
+        for path in CoverService.variant_paths(cover_dir, cover_name):
+            if path.exists():
+                try:
+                    path.unlink()
+                except Exception as e:
+                    logger.warning("Failed to delete cover file: %s", e)
+
+    @staticmethod
+    def render_page(doc: fitz.Document) -> fitz.Pixmap:
+        """Render the first page at the largest cover width, whatever the page size."""
+        page = doc.load_page(0)
+        max_width = CoverService.widths()[-1]
+        # Cap very tall pages at twice the width
+        scale = min(max_width / page.rect.width, 2 * max_width / page.rect.height)
+        return page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+
+    @staticmethod
+    def load_image(data: bytes) -> fitz.Pixmap:
+        try:
+            return fitz.Pixmap(data)
+        except Exception:
+            if Image is None:
+                raise
+            # Formats MuPDF cannot decode (e.g. WebP)
+            with Image.open(io.BytesIO(data)) as image:
+                rgb = image.convert("RGB")
+                return fitz.Pixmap(fitz.csRGB, rgb.width, rgb.height, rgb.tobytes(), False)
+
+    @staticmethod
+    def save_variants(pix: fitz.Pixmap, cover_dir: Path, stem: str) -> str:
+        """Write every width/format of pix for stem. Returns the cover name to store."""
+        if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+
+        cover_dir.mkdir(parents=True, exist_ok=True)
+        for width in CoverService.widths():
+            # Never upscale small sources
+            if pix.width > width:
+                scaled = fitz.Pixmap(pix, width, round(pix.height * width / pix.width))
+            else:
+                scaled = pix
+            encoded = {}
+            if "webp" in CoverService.formats():
+                mode = "L" if scaled.n == 1 else "RGB"
+                buffer = io.BytesIO()
+                Image.frombytes(mode, (scaled.width, scaled.height), scaled.samples).save(
+                    buffer, "WEBP", quality=settings.COVER_QUALITY
+                )
+                encoded["webp"] = buffer.getvalue()
+            encoded["jpg"] = scaled.tobytes("jpeg", jpg_quality=settings.COVER_QUALITY)
+            for fmt, data in encoded.items():
+                CoverService._write_atomic(cover_dir / f"{stem}-{width}.{fmt}", data)
+        # The largest JPEG is written last, so its presence means the whole set is complete
+        return CoverService.cover_name(stem)
+
+    @staticmethod
+    def normalize_file(image_path: Path, cover_dir: Path, stem: str) -> Optional[str]:
+        """Re-encode an uploaded or legacy cover image. Returns the new cover name, or None if unreadable."""
+        try:
+            return CoverService.save_variants(CoverService.load_image(image_path.read_bytes()), cover_dir, stem)
+        except Exception as e:
+            logger.warning("Cover normalization failed for %s: %s", image_path, e)
+            return None
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        # Duplicate uploads may render the same shared cover at the same time
+        tmp_path = path.with_name(f".{uuid.uuid4().hex[:8]}-{path.name}")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Any, Callable, Optional
+from app.config import settings
+from app.services.metrics import fitz_job_failures, fitz_job_seconds
+from app.services.request_profiler import record_fitz_job
+
+
+class FitzPoolBusy(RuntimeError):
+    """Raised when the pool queue is full; callers such as the job queue retry later."""
+
+
+class FitzPool:
+    """
+    Dedicated process pool for PyMuPDF (fitz) work.
+
+    Rendering and conversion are CPU-bound and hold the GIL, so they run in
+    separate processes instead of the default thread pool shared with FastAPI's
+    sync endpoints. Admission is bounded (running + queued jobs) and fails fast
+    with FitzPoolBusy. When a job exceeds its timeout, new jobs go to a fresh
+    executor; the old one is left to finish its other jobs and only then are its
+    processes, including the stuck one, terminated.
+    Functions passed in must be picklable (module-level or static methods).
+    """
+
+    def __init__(self):
+        self.workers = settings.FITZ_WORKERS
+        self.queue_size = settings.FITZ_QUEUE_SIZE
+        self.timeout = settings.FITZ_JOB_TIMEOUT_SECONDS
+        self.admission_timeout = settings.FITZ_ADMISSION_TIMEOUT_SECONDS
+        self.max_tasks_per_child = settings.FITZ_MAX_TASKS_PER_CHILD
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Futures not yet finished, per executor still accepting or draining work
+        self._inflight: dict[ProcessPoolExecutor, set[Future]] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) + self.queue_size)
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> tuple[ProcessPoolExecutor, Future]:
+        # Under the lock, so an executor being retired never receives a job it does not wait for
+        with self._lock:
+            if self._executor is None:
+                # forkserver: forking a threaded server process is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                self._inflight[self._executor] = set()
+            executor = self._executor
+            future = executor.submit(func, *args)
+            self._inflight[executor].add(future)
+        return executor, future
+
+    def _done(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        with self._lock:
+            self._inflight.get(executor, set()).discard(future)
+
+    def _retire_executor(self, executor: ProcessPoolExecutor, stuck: Future) -> None:
+        """
+        A running task cannot be cancelled, so the executor running one that
+        overran is replaced. Its other jobs still finish; see _reap.
+        """
+        with self._lock:
+            if executor not in self._inflight:
+                # Already retiring: its reaper waits at most self.timeout
+                return
+            if self._executor is executor:
+                self._executor = None
+            others = self._inflight.pop(executor) - {stuck}
+        threading.Thread(
+            target=self._reap, args=(executor, others), name="fitz-pool-reaper", daemon=True
+        ).start()
+
+    def _reap(self, executor: ProcessPoolExecutor, futures: set[Future]) -> None:
+        wait(futures, timeout=self.timeout)
+        # ProcessPoolExecutor has no public way to stop running workers before Python 3.14
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire_slot(self) -> None:
+        # Short, so callers such as /read answer 503 quickly instead of queueing behind long jobs
+        if not self._slots.acquire(timeout=self.admission_timeout):
+            raise FitzPoolBusy("PyMuPDF worker pool is busy, try again later")
+
+    def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run func(*args) in the pool and wait for the result (blocking; use from worker threads)."""
+        name = getattr(func, "__name__", str(func))
+        started = time.perf_counter()
+        try:
+            return self._run(func, *args, timeout=timeout)
+        except Exception:
+            fitz_job_failures.labels(name).inc()
+            raise
+        finally:
+            # Includes the wait for a free worker
+            elapsed = time.perf_counter() - started
+            record_fitz_job(name, elapsed)
+            fitz_job_seconds.labels(name).observe(elapsed)
+
+    def _run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        if self.workers <= 0:
+            # Pool disabled: run inline in the calling thread
+            return func(*args)
+
+        timeout = timeout or self.timeout
+        self._acquire_slot()
+        try:
+            executor, future = self._submit(func, *args)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                self._retire_executor(executor, future)
+                raise TimeoutError(f"{getattr(func, '__name__', func)} exceeded {timeout:.0f}s")
+            finally:
+                self._done(executor, future)
+        finally:
+            self._slots.release()
+
+    async def run_async(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Await func(*args) without blocking the event loop."""
+        return await asyncio.to_thread(self.run, func, *args, timeout=timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._inflight.pop(executor, None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+fitz_pool = FitzPool()
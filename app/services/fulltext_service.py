@@ -0,0 +1,66 @@
+import logging
+from pathlib import Path
+from sqlalchemy.orm import Session, joinedload
+from app.config import settings
+from app.models import Book
+from app.repositories.fulltext_repo import FullTextRepo
+from app.schemas.book_schema import BookBase, FullTextHit, FullTextResult
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+
+class FullTextService:
+    """
+    Full-text search over book contents.
+    Page text is extracted once at ingest (upload processing, bulk import or
+    app/scripts/backfill_fulltext.py); searches only touch the database index.
+    Page numbers are 1-based and match the PDF served by /books/{uid}/read.
+    """
+
+    @staticmethod
+    def extract_pages(book_path: Path) -> list[tuple[int, str]]:
+        """Whitespace-collapsed text of each non-empty page as (page, text). Runs in the fitz pool."""
+        pages = []
+        try:
+            with fitz.open(str(book_path)) as doc:
+                for number, page in enumerate(doc, 1):
+                    content = " ".join(page.get_text("text").split())
+                    if content:
+                        pages.append((number, content))
+        except Exception as e:
+            logger.warning("Text extraction failed: %s", e)
+            return []
+        return pages
+
+    @staticmethod
+    def search(db: Session, query: str, limit: int = 20) -> list[FullTextResult]:
+        """
+        Books ranked by their best matching page, each with its top
+        FULLTEXT_HITS_PER_BOOK pages. The index returns at most
+        FULLTEXT_MAX_RANKED_PAGES pages, which bounds the work per query.
+        """
+        rows = FullTextRepo(db).search(query, settings.FULLTEXT_MAX_RANKED_PAGES)
+
+        # Rows arrive best first, so a book's first row is its best page
+        grouped: dict[int, tuple[float, list[FullTextHit]]] = {}
+        for book_id, page, score, snippet in rows:
+            if book_id not in grouped:
+                if len(grouped) == limit:
+                    continue
+                grouped[book_id] = (score, [])
+            hits = grouped[book_id][1]
+            if len(hits) < settings.FULLTEXT_HITS_PER_BOOK:
+                hits.append(FullTextHit(page=page, snippet=snippet))
+
+        if not grouped:
+            return []
+        books = {
+            book.id: book
+            for book in db.query(Book).options(joinedload(Book.tags)).filter(Book.id.in_(grouped)).all()
+        }
+        return [
+            FullTextResult(book=BookBase.model_validate(books[book_id]), score=score, hits=hits)
+            for book_id, (score, hits) in grouped.items()
+            if book_id in books
+        ]
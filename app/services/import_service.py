@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.book import Book
+from app.models.job import Job, utcnow
+from app.repositories import BlobRepo, FullTextRepo, JobRepo, TagRepo
+from app.repositories.tag_repo import normalize_tag_name
+from app.schemas import TagCreate
+from app.services.blob_store import BlobStore, BlobWriter, COPY_CHUNK_SIZE
+from app.services.book_service import BookService
+from app.services.catalog_cache import catalog_cache
+from app.services.conversion_cache import conversion_cache
+from app.services.cover_service import CoverService
+from app.services.fitz_pool import FitzPoolBusy, fitz_pool
+from app.services.fulltext_service import FullTextService
+from app.services.job_service import job_queue
+from app.services.tag_index import tag_index
+
+MEDIA_TYPES = {"pdf": "application/pdf", "epub": "application/epub+zip"}
+# Manifest entries in these states are not imported again on resume
+DONE_STATES = {"imported", "duplicate"}
+
+ProgressCallback = Callable[[dict], None]
+
+
+class ImportItem:
+    """One book file found in the import source."""
+
+    def __init__(self, key: str, size: int, opener: Callable[[], BinaryIO]):
+        self.key = key  # Path relative to the source, also the manifest key
+        self.size = size
+        self.opener = opener
+
+    @property
+    def extension(self) -> str:
+        return self.key.rsplit(".", 1)[-1].lower()
+
+
+class BulkImportService:
+    """
+    Imports a directory or ZIP of PDF/EPUB files into the library.
+
+    Files are hashed, validated, thumbnailed and tagged by a pool of worker
+    threads (PyMuPDF work goes through the shared process pool). Finished
+    files are inserted in batches, one transaction per batch. Every file's
+    outcome is recorded in a JSON manifest that is rewritten after each batch,
+    so an interrupted import resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        db_session: Session,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        preconvert: Optional[bool] = None,
+        extra_tags: Optional[list[str]] = None,
+    ):
+        self.db_session = db_session
+        self.workers = workers or settings.BULK_IMPORT_WORKERS
+        self.batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+        self.preconvert = settings.EPUB_PRECONVERT if preconvert is None else preconvert
+        self.extra_tags = [TagCreate(name=t).name for t in (extra_tags or [])]
+        self.upload_path = settings.UPLOAD_DIR
+        self.cover_path = settings.COVER_DIR
+        self.blob_store = BlobStore(db_session, "books", self.upload_path)
+        self._local = threading.local()
+        # Every per-thread ZipFile handle, closed when the import ends
+        self._archives: list[zipfile.ZipFile] = []
+        self._archives_lock = threading.Lock()
+
+    @staticmethod
+    def default_manifest_path(source: Path) -> Path:
+        # Stable per source, so importing the same source again resumes it
+        source_id = hashlib.sha1(str(Path(source).resolve()).encode()).hexdigest()[:12]
+        return settings.BULK_IMPORT_MANIFEST_DIR / f"{Path(source).stem}-{source_id}.json"
+
+    def collect_items(self, source: Path) -> list[ImportItem]:
+        allowed = settings.ALLOWED_EXTENSIONS
+        if source.is_dir():
+            return [
+                ImportItem(path.relative_to(source).as_posix(), path.stat().st_size, lambda path=path: path.open("rb"))
+                for path in sorted(source.rglob("*"))
+                if path.is_file() and path.suffix.lstrip(".").lower() in allowed
+            ]
+        if zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as archive:
+                return [
+                    ImportItem(info.filename, info.file_size, lambda name=info.filename: self._zip(source).open(name))
+                    for info in archive.infolist()
+                    if not info.is_dir() and info.filename.rsplit(".", 1)[-1].lower() in allowed
+                ]
+        raise ValueError(f"Import source must be a directory or a ZIP file: {source}")
+
+    def _zip(self, source: Path) -> zipfile.ZipFile:
+        # One handle per worker thread; a shared ZipFile serializes reads
+        archive = getattr(self._local, "archive", None)
+        if archive is None:
+            archive = self._local.archive = zipfile.ZipFile(source)
+            with self._archives_lock:
+                self._archives.append(archive)
+        return archive
+
+    def _close_archives(self) -> None:
+        with self._archives_lock:
+            archives, self._archives = self._archives, []
+        for archive in archives:
+            archive.close()
+
+    @staticmethod
+    def load_manifest(manifest_path: Path, source: Path) -> dict:
+        if manifest_path.exists():
+            return json.loads(manifest_path.read_text())
+        return {"source": str(source), "created_at": utcnow().isoformat(), "items": {}}
+
+    @staticmethod
+    def save_manifest(manifest_path: Path, manifest: dict) -> None:
+        manifest["updated_at"] = utcnow().isoformat()
+        tmp_path = manifest_path.with_name(f"{manifest_path.name}.tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_path, manifest_path)
+
+    @staticmethod
+    def summarize(manifest: dict, total: int) -> dict:
+        summary = {"total": total, "imported": 0, "duplicate": 0, "failed": 0}
+        for entry in manifest["items"].values():
+            summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+        summary["pending"] = max(total - summary["imported"] - summary["duplicate"] - summary["failed"], 0)
+        return summary
+
+    def run(self, source: Path, manifest_path: Optional[Path] = None, on_progress: Optional[ProgressCallback] = None) -> dict:
+        """Import every book in source that the manifest does not mark as done. Returns the summary."""
+        source = Path(source)
+        manifest_path = Path(manifest_path) if manifest_path else self.default_manifest_path(source)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest(manifest_path, source)
+        items = self.collect_items(source)
+        pending = [item for item in items if manifest["items"].get(item.key, {}).get("status") not in DONE_STATES]
+
+        started = time.perf_counter()
+        batch = []
+
+        def flush():
+            self._insert_batch(batch, manifest)
+            batch.clear()
+            manifest["summary"] = self.summarize(manifest, len(items))
+            manifest["summary"]["seconds"] = round(time.perf_counter() - started, 1)
+            self.save_manifest(manifest_path, manifest)
+            if on_progress:
+                on_progress(manifest["summary"])
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-import")
+        futures = [executor.submit(self._prepare, item) for item in pending]
+        consumed = set()
+        try:
+            for future in as_completed(futures):
+                consumed.add(future)
+                batch.append(future.result())
+                if len(batch) >= self.batch_size:
+                    flush()
+        finally:
+            # On interruption, let running files finish and keep everything that did
+            executor.shutdown(wait=True, cancel_futures=True)
+            batch.extend(f.result() for f in futures if f not in consumed and f.done() and not f.cancelled())
+            self._close_archives()
+            flush()
+
+        return manifest["summary"]
+
+    def _prepare(self, item: ImportItem) -> dict:
+        """Worker thread: copy, hash, validate, thumbnail, tag and extract the text of one file. No database writes."""
+        result = {"key": item.key, "extension": item.extension, "status": "failed"}
+        writer = None
+        try:
+            if item.size > settings.MAX_UPLOAD_SIZE:
+                raise ValueError(f"File too large ({item.size / (1024*1024):.2f}MB)")
+
+            writer = BlobWriter(self.blob_store, item.extension)
+            with item.opener() as stream:
+                header = stream.read(8192)
+                if not header:
+                    raise ValueError("Book file is empty")
+                BookService._validate_book_content(header, item.extension)
+                writer.write(header)
+                while chunk := stream.read(COPY_CHUNK_SIZE):
+                    writer.write(chunk)
+            content_hash = writer.finish()
+            result.update(content_hash=content_hash, size=writer.size, tmp_path=writer.tmp_path)
+
+            with SessionLocal() as db:
+                if db.query(Book.id).filter(Book.content_hash == content_hash).first():
+                    # Already in the library, from an earlier upload or import
+                    writer.discard()
+                    result["status"] = "duplicate"
+                    return result
+
+            cover_name = CoverService.cover_name(content_hash[:16])
+            if not (self.cover_path / cover_name).exists():
+                cover_name = self._run_fitz(
+                    BookService._generate_thumbnail, writer.tmp_path, self.cover_path, content_hash[:16], item.extension
+                )
+
+            tags = list(self.extra_tags)
+            if item.extension == "epub":
+                for t_name in self._run_fitz(BookService._extract_epub_tags, writer.tmp_path):
+                    try:
+                        tags.append(TagCreate(name=t_name).name)
+                    except ValueError:
+                        # Skip subjects that are not valid tag names
+                        continue
+                if self.preconvert:
+                    conversion_cache.get_pdf(content_hash, writer.tmp_path)
+
+            pages = []
+            if settings.FULLTEXT_INDEX:
+                pages = self._run_fitz(FullTextService.extract_pages, writer.tmp_path)
+
+            result.update(
+                status="ready",
+                title=BookService._title_from_filename(Path(item.key).name),
+                cover_name=cover_name,
+                tags=tags,
+                pages=pages,
+            )
+            return result
+        except HTTPException as e:
+            result["error"] = e.detail
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        if writer is not None:
+            writer.discard()
+        return result
+
+    @staticmethod
+    def _run_fitz(func, *args):
+        # Imports share the pool with live requests: wait for a slot instead of failing
+        delay = 0.1
+        while True:
+            try:
+                return fitz_pool.run(func, *args)
+            except FitzPoolBusy:
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    def _insert_batch(self, batch: list[dict], manifest: dict) -> None:
+        """
+        Insert the books of one batch, their blob references, tags and page text
+        in a single transaction. Files are moved into the blob store only once
+        it has committed, so a failed batch leaves nothing behind.
+        """
+        entries = manifest["items"]
+        ready = []
+        seen = set()
+        db = self.db_session
+        # _prepare checks too, but an earlier batch may have inserted the same content since
+        hashes = {r["content_hash"] for r in batch if r["status"] == "ready"}
+        if hashes:
+            seen = set(db.scalars(select(Book.content_hash).where(Book.content_hash.in_(hashes))))
+        for result in batch:
+            key = result["key"]
+            if result["status"] == "ready" and result["content_hash"] in seen:
+                # Same file twice in the source, or already in the library
+                result["tmp_path"].unlink(missing_ok=True)
+                result["status"] = "duplicate"
+            if result["status"] == "ready":
+                seen.add(result["content_hash"])
+                ready.append(result)
+            else:
+                entries[key] = {"status": result["status"], "error": result.get("error"), "content_hash": result.get("content_hash")}
+        if not ready:
+            return
+
+        try:
+            blobs = BlobRepo(db).acquire_many("books", [
+                (r["content_hash"], r["extension"], r["size"]) for r in ready
+            ])
+            tags_by_name = {
+                tag.name.lower(): tag for tag in TagRepo(db).get_or_create_tags(name for r in ready for name in r["tags"])
+            }
+
+            books = []
+            for r in ready:
+                r["blob_extension"] = blobs[r["content_hash"]].extension
+                file_path = BlobStore.relative_path(r["content_hash"], r["blob_extension"])
+                books.append(Book(
+                    uid=str(uuid.uuid4())[:8],
+                    title=r["title"],
+                    file_type=MEDIA_TYPES.get(r["extension"], f"application/{r['extension']}"),
+                    extension=r["extension"],
+                    file_path=file_path,
+                    cover_path=r["cover_name"],
+                    content_hash=r["content_hash"],
+                    processing_state="ready",
+                    tags=[tags_by_name[name] for name in dict.fromkeys(normalize_tag_name(n) for n in r["tags"])],
+                ))
+            db.add_all(books)
+            db.flush()
+            # Read before commit, which expires every loaded attribute
+            inserted = [(book.id, book.uid) for book in books]
+            fulltext = FullTextRepo(db)
+            for r, (book_id, _) in zip(ready, inserted):
+                fulltext.add_pages(book_id, r["pages"])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for r in ready:
+                r["tmp_path"].unlink(missing_ok=True)
+                entries[r["key"]] = {"status": "failed", "error": f"Database insert failed: {e}", "content_hash": r["content_hash"]}
+            return
+
+        for r, (book_id, uid) in zip(ready, inserted):
+            self.blob_store.place(r["tmp_path"], r["content_hash"], r["blob_extension"])
+            tag_index.set_book(book_id, r["tags"])
+            entries[r["key"]] = {"status": "imported", "uid": uid, "content_hash": r["content_hash"]}
+        catalog_cache.bump()
+
+@job_queue.handler("bulk_import")
+def bulk_import_job(db: Session, job: Job) -> None:
+    payload = job.payload
+    source = Path(payload["source"])
+
+    def heartbeat(summary: dict) -> None:
+        JobRepo(db).heartbeat(job.id)
+
+    summary = BulkImportService(db, extra_tags=payload.get("tags")).run(
+        source, Path(payload["manifest"]), on_progress=heartbeat
+    )
+    if payload.get("delete_source") and not summary["failed"]:
+        # Uploaded archives are kept while some files still need attention
+        source.unlink(missing_ok=True)
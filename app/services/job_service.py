@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job
+from app.repositories.job_repo import JobRepo
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Job], None]
+
+
+class JobQueue:
+    """
+    Durable in-process job queue.
+    Jobs are rows in the `jobs` table, so queued work survives restarts. A fixed
+    number of worker tasks bounds how many jobs run at once; failed jobs are
+    retried with exponential backoff until max_attempts is reached.
+    """
+
+    def __init__(self):
+        self.workers = settings.JOB_WORKERS
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS
+        self.retry_backoff = settings.JOB_RETRY_BACKOFF_SECONDS
+        self.poll_interval = settings.JOB_POLL_INTERVAL_SECONDS
+        self.stale_after = settings.JOB_STALE_AFTER_SECONDS
+
+        self.handlers: dict[str, JobHandler] = {}
+        self._stats: dict[str, dict] = {}
+        self._stats_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self._last_requeue = 0.0
+
+    def handler(self, kind: str) -> Callable[[JobHandler], JobHandler]:
+        """Register the function that runs jobs of the given kind."""
+        def register(func: JobHandler) -> JobHandler:
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def enqueue(self, db: Session, kind: str, payload: dict) -> Job:
+        job = JobRepo(db).create_job(kind, payload, max_attempts=self.max_attempts)
+        self.notify()
+        return job
+
+    async def enqueue_async(self, db: AsyncSession, kind: str, payload: dict) -> Job:
+        """enqueue for an AsyncSession; commits the session like enqueue."""
+        job = Job(kind=kind, payload=payload, max_attempts=self.max_attempts)
+        db.add(job)
+        await db.commit()
+        self.notify()
+        return job
+
+    def notify(self) -> None:
+        """Wake idle workers now instead of at the next poll. Safe to call from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._wakeup = None
+
+    async def _worker(self) -> None:
+        while True:
+            # Clear before claiming so a notify() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                job_id = await asyncio.to_thread(self._claim_next)
+            except Exception as e:
+                logger.warning("Job queue: failed to claim job: %s", e)
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.to_thread(self._run_job, job_id)
+
+    def _claim_next(self) -> Optional[int]:
+        with SessionLocal() as db:
+            repo = JobRepo(db)
+            now = time.monotonic()
+            if now - self._last_requeue > self.poll_interval * 12:
+                self._last_requeue = now
+                repo.requeue_stale_jobs(self.stale_after)
+            job = repo.claim_next_job()
+            return job.id if job else None
+
+    def _run_job(self, job_id: int) -> None:
+        with SessionLocal() as db:
+            repo = JobRepo(db)
+            job = repo.get_job(job_id)
+            if job is None:
+                return
+
+            kind = job.kind
+            started = time.perf_counter()
+            try:
+                handler = self.handlers.get(kind)
+                if handler is None:
+                    raise LookupError(f"No handler registered for job kind '{kind}'")
+                handler(db, job)
+            except Exception as e:
+                db.rollback()
+                duration = time.perf_counter() - started
+                delay = self.retry_backoff * 2 ** max(job.attempts - 1, 0)
+                repo.mark_failed(job, f"{type(e).__name__}: {e}", duration, delay)
+                outcome = "failed" if job.status == "failed" else "retried"
+                logger.warning("Job %s (%s) %s: %s", job_id, kind, outcome, e)
+            else:
+                duration = time.perf_counter() - started
+                repo.mark_succeeded(job, duration)
+                outcome = "succeeded"
+
+            self._record(kind, outcome, duration)
+
+    def _record(self, kind: str, outcome: str, duration: float) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(kind, {
+                "succeeded": 0, "failed": 0, "retried": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0,
+            })
+            stats[outcome] += 1
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+
+    def get_stats(self) -> dict[str, dict]:
+        """Per-kind run counts and durations for this process."""
+        with self._stats_lock:
+            result = {}
+            for kind, stats in self._stats.items():
+                runs = stats["succeeded"] + stats["failed"] + stats["retried"]
+                result[kind] = {
+                    **stats,
+                    "avg_seconds": stats["total_seconds"] / runs if runs else 0.0,
+                }
+            return result
+
+
+job_queue = JobQueue()
@@ -0,0 +1,20 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the standard library is used without it
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON; content must already be plain dicts/lists/scalars."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
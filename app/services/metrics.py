@@ -0,0 +1,291 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds; +Inf is always added
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child: "_HistogramChild"):
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        # Per bucket, not cumulative; the last one is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Metric:
+    """A metric family; children per label values are created once and then updated without the family lock."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self) -> list[tuple[tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def time(self, *values: str) -> _Timer:
+        """Context manager observing the time spent in the block."""
+        return self.labels(*values).time()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for values, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics served at GET /metrics in the Prometheus text format. Updates only
+    take the lock of the one series they change; collectors are called at
+    scrape time for values that are already counted elsewhere (cache stats).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._caches: dict[str, Callable[[], dict]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = REQUEST_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_cache(self, name: str, get_stats: Callable[[], dict]) -> None:
+        """Export a cache's hits and misses; get_stats returns a dict with those keys."""
+        self._caches[name] = get_stats
+
+    def _render_caches(self) -> list[str]:
+        stats = {name: get_stats() for name, get_stats in self._caches.items()}
+        lines = []
+        for suffix, kind, documentation in (
+            ("hits_total", "counter", "Cache lookups answered from the cache."),
+            ("misses_total", "counter", "Cache lookups that had to load the value."),
+            ("hit_ratio", "gauge", "Hits over lookups since startup."),
+        ):
+            name = f"jirani_cache_{suffix}"
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            for cache, values in stats.items():
+                hits, misses = values.get("hits", 0), values.get("misses", 0)
+                if suffix == "hit_ratio":
+                    value = hits / (hits + misses) if hits + misses else 0.0
+                else:
+                    value = hits if suffix == "hits_total" else misses
+                lines.append(f'{name}{{cache="{_escape(cache)}"}} {_format_value(value)}')
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        lines += self._render_caches()
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "jirani_http_request_duration_seconds",
+    "Time from receiving a request to sending its last byte, by route template.",
+    ("method", "route", "status"),
+)
+upload_phase_seconds = registry.histogram(
+    "jirani_upload_phase_duration_seconds",
+    "Time spent in each phase of storing and processing an uploaded book.",
+    ("phase",),
+    JOB_BUCKETS,
+)
+fitz_job_seconds = registry.histogram(
+    "jirani_fitz_job_duration_seconds",
+    "PyMuPDF jobs run in the process pool, including the wait for a free worker.",
+    ("function",),
+    JOB_BUCKETS,
+)
+fitz_job_failures = registry.counter(
+    "jirani_fitz_job_failures_total",
+    "PyMuPDF jobs that raised, timed out or found the pool busy.",
+    ("function",),
+)
+active_streams = registry.gauge(
+    "jirani_active_streams",
+    "File responses being sent, by media type.",
+    ("media",),
+)
+stream_bytes_sent = registry.counter(
+    "jirani_stream_bytes_sent_total",
+    "Bytes of file responses sent, by media type.",
+    ("media",),
+)
+db_pool_checkout_seconds = registry.histogram(
+    "jirani_db_pool_checkout_wait_seconds",
+    "Time to get a connection from the database pool, including opening a new one.",
+    ("engine",),
+    POOL_WAIT_BUCKETS,
+)
+
+
+def instrument_pool(engine: Engine, label: str) -> None:
+    """Time connection checkouts of the engine's pool. Only QueuePool has a limit to wait on."""
+    pool_class = type(engine.pool)
+    if not issubclass(pool_class, QueuePool):
+        return
+    wait = db_pool_checkout_seconds.labels(label)
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                wait.observe(time.perf_counter() - started)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    # recreate() (engine.dispose) builds the new pool from self.__class__, so the timing is kept
+    engine.pool.__class__ = TimedPool
+
+
+def media_kind(media_type: Optional[str]) -> str:
+    """Label for a file's MIME type: audio, video, image, or book for everything else."""
+    major = (media_type or "").partition("/")[0]
+    return major if major in ("audio", "video", "image") else "book"
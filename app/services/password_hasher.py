@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.config import settings
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification off the event loop.
+
+    A bcrypt call takes a few hundred milliseconds of CPU. Async handlers hand
+    it to a small dedicated thread pool (bcrypt releases the GIL while it
+    works), so a burst of logins neither stalls the event loop nor takes the
+    threads FastAPI uses for sync endpoints and file streaming. Admission is
+    bounded (running + waiting); beyond that requests get 503 right away
+    instead of queueing for seconds. The sync methods are for scripts.
+    """
+
+    def __init__(self):
+        self.workers = settings.PASSWORD_HASH_WORKERS
+        self.queue_size = settings.PASSWORD_HASH_QUEUE_SIZE
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) + self.queue_size)
+        self._stats: dict[str, dict] = {}
+        self._stats_lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self.context.verify(password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run("hash", self.hash, password)
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", self.verify, password, hashed_password)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        queued_at = time.perf_counter()
+        if self.workers <= 0:
+            # Pool disabled: run inline
+            result = func(*args)
+            self.record(operation, "succeeded", time.perf_counter() - queued_at)
+            return result
+
+        if not self._slots.acquire(blocking=False):
+            self.record(operation, "rejected", 0.0)
+            raise HTTPException(status_code=503, detail="Server is busy, try again shortly", headers={"Retry-After": "1"})
+        started_at = queued_at
+
+        def call() -> Any:
+            nonlocal started_at
+            started_at = time.perf_counter()
+            return func(*args)
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+        except Exception:
+            self.record(operation, "failed", time.perf_counter() - queued_at, started_at - queued_at)
+            raise
+        finally:
+            self._slots.release()
+        self.record(operation, "succeeded", time.perf_counter() - queued_at, started_at - queued_at)
+        return result
+
+    def record(self, operation: str, outcome: str, duration: float, queue_seconds: float = 0.0) -> None:
+        """Count one operation; duration includes the time spent waiting for a thread (queue_seconds)."""
+        with self._stats_lock:
+            stats = self._stats.setdefault(operation, {
+                "succeeded": 0, "failed": 0, "rejected": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0, "queue_seconds": 0.0,
+            })
+            stats[outcome] += 1
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            stats["queue_seconds"] += queue_seconds
+
+    def get_stats(self) -> dict[str, dict]:
+        """Per-operation counts and latencies for this process (hash, verify and login)."""
+        with self._stats_lock:
+            result = {}
+            for operation, stats in self._stats.items():
+                runs = stats["succeeded"] + stats["failed"]
+                result[operation] = {
+                    **stats,
+                    "avg_seconds": stats["total_seconds"] / runs if runs else 0.0,
+                    "avg_queue_seconds": stats["queue_seconds"] / runs if runs else 0.0,
+                }
+            return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.config import settings
+from app.schemas.auth_schema import Principal
+from app.services.metrics import registry
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of Principal by account id, so authenticated requests do
+    not query the accounts and roles tables each time. Role, password and
+    activation changes call invalidate(); TTL bounds how long changes made by
+    another process go unseen.
+    """
+
+    def __init__(self):
+        self.ttl = settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+        self.max_entries = settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, account_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, principal = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[account_id]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(account_id)
+            self._stats["hits"] += 1
+            return principal
+
+    def put(self, principal: Principal) -> None:
+        if not self.ttl or not self.max_entries:
+            return
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, account_id: int) -> None:
+        with self._lock:
+            self._entries.pop(account_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+principal_cache = PrincipalCache()
+registry.register_cache("principal", principal_cache.get_stats)
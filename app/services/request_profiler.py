@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qs
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.database import SessionLocal, async_engine, engine
+from app.services.metrics import active_streams, http_request_seconds, stream_bytes_sent
+from app.services.stream_service import STREAM_MEDIA_SCOPE_KEY, ZEROCOPY_EXTENSION
+
+logger = logging.getLogger("app.requests")
+
+# Longest SQL text kept for the slowest statement in the request log
+SLOWEST_SQL_LOG_CHARS = 300
+
+
+class RequestProfile:
+    """Timings of one request. Statements and PyMuPDF jobs are listed only when detailed."""
+
+    __slots__ = (
+        "id", "started", "db_seconds", "db_statements", "slowest_sql", "slowest_sql_seconds",
+        "fitz_seconds", "fitz_jobs", "bytes_sent", "statements", "fitz",
+    )
+
+    def __init__(self, detailed: bool = False):
+        self.id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_statements = 0
+        self.slowest_sql: Optional[str] = None
+        self.slowest_sql_seconds = 0.0
+        self.fitz_seconds = 0.0
+        self.fitz_jobs = 0
+        self.bytes_sent = 0
+        self.statements: Optional[list[dict]] = [] if detailed else None
+        self.fitz: Optional[list[dict]] = [] if detailed else None
+
+    def add_statement(self, sql: str, seconds: float) -> None:
+        self.db_seconds += seconds
+        self.db_statements += 1
+        if seconds >= self.slowest_sql_seconds:
+            self.slowest_sql = sql
+            self.slowest_sql_seconds = seconds
+        if self.statements is not None:
+            self.statements.append({"sql": sql, "ms": round(seconds * 1000, 3)})
+
+    def add_fitz_job(self, function: str, seconds: float) -> None:
+        self.fitz_seconds += seconds
+        self.fitz_jobs += 1
+        if self.fitz is not None:
+            self.fitz.append({"function": function, "ms": round(seconds * 1000, 3)})
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, shown by browser developer tools."""
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_statements} statements", '
+            f"fitz;dur={self.fitz_seconds * 1000:.1f}, "
+            f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}"
+        )
+
+    def summary(self, method: str, path: str, status: int) -> dict:
+        return {
+            "id": self.id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "db_statements": self.db_statements,
+            "slowest_sql": self.slowest_sql,
+            "slowest_sql_ms": round(self.slowest_sql_seconds * 1000, 3),
+            "fitz_ms": round(self.fitz_seconds * 1000, 3),
+            "fitz_jobs": self.fitz_jobs,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+# The profile of the request being handled; copied into threads started with
+# asyncio.to_thread / run_in_threadpool, and into SQLAlchemy's async greenlets
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def record_fitz_job(function: str, seconds: float) -> None:
+    """Count PyMuPDF work towards the current request, if any (job workers have none)."""
+    profile = _current.get()
+    if profile is not None:
+        profile.add_fitz_job(function, seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profile_started", None)
+    profile = _current.get()
+    if started is not None and profile is not None:
+        profile.add_statement(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement the engine runs into the current request's profile."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_label(scope: Scope) -> str:
+    # The route template, not the path, so ids do not create a series each
+    route = getattr(scope.get("route"), "path", None)
+    if route:
+        return route
+    if "endpoint" in scope:
+        # A mounted app (the covers); its root_path ends with the mount path
+        return scope.get("root_path", "").removeprefix(scope.get("app_root_path", "")) + "/{path}"
+    return "unmatched"
+
+
+class RequestProfiler:
+    """Request log records, the request latency metrics and the detailed profiles kept for GET /profiles/."""
+
+    def __init__(self):
+        self.recent: deque[dict] = deque(maxlen=max(settings.PROFILE_MAX_STORED, 1))
+
+    def finish(self, profile: RequestProfile, scope: Scope, status: int) -> None:
+        http_request_seconds.labels(scope.get("method", ""), _route_label(scope), str(status)).observe(
+            time.perf_counter() - profile.started
+        )
+        summary = profile.summary(scope.get("method", ""), scope.get("path", ""), status)
+        if settings.REQUEST_LOG:
+            slow = summary["duration_ms"] >= settings.SLOW_REQUEST_SECONDS * 1000
+            fields = dict(summary, slowest_sql=(summary["slowest_sql"] or "")[:SLOWEST_SQL_LOG_CHARS] or None)
+            logger.log(logging.WARNING if slow else logging.INFO, "request", extra=fields)
+        if profile.statements is not None:
+            self.recent.appendleft(dict(summary, statements=profile.statements, fitz=profile.fitz))
+
+    def get_profile(self, profile_id: str) -> Optional[dict]:
+        return next((dump for dump in self.recent if dump["id"] == profile_id), None)
+
+
+request_profiler = RequestProfiler()
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+
+def _wants_profile(scope: Scope) -> bool:
+    query = scope.get("query_string", b"")
+    return b"profile=" in query and parse_qs(query.decode("latin-1")).get("profile") == ["1"]
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+def _is_admin(token: str) -> bool:
+    # Imported here: the auth dependencies import most of the services
+    from app.dependencies.auth import resolve_principal
+    with SessionLocal() as db:
+        principal = resolve_principal(db, token)
+    return principal is not None and "admin" in principal.roles
+
+
+class RequestProfilerMiddleware:
+    """
+    Profiles every HTTP request: wall time until the last byte is sent, time
+    and count of SQL statements with the slowest one, PyMuPDF time and bytes
+    sent, written as one "request" log record and the /metrics latency
+    histogram; file responses also count towards the stream metrics.
+    Responses carry X-Request-ID.
+    Admins can add ?profile=1 to get a Server-Timing header and keep the full
+    profile, every statement included, for GET /profiles/{id}.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        detailed = False
+        if _wants_profile(scope):
+            token = _bearer_token(scope)
+            detailed = token is not None and await asyncio.to_thread(_is_admin, token)
+
+        profile = RequestProfile(detailed)
+        status = 500
+        # Media type of a file response, set by StreamService when the response is built
+        media: Optional[str] = None
+
+        async def send_profiled(message: Message) -> None:
+            nonlocal status, media
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                status = message["status"]
+                media = scope.get(STREAM_MEDIA_SCOPE_KEY)
+                if media:
+                    active_streams.labels(media).inc()
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", profile.id.encode()))
+                if detailed:
+                    headers.append((b"server-timing", profile.server_timing().encode()))
+                message = dict(message, headers=headers)
+            elif message_type == "http.response.body":
+                sent = len(message.get("body", b""))
+                profile.bytes_sent += sent
+                if media:
+                    stream_bytes_sent.labels(media).inc(sent)
+            elif message_type == ZEROCOPY_EXTENSION:
+                sent = message.get("count") or 0
+                profile.bytes_sent += sent
+                if media:
+                    stream_bytes_sent.labels(media).inc(sent)
+            await send(message)
+
+        context_token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _current.reset(context_token)
+            if media:
+                active_streams.labels(media).dec()
+            request_profiler.finish(profile, scope, status)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteMaintenance:
+    """
+    Periodic upkeep of the SQLite database, run every SQLITE_MAINTENANCE_INTERVAL_SECONDS
+    in a worker thread: ANALYZE (sampled, see SQLITE_ANALYSIS_LIMIT) and PRAGMA optimize
+    keep the query planner statistics current, and a TRUNCATE checkpoint copies the WAL
+    into the database and shrinks the -wal file. Does nothing on other databases.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.interval = settings.SQLITE_MAINTENANCE_INTERVAL_SECONDS
+        self.analysis_limit = settings.SQLITE_ANALYSIS_LIMIT
+        self.last_run: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine.dialect.name == "sqlite" and self.interval > 0
+
+    def run(self) -> dict:
+        """One maintenance pass. Returns what the checkpoint reported and how long it took."""
+        started = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql(f"PRAGMA analysis_limit = {self.analysis_limit}")
+            conn.exec_driver_sql("ANALYZE")
+            conn.exec_driver_sql("PRAGMA optimize")
+            # busy is 1 when readers kept the checkpoint from finishing; it is retried next time
+            busy, wal_pages, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+            conn.commit()
+        self.last_run = {
+            "busy": bool(busy),
+            "wal_pages": wal_pages,
+            "checkpointed_pages": checkpointed,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        return self.last_run
+
+    async def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        # First pass at startup, so a fresh or imported database gets statistics
+        while True:
+            try:
+                stats = await asyncio.to_thread(self.run)
+                logger.info("SQLite maintenance: %s", stats)
+            except Exception as e:
+                logger.exception("SQLite maintenance failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+sqlite_maintenance = SqliteMaintenance(engine)
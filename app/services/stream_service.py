@@ -0,0 +1,381 @@
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional
+import logging
+import os
+import re
+import sys
+import uuid
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.services.metrics import media_kind
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 1024 * 256  # 256KB
+MAX_RANGES = 16  # More than this in one request is treated as abuse and ignored
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+# Set on the ASGI scope of responses that send a file, for the stream metrics
+STREAM_MEDIA_SCOPE_KEY = "jirani.stream_media"
+# Book files are always revalidated, so a changed file is never served stale
+MEDIA_CACHE_CONTROL = "private, no-cache"
+# Covers are named after the book uid (plus a version suffix when replaced),
+# or after the content hash when generated for a deduplicated upload, plus the width
+UID_COVER_PATTERN = re.compile(r"^([0-9a-f]{8}(-[0-9a-f]{8})?|[0-9a-f]{16})(-\d+)?\.[a-z]+$")
+# ASGI servers known not to offer ZEROCOPY_EXTENSION (uvicorn is what the Dockerfile runs)
+SERVERS_WITHOUT_ZEROCOPY = ("uvicorn",)
+
+_zerocopy_fallback_logged = False
+
+
+def check_delivery_backend() -> None:
+    """
+    Called at startup. FILE_DELIVERY_BACKEND=sendfile only takes effect on an
+    ASGI server offering ZEROCOPY_EXTENSION; on the others every response
+    silently falls back to streaming, so say so. x-accel is the supported
+    zero-copy path.
+    """
+    if settings.FILE_DELIVERY_BACKEND != "sendfile":
+        return
+    servers = [name for name in SERVERS_WITHOUT_ZEROCOPY if name in sys.modules]
+    if servers:
+        logger.warning(
+            "FILE_DELIVERY_BACKEND=sendfile has no effect: %s does not offer the %s extension, "
+            "so files are streamed. Use FILE_DELIVERY_BACKEND=x-accel behind nginx for zero-copy delivery.",
+            servers[0], ZEROCOPY_EXTENSION,
+        )
+
+
+def _log_zerocopy_fallback() -> None:
+    # Once per process: the server's extensions do not change between requests
+    global _zerocopy_fallback_logged
+    if not _zerocopy_fallback_logged:
+        _zerocopy_fallback_logged = True
+        logger.warning(
+            "FILE_DELIVERY_BACKEND=sendfile but the ASGI server does not offer %s; streaming files instead",
+            ZEROCOPY_EXTENSION,
+        )
+
+
+class CoverStaticFiles(StaticFiles):
+    """StaticFiles that marks uid-named covers as immutable, on top of the built-in ETag/304 handling."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if UID_COVER_PATTERN.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = f"public, max-age={settings.COVER_CACHE_MAX_AGE}, immutable"
+        if response.status_code in (200, 206):
+            scope[STREAM_MEDIA_SCOPE_KEY] = "image"
+        return response
+
+
+class SendfileResponse(Response):
+    """
+    Hands the open file descriptor to the ASGI server through the
+    `http.response.zerocopysend` extension, which then calls os.sendfile().
+    No file bytes pass through Python.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        ranges: list[tuple[int, int]],
+        file_size: int,
+        status_code: int,
+        headers: dict[str, str],
+        media_type: str,
+        part_type: Optional[str] = None,
+        boundary: Optional[str] = None,
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.file_path = file_path
+        self.ranges = ranges
+        self.file_size = file_size
+        self.part_type = part_type
+        self.boundary = boundary
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        with self.file_path.open("rb") as stream:
+            if not self.boundary:
+                start, end = self.ranges[0]
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": stream,
+                    "offset": start,
+                    "count": end - start + 1,
+                    "more_body": False,
+                })
+                return
+
+            for start, end in self.ranges:
+                part_header = StreamService._part_header(self.boundary, self.part_type, start, end, self.file_size)
+                await send({"type": "http.response.body", "body": part_header, "more_body": True})
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": stream,
+                    "offset": start,
+                    "count": end - start + 1,
+                    "more_body": True,
+                })
+                await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+            await send({
+                "type": "http.response.body",
+                "body": f"--{self.boundary}--\r\n".encode("latin-1"),
+                "more_body": False,
+            })
+
+
+class StreamService:
+    """Builds file responses with validators (ETag/304) and HTTP Range (206 Partial Content) support."""
+
+    @staticmethod
+    def make_etag(stat_result: os.stat_result) -> str:
+        """Strong validator from file size and modification time."""
+        return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+    @staticmethod
+    def _parse_http_date(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def is_not_modified(request: Request, etag: str, mtime: int) -> bool:
+        """
+        Evaluate If-None-Match (weak comparison) and, when absent, If-Modified-Since.
+        mtime is the file modification time truncated to whole seconds.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            if if_none_match.strip() == "*":
+                return True
+            return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+        if_modified_since = StreamService._parse_http_date(request.headers.get("if-modified-since"))
+        return if_modified_since is not None and mtime <= if_modified_since
+
+    @staticmethod
+    def _if_range_matches(request: Request, etag: str, mtime: int) -> bool:
+        """A Range request is only honoured if If-Range (when sent) still matches the file."""
+        if_range = request.headers.get("if-range")
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"'):
+            return if_range == etag
+        if if_range.startswith("W/"):
+            return False
+        if_range_date = StreamService._parse_http_date(if_range)
+        return if_range_date is not None and mtime == if_range_date
+
+    @staticmethod
+    def parse_range_header(range_header: Optional[str], file_size: int) -> Optional[list[tuple[int, int]]]:
+        """
+        Parse a `Range: bytes=...` header into sorted, merged (start, end) pairs (inclusive).
+        Returns None when the header is missing or malformed, so the full file is sent.
+        Raises 416 when the header is valid but no range overlaps the file.
+        """
+        if not range_header:
+            return None
+
+        unit, _, spec = range_header.partition("=")
+        if unit.strip().lower() != "bytes" or not spec.strip():
+            return None
+
+        ranges = []
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "-" not in part:
+                return None
+            start_str, _, end_str = part.partition("-")
+            start_str, end_str = start_str.strip(), end_str.strip()
+            try:
+                if not start_str:
+                    # Suffix range: "-500" means the last 500 bytes
+                    suffix = int(end_str)
+                    if suffix <= 0:
+                        continue
+                    start = max(file_size - suffix, 0)
+                    end = file_size - 1
+                else:
+                    start = int(start_str)
+                    end = int(end_str) if end_str else file_size - 1
+                    if end_str and start > end:
+                        return None
+                    end = min(end, file_size - 1)
+            except ValueError:
+                return None
+            if start < file_size:
+                ranges.append((start, end))
+
+        if len(ranges) > MAX_RANGES:
+            return None
+
+        if not ranges:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
+
+        # Merge overlapping or adjacent ranges so no byte is sent twice
+        ranges.sort()
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            last_start, last_end = merged[-1]
+            if start <= last_end + 1:
+                merged[-1] = (last_start, max(last_end, end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def iter_file_range(
+        file_path: Path, start: int = 0, end: Optional[int] = None, chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive) of a file; the whole file when end is None."""
+        with file_path.open("rb") as stream:
+            stream.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = stream.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def _part_header(boundary: str, media_type: str, start: int, end: int, file_size: int) -> bytes:
+        return (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    @staticmethod
+    def _iter_multipart_ranges(
+        file_path: Path, ranges: list[tuple[int, int]], file_size: int, media_type: str, boundary: str
+    ) -> Iterator[bytes]:
+        for start, end in ranges:
+            yield StreamService._part_header(boundary, media_type, start, end, file_size)
+            yield from StreamService.iter_file_range(file_path, start, end)
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode("latin-1")
+
+    @staticmethod
+    def _multipart_length(ranges: list[tuple[int, int]], file_size: int, media_type: str, boundary: str) -> int:
+        length = 0
+        for start, end in ranges:
+            length += len(StreamService._part_header(boundary, media_type, start, end, file_size))
+            length += end - start + 1 + 2
+        length += len(f"--{boundary}--\r\n")
+        return length
+
+    @staticmethod
+    def _handoff_response(file_path: Path, media_type: str, headers: dict[str, str]) -> Response:
+        """Let the fronting web server send the file; it also takes care of Range requests."""
+        if settings.FILE_DELIVERY_BACKEND == "x-accel":
+            try:
+                relative = file_path.resolve().relative_to(settings.X_ACCEL_ROOT.resolve())
+            except ValueError:
+                raise HTTPException(status_code=500, detail="File is outside the X-Accel root")
+            headers["X-Accel-Redirect"] = f"{settings.X_ACCEL_PREFIX.rstrip('/')}/{relative.as_posix()}"
+        else:
+            headers["X-Sendfile"] = str(file_path.resolve())
+
+        response = Response(media_type=media_type, headers=headers)
+        # The real length is set by the web server once it serves the file
+        del response.headers["content-length"]
+        return response
+
+    @staticmethod
+    def file_response(
+        request: Request,
+        file_path: Path,
+        media_type: str,
+        filename: Optional[str] = None,
+    ) -> Response:
+        """
+        Send a file, honouring conditional requests (304) and single and multiple
+        byte ranges. The delivery backend is chosen by settings.FILE_DELIVERY_BACKEND.
+        """
+        stat_result = file_path.stat()
+        file_size = stat_result.st_size
+        mtime = int(stat_result.st_mtime)
+        etag = StreamService.make_etag(stat_result)
+        validators = {
+            "ETag": etag,
+            "Last-Modified": formatdate(mtime, usegmt=True),
+            "Cache-Control": MEDIA_CACHE_CONTROL,
+        }
+
+        if StreamService.is_not_modified(request, etag, mtime):
+            return Response(status_code=304, headers=validators)
+
+        headers = {"Accept-Ranges": "bytes", **validators}
+        if filename:
+            headers["Content-Disposition"] = f'inline; filename="{filename}"'
+        else:
+            headers["Content-Disposition"] = "inline"
+
+        backend = settings.FILE_DELIVERY_BACKEND
+        if backend in ("x-accel", "x-sendfile"):
+            return StreamService._handoff_response(file_path, media_type, headers)
+
+        ranges = None
+        if StreamService._if_range_matches(request, etag, mtime):
+            ranges = StreamService.parse_range_header(request.headers.get("range"), file_size)
+        status_code = 206 if ranges else 200
+        boundary = None
+        body_type = media_type
+
+        if not ranges:
+            headers["Content-Length"] = str(file_size)
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            headers["Content-Length"] = str(end - start + 1)
+        else:
+            boundary = uuid.uuid4().hex
+            body_type = f"multipart/byteranges; boundary={boundary}"
+            headers["Content-Length"] = str(StreamService._multipart_length(ranges, file_size, media_type, boundary))
+
+        request.scope[STREAM_MEDIA_SCOPE_KEY] = media_kind(media_type)
+        # Fall back to streaming when the server does not offer zero-copy send
+        if backend == "sendfile" and file_size:
+            if ZEROCOPY_EXTENSION not in request.scope.get("extensions", {}):
+                _log_zerocopy_fallback()
+            else:
+                return SendfileResponse(
+                    file_path,
+                    ranges or [(0, file_size - 1)],
+                    file_size,
+                    status_code=status_code,
+                    headers=headers,
+                    media_type=body_type,
+                    part_type=media_type,
+                    boundary=boundary,
+                )
+
+        if not ranges:
+            content = StreamService.iter_file_range(file_path)
+        elif boundary is None:
+            content = StreamService.iter_file_range(file_path, *ranges[0])
+        else:
+            content = StreamService._iter_multipart_ranges(file_path, ranges, file_size, media_type, boundary)
+
+        return StreamingResponse(content, status_code=status_code, media_type=body_type, headers=headers)
@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Book, BookTag, Tag
+
+
+def iter_ids(bitmap: int, after_id: Optional[int] = None) -> Iterator[int]:
+    """Yield the ids set in a bitmap in ascending order, starting after after_id."""
+    offset = 0
+    if after_id is not None:
+        offset = after_id + 1
+        bitmap >>= offset
+    while bitmap:
+        low_bit = (bitmap & -bitmap).bit_length() - 1
+        yield offset + low_bit
+        bitmap >>= low_bit + 1
+        offset += low_bit + 1
+
+
+class TagIndex:
+    """
+    In-memory tag -> book id bitmaps for tag filters and facet counts.
+
+    Each bitmap is a Python int with bit n set when book n has the tag, so
+    AND/OR/NOT are single big-int operations and counts are int.bit_count().
+    Built at startup and kept current by BookRepo and the bulk importer.
+    Writes made by other processes (another server worker, the bulk import
+    CLI) are picked up by a full rebuild every TAG_INDEX_REBUILD_SECONDS.
+    Memory is about (highest book id / 8) bytes per tag.
+    """
+
+    def __init__(self):
+        self.rebuild_seconds = settings.TAG_INDEX_REBUILD_SECONDS
+
+        self._lock = threading.Lock()
+        self._bitmaps: dict[str, int] = {}
+        self._book_tags: dict[int, frozenset[str]] = {}
+        self._all_books = 0
+        self._built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built_at is not None
+
+    def build(self, db: Session) -> None:
+        with self._lock:
+            bitmaps: dict[str, int] = {}
+            book_tags: dict[int, set[str]] = {}
+            all_books = 0
+            for (book_id,) in db.query(Book.id):
+                all_books |= 1 << book_id
+            rows = db.query(BookTag.book_id, Tag.name).join(Tag, Tag.id == BookTag.tag_id)
+            for book_id, name in rows:
+                name = name.lower()
+                bitmaps[name] = bitmaps.get(name, 0) | (1 << book_id)
+                book_tags.setdefault(book_id, set()).add(name)
+
+            self._bitmaps = bitmaps
+            self._book_tags = {book_id: frozenset(names) for book_id, names in book_tags.items()}
+            self._all_books = all_books
+            self._built_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Build on first use, and rebuild once the current index is older than the rebuild interval."""
+        if self._built_at is None:
+            self.build(db)
+        elif self.rebuild_seconds and time.monotonic() - self._built_at > self.rebuild_seconds:
+            self.build(db)
+
+    def set_book(self, book_id: int, tag_names: Iterable[str]) -> None:
+        """Record a created book or the new tags of an updated one."""
+        names = frozenset(name.lower() for name in tag_names)
+        bit = 1 << book_id
+        with self._lock:
+            old_names = self._book_tags.get(book_id, frozenset())
+            for name in old_names - names:
+                self._clear_bit(name, bit)
+            for name in names - old_names:
+                self._bitmaps[name] = self._bitmaps.get(name, 0) | bit
+            if names:
+                self._book_tags[book_id] = names
+            else:
+                self._book_tags.pop(book_id, None)
+            self._all_books |= bit
+
+    def remove_book(self, book_id: int) -> None:
+        bit = 1 << book_id
+        with self._lock:
+            for name in self._book_tags.pop(book_id, frozenset()):
+                self._clear_bit(name, bit)
+            self._all_books &= ~bit
+
+    def _clear_bit(self, name: str, bit: int) -> None:
+        bitmap = self._bitmaps.get(name, 0) & ~bit
+        if bitmap:
+            self._bitmaps[name] = bitmap
+        else:
+            # Tags without books are deleted from the database too
+            self._bitmaps.pop(name, None)
+
+    def match(
+        self,
+        any_of: Optional[list[str]] = None,
+        all_of: Optional[list[str]] = None,
+        none_of: Optional[list[str]] = None,
+    ) -> int:
+        """Bitmap of books with any tag of any_of, every tag of all_of and no tag of none_of."""
+        bitmaps = self._bitmaps
+        result = self._all_books
+        if any_of:
+            combined = 0
+            for name in any_of:
+                combined |= bitmaps.get(name.lower(), 0)
+            result &= combined
+        for name in all_of or []:
+            result &= bitmaps.get(name.lower(), 0)
+        for name in none_of or []:
+            result &= ~bitmaps.get(name.lower(), 0)
+        return result
+
+    def filter(self, tags: Optional[list[str]], tag_mode: str = "any", exclude_tags: Optional[list[str]] = None) -> int:
+        """Bitmap for the search parameters: any or all (tag_mode) of tags, none of exclude_tags."""
+        return self.match(
+            any_of=tags if tag_mode == "any" else None,
+            all_of=tags if tag_mode == "all" else None,
+            none_of=exclude_tags,
+        )
+
+    def page_ids(self, bitmap: int, after_id: Optional[int], limit: int) -> list[int]:
+        ids = []
+        for book_id in iter_ids(bitmap, after_id):
+            ids.append(book_id)
+            if len(ids) == limit:
+                break
+        return ids
+
+    def facets(self, bitmap: Optional[int] = None) -> dict[str, int]:
+        """Books per tag within bitmap (all books when None), tags without matches left out."""
+        if bitmap is None:
+            bitmap = self._all_books
+        counts = {}
+        # Copied first: writers may add or drop tags meanwhile
+        for name, tag_bitmap in tuple(self._bitmaps.items()):
+            count = (tag_bitmap & bitmap).bit_count()
+            if count:
+                counts[name] = count
+        return counts
+
+
+tag_index = TagIndex()
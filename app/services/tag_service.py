@@ -0,0 +1,54 @@
+import logging
+from typing import Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.job import Job
+from app.repositories.tag_repo import AsyncTagRepo, TagRepo
+from app.services.job_service import job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class TagService:
+    """Removal of tags that no book, audio or video uses any more."""
+
+    @staticmethod
+    def collect_orphans(db: Session, tag_ids: Iterable[int]) -> None:
+        """
+        Called when a change removed tag_ids from an item, before it is
+        committed. Only those tags are checked, so the cost does not grow with
+        the size of the tags table. With TAG_GC_DEFERRED the check runs later
+        in a tag_gc job (enqueuing commits the change along with the job).
+        """
+        tag_ids = sorted(set(tag_ids))
+        if not tag_ids:
+            return
+        if settings.TAG_GC_DEFERRED:
+            job_queue.enqueue(db, "tag_gc", {"tag_ids": tag_ids})
+            return
+        TagRepo(db).delete_orphans(tag_ids)
+
+    @staticmethod
+    async def collect_orphans_async(db: AsyncSession, tag_ids: Iterable[int]) -> None:
+        """collect_orphans for an AsyncSession."""
+        tag_ids = sorted(set(tag_ids))
+        if not tag_ids:
+            return
+        if settings.TAG_GC_DEFERRED:
+            await job_queue.enqueue_async(db, "tag_gc", {"tag_ids": tag_ids})
+            return
+        await AsyncTagRepo(db).delete_orphans(tag_ids)
+
+    @staticmethod
+    def schedule_sweep(db: Session) -> Job:
+        """Queue a tag_gc job over the whole tags table, e.g. after writes made outside the API."""
+        return job_queue.enqueue(db, "tag_gc", {"tag_ids": None})
+
+
+@job_queue.handler("tag_gc")
+def tag_gc_job(db: Session, job: Job) -> None:
+    deleted = TagRepo(db).delete_orphans(job.payload.get("tag_ids"))
+    db.commit()
+    if deleted:
+        logger.info("Deleted %d unused tag(s)", deleted)
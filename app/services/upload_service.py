@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional, Union
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
+from app.config import settings
+from app.models.job import utcnow
+from app.models.upload_session import UploadSession
+from app.models.video import Video
+from app.repositories import BookRepo
+from app.repositories.upload_session_repo import UploadSessionRepo
+from app.schemas import BookUpload, BookUploadResult, TagCreate
+from app.schemas.upload_schema import UploadSessionCreate
+from app.services.book_service import BookService
+from app.services.video_service import save_video_upload
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_INTERVAL_SECONDS = 10 * 60
+
+# One PATCH at a time per upload within this process
+_upload_locks: dict[str, asyncio.Lock] = {}
+_last_cleanup = 0.0
+
+
+class UploadService:
+    """
+    Resumable uploads in the style of the tus protocol: a client creates an
+    upload, sends the bytes in PATCH requests that each start at the current
+    offset, asks for the offset with HEAD after a dropped connection, and
+    finalizes once everything has arrived. Finalizing runs the same validation
+    and post-processing as a direct upload. Uploads idle for longer than
+    UPLOAD_SESSION_TTL_SECONDS are removed.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+        self.repo = UploadSessionRepo(db_session)
+        self.session_dir = settings.UPLOAD_SESSION_DIR
+        self.ttl = timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+    def part_path(self, upload_id: str) -> Path:
+        return self.session_dir / f"{upload_id}.part"
+
+    def create_session(self, data: UploadSessionCreate) -> UploadSession:
+        self.cleanup_expired_throttled()
+
+        extension = data.filename.rsplit(".", 1)[-1].lower() if "." in data.filename else ""
+        if data.kind == "book":
+            if extension not in settings.ALLOWED_EXTENSIONS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid file type '.{extension}'. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+                )
+            max_size = settings.MAX_UPLOAD_SIZE
+            # Reject bad metadata now rather than after the whole file was sent
+            self._book_metadata(data.title, data.tags)
+        else:
+            if not data.title:
+                raise HTTPException(status_code=400, detail="Video title is required")
+            max_size = settings.MAX_VIDEO_UPLOAD_SIZE
+
+        if data.size > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large ({data.size / (1024*1024):.2f}MB). Max: {max_size / (1024*1024):.0f}MB"
+            )
+
+        upload_id = uuid.uuid4().hex
+        upload = self.repo.create_session(UploadSession(
+            id=upload_id,
+            kind=data.kind,
+            filename=data.filename,
+            content_type=data.content_type,
+            size=data.size,
+            offset=0,
+            upload_metadata={"title": data.title, "description": data.description, "tags": data.tags},
+            expires_at=utcnow() + self.ttl,
+        ))
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.part_path(upload_id).touch()
+        return upload
+
+    def get_session(self, upload_id: str) -> UploadSession:
+        upload = self.repo.get_session(upload_id)
+        if not upload or not self.part_path(upload_id).exists():
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if upload.expires_at <= utcnow():
+            self._remove(upload_id)
+            raise HTTPException(status_code=410, detail="Upload expired")
+        return upload
+
+    async def append_chunk(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> UploadSession:
+        """
+        Append request bytes at offset, which must equal the bytes received so far.
+        Whatever arrives before a disconnect is kept, so the client resumes from there.
+        """
+        lock = _upload_locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+
+        async with lock:
+            upload = await asyncio.to_thread(self.get_session, upload_id)
+            if offset != upload.offset:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Offset mismatch, expected {upload.offset}",
+                    headers={"Upload-Offset": str(upload.offset)},
+                )
+
+            written = 0
+            try:
+                with self.part_path(upload_id).open("r+b") as buffer:
+                    # Drop bytes past the recorded offset left by an interrupted write
+                    buffer.seek(offset)
+                    buffer.truncate()
+                    async for chunk in stream:
+                        if offset + written + len(chunk) > upload.size:
+                            raise HTTPException(status_code=413, detail="Chunk exceeds the declared upload size")
+                        buffer.write(chunk)
+                        written += len(chunk)
+            except ClientDisconnect:
+                pass
+            finally:
+                if written:
+                    await asyncio.to_thread(
+                        self.repo.advance_offset, upload_id, offset, offset + written, utcnow() + self.ttl
+                    )
+
+        await asyncio.to_thread(self.db_session.refresh, upload)
+        return upload
+
+    async def finalize(self, upload_id: str) -> Union[BookUploadResult, Video]:
+        """
+        Store a completed upload. Holds the upload's lock throughout, so a
+        concurrent or retried finalize gets 409 instead of storing it twice.
+        """
+        lock = _upload_locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+
+        async with lock:
+            return await self._finalize(upload_id)
+
+    async def _finalize(self, upload_id: str) -> Union[BookUploadResult, Video]:
+        upload = await asyncio.to_thread(self.get_session, upload_id)
+        if upload.offset != upload.size:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete ({upload.offset} of {upload.size} bytes)",
+                headers={"Upload-Offset": str(upload.offset)},
+            )
+
+        meta = upload.upload_metadata or {}
+        try:
+            with self.part_path(upload_id).open("rb") as stream:
+                if upload.kind == "book":
+                    file = UploadFile(
+                        file=stream,
+                        size=upload.size,
+                        filename=upload.filename,
+                        headers=Headers({"content-type": upload.content_type or "application/octet-stream"}),
+                    )
+                    result = await BookService(BookRepo(self.db_session)).upload_book(
+                        metadata=self._book_metadata(meta.get("title"), meta.get("tags", "")),
+                        file=file,
+                    )
+                else:
+                    # Copying and hashing up to MAX_VIDEO_UPLOAD_SIZE must not block the event loop
+                    result = await asyncio.to_thread(
+                        save_video_upload, self.db_session, stream, upload.filename,
+                        meta.get("title"), meta.get("description"), meta.get("tags", ""),
+                    )
+        except HTTPException as e:
+            # Rejected content will not pass on a retry either
+            if e.status_code < 500:
+                await asyncio.to_thread(self._remove, upload_id)
+            raise
+
+        await asyncio.to_thread(self._remove, upload_id)
+        return result
+
+    def abort(self, upload_id: str) -> None:
+        lock = _upload_locks.get(upload_id)
+        if lock is not None and lock.locked():
+            raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+        self.get_session(upload_id)
+        self._remove(upload_id)
+
+    def _remove(self, upload_id: str) -> None:
+        self.repo.delete_session(upload_id)
+        part_path = self.part_path(upload_id)
+        if part_path.exists():
+            part_path.unlink()
+        _upload_locks.pop(upload_id, None)
+
+    @staticmethod
+    def _book_metadata(title: Optional[str], tags: str) -> BookUpload:
+        try:
+            tag_list = []
+            if tags.strip():
+                tag_list = [TagCreate(name=t.strip()).model_dump() for t in tags.split(",") if t.strip()]
+            return BookUpload(title=title, tags=tag_list)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid metadata: {str(e)}")
+
+    def cleanup_expired(self) -> int:
+        """Delete uploads idle past their TTL and any part file without an upload row."""
+        removed = 0
+        for upload in self.repo.get_expired_sessions(utcnow()):
+            self._remove(upload.id)
+            removed += 1
+        if self.session_dir.exists():
+            for part_path in self.session_dir.glob("*.part"):
+                if self.repo.get_session(part_path.stem) is None:
+                    part_path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def cleanup_expired_throttled(self) -> None:
+        global _last_cleanup
+        now = time.monotonic()
+        if now - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        _last_cleanup = now
+        removed = self.cleanup_expired()
+        if removed:
+            logger.info("Removed %d abandoned uploads", removed)
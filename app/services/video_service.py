@@ -0,0 +1,45 @@
+from pathlib import Path
+from typing import BinaryIO, Optional
+from sqlalchemy.orm import Session
+from app.models.video import Video
+from app.repositories.tag_repo import TagRepo
+from app.repositories.video_repo import Video_Repo
+from app.schemas.video_schema import Video_Create, Video_View
+from app.services.blob_store import BlobStore
+
+VIDS_DIR = Path("uploads") / "vids"
+
+
+def _video_extension(filename: str) -> str:
+    return Path(filename).suffix.lstrip(".").lower() or "bin"
+
+
+def save_video_upload(
+    db: Session, fileobj: BinaryIO, filename: str, title: str, description: Optional[str], tags: str = ""
+) -> Video:
+    """Store an uploaded video file and create its row; used by direct and resumable uploads. Blocking."""
+    # Identical uploads share one stored file
+    content_hash, relative_path = BlobStore(db, "video", VIDS_DIR).save_fileobj(
+        fileobj, _video_extension(filename)
+    )
+
+    repo = Video_Repo(db)
+    video_db = repo.create_video(Video_Create(
+        title=title, description=description, file_path=str(VIDS_DIR / relative_path), content_hash=content_hash
+    ))
+
+    tag_names = [t.strip() for t in tags.split(",") if t.strip()] if tags.strip() else []
+    video_db.tags = TagRepo(db).get_or_create_tags(tag_names)
+    db.commit()
+    db.refresh(video_db)
+    return video_db
+
+
+def build_video_view(v: Video) -> Video_View:
+    return Video_View(
+        id=v.id,
+        title=v.title,
+        description=v.description,
+        video_url=f"/videos/stream/{v.id}",
+        tags=[{"id": t.id, "name": t.name} for t in (v.tags or [])]
+    )
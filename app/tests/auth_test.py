@@ -0,0 +1,130 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.auth_router import router
+from app.config import settings
+from app.database import Base, get_db
+from app.models.account import Account
+from app.models.role import Role
+from app.services.password_hasher import password_hasher
+from app.services.principal_cache import principal_cache
+
+test_url = "sqlite:///./auth_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+PASSWORD = "correct horse battery"
+NEW_PASSWORD = "staple battery horse"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # Cheap hashes keep the tests fast; the scheme does not matter here
+    monkeypatch.setattr(password_hasher, "context", CryptContext(schemes=["sha256_crypt"], sha256_crypt__rounds=1000))
+    principal_cache.clear()
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        principal_cache.clear()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(router)
+
+    def override_get_db():
+        session = test_local()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin(db):
+    account = Account(
+        username="admin", hashed_password=password_hasher.hash(PASSWORD),
+        first_name="Ada", last_name="Admin", is_active=True,
+    )
+    account.roles.append(Role(name="admin"))
+    db.add(account)
+    db.commit()
+    return account
+
+
+def _token(account: Account, issued_at: datetime) -> str:
+    return jwt.encode({
+        "sub": account.username,
+        "user_id": account.id,
+        "roles": ["admin"],
+        "iat": issued_at,
+        "exp": issued_at + timedelta(hours=1),
+    }, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_change_password_returns_working_token(client, admin):
+    old_token = _token(admin, datetime.utcnow() - timedelta(minutes=5))
+    assert client.get("/auth/stats", headers=_auth(old_token)).status_code == 200
+
+    response = client.post("/auth/change-password", headers=_auth(old_token), json={
+        "username": "admin", "old_password": PASSWORD, "new_password": NEW_PASSWORD,
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["username"] == "admin"
+    assert body["roles"] == ["admin"]
+
+    # The token used for the change is revoked, the returned one works
+    assert client.get("/auth/stats", headers=_auth(old_token)).status_code == 401
+    assert client.get("/auth/stats", headers=_auth(body["access_token"])).status_code == 200
+
+def test_change_password_wrong_old_password_keeps_token(client, admin):
+    token = _token(admin, datetime.utcnow() - timedelta(minutes=5))
+
+    response = client.post("/auth/change-password", headers=_auth(token), json={
+        "username": "admin", "old_password": "not the password", "new_password": NEW_PASSWORD,
+    })
+    assert response.status_code == 400
+    assert client.get("/auth/stats", headers=_auth(token)).status_code == 200
+
+def test_token_without_iat_rejected_after_password_change(client, admin):
+    token = _token(admin, datetime.utcnow() - timedelta(minutes=5))
+    client.post("/auth/change-password", headers=_auth(token), json={
+        "username": "admin", "old_password": PASSWORD, "new_password": NEW_PASSWORD,
+    })
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    del payload["iat"]
+    no_iat = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    assert client.get("/auth/stats", headers=_auth(no_iat)).status_code == 401
+
+def test_login_with_hashing_pool_full_returns_503(client, admin, monkeypatch):
+    monkeypatch.setattr(password_hasher, "workers", 1)
+    full = threading.BoundedSemaphore(1)
+    full.acquire()
+    monkeypatch.setattr(password_hasher, "_slots", full)
+    rejected = password_hasher.get_stats().get("login", {}).get("rejected", 0)
+
+    response = client.post("/auth/token", json={"username": "admin", "password": PASSWORD})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert password_hasher.get_stats()["login"]["rejected"] == rejected + 1
@@ -0,0 +1,86 @@
+import io
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.repositories import BlobRepo
+from app.services.blob_store import BlobStore
+
+test_url = "sqlite:///./blob_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+CONTENT = b"%PDF-1.4 same content uploaded twice"
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    return BlobStore(db, "books", tmp_path)
+
+
+def test_duplicate_upload_shares_one_file(store, tmp_path):
+    first_hash, first_path = store.save_fileobj(io.BytesIO(CONTENT), "pdf")
+    second_hash, second_path = store.save_fileobj(io.BytesIO(CONTENT), "pdf")
+
+    assert first_hash == second_hash
+    assert first_path == second_path
+    assert (tmp_path / first_path).read_bytes() == CONTENT
+    assert store.repo.get_blob("books", first_hash).ref_count == 2
+    # Temp files do not pile up
+    assert not any((tmp_path / "blobs" / ".tmp").iterdir())
+
+def test_deleting_one_duplicate_keeps_the_file(store, tmp_path):
+    sha256, relative_path = store.save_fileobj(io.BytesIO(CONTENT), "pdf")
+    store.save_fileobj(io.BytesIO(CONTENT), "pdf")
+
+    assert store.release(sha256) is None
+    assert (tmp_path / relative_path).exists()
+    assert store.repo.get_blob("books", sha256).ref_count == 1
+
+    assert store.release(sha256) == tmp_path / relative_path
+    assert not (tmp_path / relative_path).exists()
+    assert store.repo.get_blob("books", sha256) is None
+
+def test_release_unknown_blob(store):
+    assert store.release("0" * 64) is None
+
+def test_reference_acquired_after_release_keeps_the_row(db, store, tmp_path):
+    sha256, relative_path = store.save_fileobj(io.BytesIO(CONTENT), "pdf")
+    store.save_fileobj(io.BytesIO(CONTENT), "pdf")
+    store.release(sha256)
+
+    # Another session adds a reference before the last one is dropped
+    other = test_local()
+    try:
+        BlobRepo(other).acquire("books", sha256, "pdf", len(CONTENT))
+    finally:
+        other.close()
+
+    assert store.release(sha256) is None
+    assert (tmp_path / relative_path).exists()
+    assert store.repo.get_blob("books", sha256).ref_count == 1
+
+def test_acquire_many_counts_each_entry(db):
+    repo = BlobRepo(db)
+    blobs = repo.acquire_many("books", [("a" * 64, "pdf", 10), ("a" * 64, "pdf", 10), ("b" * 64, "epub", 20)])
+    db.commit()
+
+    assert blobs["a" * 64].ref_count == 2
+    assert blobs["b" * 64].ref_count == 1
+
+    repo.acquire_many("books", [("a" * 64, "pdf", 10)])
+    db.commit()
+    assert repo.get_blob("books", "a" * 64).ref_count == 3
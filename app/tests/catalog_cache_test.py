@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.dependencies.pagination import PageParams
+from app.repositories import BookRepo
+from app.schemas import BookCreate, TagCreate
+from app.services.book_service import BookService
+from app.services.catalog_cache import CatalogCache, catalog_cache
+
+test_url = "sqlite:///./catalog_cache_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    catalog_cache.bump()
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def cache():
+    cache = CatalogCache()
+    cache.max_entries = 2
+    cache.ttl = 60
+    return cache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+def _book(uid: str, title: str) -> BookCreate:
+    return BookCreate(
+        title=title, uid=uid, file_type="application/pdf", extension="pdf",
+        file_path=f"{uid}.pdf", tags=[TagCreate(name="fantasy")],
+    )
+
+
+def test_cached_until_bump(cache):
+    load = Loader()
+    assert cache.get_or_load("all", load) == 1
+    assert cache.get_or_load("all", load) == 1
+
+    cache.bump()
+    assert cache.get_or_load("all", load) == 2
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["invalidations"] == 1
+
+def test_result_loaded_during_bump_not_stored(cache):
+    load = Loader()
+
+    def load_while_catalog_changes():
+        cache.bump()
+        return load()
+
+    assert cache.get_or_load("all", load_while_catalog_changes) == 1
+    # Read before the write finished, so it is loaded again
+    assert cache.get_or_load("all", load) == 2
+    assert cache.get_or_load("all", load) == 2
+
+def test_expired_entry_reloaded(cache):
+    cache.ttl = 0
+    load = Loader()
+    cache.get_or_load("all", load)
+
+    assert cache.get_or_load("all", load) == 2
+    assert cache.get_stats()["expirations"] == 1
+
+def test_least_recently_used_evicted(cache):
+    loads = {key: Loader() for key in "abc"}
+    cache.get_or_load("a", loads["a"])
+    cache.get_or_load("b", loads["b"])
+    cache.get_or_load("a", loads["a"])
+    cache.get_or_load("c", loads["c"])
+
+    cache.get_or_load("a", loads["a"])
+    cache.get_or_load("b", loads["b"])
+    assert loads["a"].calls == 1
+    assert loads["b"].calls == 2
+    assert cache.get_stats()["evictions"] == 2
+
+def test_disabled_cache_always_loads(cache):
+    cache.max_entries = 0
+    load = Loader()
+    cache.get_or_load("all", load)
+
+    assert cache.get_or_load("all", load) == 2
+
+def test_book_writes_invalidate_listing(db):
+    repo = BookRepo(db)
+    service = BookService(repo)
+    page = PageParams(limit=10, cursor=None)
+    repo.create_book(_book("first", "Dragons"))
+
+    assert [b["title"] for b in service.get_all_books(page).items] == ["Dragons"]
+
+    repo.update_book("first", _book("first", "Renamed"))
+    assert [b["title"] for b in service.get_all_books(page).items] == ["Renamed"]
+
+    repo.create_book(_book("second", "Wyverns"))
+    assert [b["title"] for b in service.get_all_books(page).items] == ["Renamed", "Wyverns"]
+
+    repo.delete_book("first")
+    assert [b["title"] for b in service.get_all_books(page).items] == ["Wyverns"]
@@ -0,0 +1,105 @@
+import io
+import logging
+import fitz
+import pytest
+from app.config import settings
+from app.services import cover_service
+from app.services.cover_service import CoverService, check_webp_support
+
+WIDTHS = [160, 320, 640]
+
+
+@pytest.fixture(autouse=True)
+def cover_settings(monkeypatch):
+    monkeypatch.setattr(settings, "COVER_WIDTHS", WIDTHS)
+    monkeypatch.setattr(settings, "COVER_WEBP", True)
+
+
+@pytest.fixture
+def without_pillow(monkeypatch):
+    monkeypatch.setattr(cover_service, "Image", None)
+
+
+@pytest.fixture
+def with_pillow(monkeypatch):
+    image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(cover_service, "Image", image)
+    return image
+
+
+def _page_pixmap(width: int = 800, height: int = 1200) -> fitz.Pixmap:
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(200)
+    return pix
+
+
+# Without Pillow
+
+def test_jpeg_only_without_pillow(without_pillow, tmp_path):
+    cover_name = CoverService.save_variants(_page_pixmap(), tmp_path, "abcd1234")
+
+    assert cover_name == "abcd1234-640.jpg"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"abcd1234-{w}.jpg" for w in WIDTHS]
+    assert fitz.Pixmap(str(tmp_path / "abcd1234-160.jpg")).width == 160
+
+def test_srcset_jpeg_only_without_pillow(without_pillow):
+    assert CoverService.srcsets("abcd1234-640.jpg") == {
+        "image/jpeg": ", ".join(f"/static/covers/abcd1234-{w}.jpg {w}w" for w in WIDTHS),
+    }
+
+def test_webp_disabled_by_setting(with_pillow, monkeypatch):
+    monkeypatch.setattr(settings, "COVER_WEBP", False)
+    assert CoverService.formats() == ["jpg"]
+
+def test_missing_pillow_warned_at_startup(without_pillow, caplog):
+    with caplog.at_level(logging.WARNING, logger=cover_service.logger.name):
+        check_webp_support()
+    assert "Pillow is not installed" in caplog.text
+
+def test_unreadable_cover_not_normalized(without_pillow, tmp_path):
+    upload = tmp_path / "upload.webp"
+    upload.write_bytes(b"RIFF\x00\x00\x00\x00WEBPnot really an image")
+
+    assert CoverService.normalize_file(upload, tmp_path / "covers", "abcd1234") is None
+    assert not (tmp_path / "covers").exists()
+
+def test_small_source_not_upscaled(without_pillow, tmp_path):
+    CoverService.save_variants(_page_pixmap(200, 300), tmp_path, "abcd1234")
+
+    assert fitz.Pixmap(str(tmp_path / "abcd1234-160.jpg")).width == 160
+    assert fitz.Pixmap(str(tmp_path / "abcd1234-640.jpg")).width == 200
+
+
+# With Pillow
+
+def test_webp_and_jpeg_with_pillow(with_pillow, tmp_path):
+    cover_name = CoverService.save_variants(_page_pixmap(), tmp_path, "abcd1234")
+
+    assert cover_name == "abcd1234-640.jpg"
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        f"abcd1234-{w}.{fmt}" for w in WIDTHS for fmt in ("jpg", "webp")
+    )
+    with with_pillow.open(tmp_path / "abcd1234-320.webp") as image:
+        assert image.format == "WEBP"
+        assert image.width == 320
+
+def test_srcset_lists_webp_with_pillow(with_pillow):
+    srcsets = CoverService.srcsets("abcd1234-640.jpg")
+    assert list(srcsets) == ["image/webp", "image/jpeg"]
+    assert srcsets["image/webp"] == ", ".join(f"/static/covers/abcd1234-{w}.webp {w}w" for w in WIDTHS)
+
+def test_no_startup_warning_with_pillow(with_pillow, caplog):
+    with caplog.at_level(logging.WARNING, logger=cover_service.logger.name):
+        check_webp_support()
+    assert caplog.text == ""
+
+def test_uploaded_webp_cover_normalized(with_pillow, tmp_path):
+    buffer = io.BytesIO()
+    with_pillow.new("RGB", (400, 600), (10, 120, 200)).save(buffer, "WEBP")
+    upload = tmp_path / "upload.webp"
+    upload.write_bytes(buffer.getvalue())
+
+    assert CoverService.normalize_file(upload, tmp_path / "covers", "abcd1234") == "abcd1234-640.jpg"
+    # Never upscaled past the 400px source
+    assert fitz.Pixmap(str(tmp_path / "covers" / "abcd1234-640.jpg")).width == 400
+    assert (tmp_path / "covers" / "abcd1234-160.webp").exists()
@@ -0,0 +1,214 @@
+from datetime import timedelta
+import fitz
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import Base
+from app.models.job import Job, utcnow
+from app.repositories import BookRepo, JobRepo
+from app.schemas import BookCreate, TagCreate
+from app.services.book_service import process_book_job
+from app.services.fitz_pool import fitz_pool
+from app.services.metrics import upload_phase_seconds
+
+test_url = "sqlite:///./job_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_claim_marks_job_running(db):
+    repo = JobRepo(db)
+    job = repo.create_job("process_book", {"book_uid": "abcd1234"})
+
+    claimed = repo.claim_next_job()
+    assert claimed.id == job.id
+    assert claimed.status == "running"
+    assert claimed.attempts == 1
+    assert claimed.started_at is not None
+
+def test_job_is_claimed_once(db):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {})
+
+    assert repo.claim_next_job() is not None
+    # A second worker, with its own session, finds nothing left
+    other = test_local()
+    try:
+        assert JobRepo(other).claim_next_job() is None
+    finally:
+        other.close()
+
+def test_oldest_job_claimed_first(db):
+    repo = JobRepo(db)
+    first = repo.create_job("process_book", {"n": 1})
+    repo.create_job("process_book", {"n": 2})
+
+    assert repo.claim_next_job().id == first.id
+
+def test_future_job_not_claimed(db):
+    repo = JobRepo(db)
+    job = repo.create_job("process_book", {})
+    job.run_after = utcnow() + timedelta(minutes=5)
+    db.commit()
+
+    assert repo.claim_next_job() is None
+
+def test_failed_job_retried_after_backoff(db):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {}, max_attempts=3)
+    job = repo.claim_next_job()
+
+    repo.mark_failed(job, "RuntimeError: boom", 0.5, retry_delay_seconds=60)
+    assert job.status == "pending"
+    assert job.last_error == "RuntimeError: boom"
+    assert job.run_after > utcnow()
+    # Not runnable until the backoff has passed
+    assert repo.claim_next_job() is None
+
+    job.run_after = utcnow() - timedelta(seconds=1)
+    db.commit()
+    retried = repo.claim_next_job()
+    assert retried.id == job.id
+    assert retried.attempts == 2
+
+def test_job_fails_for_good_after_max_attempts(db):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {}, max_attempts=2)
+
+    for attempt in range(2):
+        job = repo.claim_next_job()
+        assert job.attempts == attempt + 1
+        repo.mark_failed(job, "RuntimeError: boom", 0.1, retry_delay_seconds=0)
+
+    assert job.status == "failed"
+    assert job.finished_at is not None
+    assert repo.claim_next_job() is None
+
+def test_succeeded_job_clears_error(db):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {})
+    job = repo.claim_next_job()
+    repo.mark_failed(job, "RuntimeError: boom", 0.1, retry_delay_seconds=0)
+    job = repo.claim_next_job()
+
+    repo.mark_succeeded(job, 1.5)
+    assert job.status == "succeeded"
+    assert job.last_error is None
+    assert job.duration_seconds == 1.5
+    assert repo.count_by_status() == {"succeeded": 1}
+
+def test_stale_running_job_requeued(db):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {})
+    job = repo.claim_next_job()
+    job.started_at = utcnow() - timedelta(hours=1)
+    db.commit()
+
+    assert repo.requeue_stale_jobs(stale_after_seconds=60) == 1
+    db.refresh(job)
+    assert job.status == "pending"
+    assert repo.claim_next_job().id == job.id
+
+def test_heartbeat_keeps_job_running(db):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {})
+    job = repo.claim_next_job()
+    job.started_at = utcnow() - timedelta(hours=1)
+    db.commit()
+
+    repo.heartbeat(job.id)
+    assert repo.requeue_stale_jobs(stale_after_seconds=60) == 0
+    assert db.get(Job, job.id).status == "running"
+
+
+@pytest.fixture
+def pending_book(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path / "books")
+    monkeypatch.setattr(settings, "COVER_DIR", tmp_path / "covers")
+    # PyMuPDF work runs inline instead of in worker processes
+    monkeypatch.setattr(fitz_pool, "workers", 0)
+    (tmp_path / "books").mkdir()
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "A page about dragons")
+    doc.save(str(tmp_path / "books" / "book.pdf"))
+
+    return BookRepo(db).create_book(BookCreate(
+        title="Dragons", uid="abcd1234", file_type="application/pdf", extension="pdf",
+        file_path="book.pdf", tags=[TagCreate(name="fantasy")], processing_state="pending",
+    ))
+
+def test_process_book_job_heartbeats(db, pending_book):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {"book_uid": pending_book.uid})
+    job = repo.claim_next_job()
+    job.started_at = utcnow() - timedelta(hours=1)
+    db.commit()
+
+    process_book_job(db, job)
+
+    db.refresh(job)
+    assert job.started_at > utcnow() - timedelta(minutes=1)
+    assert BookRepo(db).get_book_by_uid(pending_book.uid).processing_state == "ready"
+
+def test_processing_keeps_edits_made_meanwhile(db, pending_book, monkeypatch):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {"book_uid": pending_book.uid})
+    job = repo.claim_next_job()
+
+    def edit_during_processing():
+        other = test_local()
+        try:
+            BookRepo(other).update_book(pending_book.uid, BookCreate(
+                title="Renamed", uid=pending_book.uid, file_type="application/pdf", extension="pdf",
+                file_path="book.pdf", tags=[TagCreate(name="dragons")], processing_state="processing",
+            ))
+        finally:
+            other.close()
+
+    heartbeat = JobRepo.heartbeat
+
+    def heartbeat_and_edit(self, job_id):
+        heartbeat(self, job_id)
+        edit_during_processing()
+
+    # The title and tags change between two phases of the job
+    monkeypatch.setattr(JobRepo, "heartbeat", heartbeat_and_edit)
+    process_book_job(db, job)
+
+    other = test_local()
+    try:
+        book = BookRepo(other).get_book_by_uid(pending_book.uid)
+        assert book.title == "Renamed"
+        assert [t.name for t in book.tags] == ["dragons"]
+        assert book.processing_state == "ready"
+    finally:
+        other.close()
+
+def _phase_count(phase: str) -> int:
+    return sum(upload_phase_seconds.labels(phase).snapshot()[0])
+
+def test_processing_commit_has_its_own_phase(db, pending_book):
+    repo = JobRepo(db)
+    repo.create_job("process_book", {"book_uid": pending_book.uid})
+    job = repo.claim_next_job()
+    db_commits, finish_commits = _phase_count("db_commit"), _phase_count("finish_commit")
+
+    process_book_job(db, job)
+
+    # db_commit is the upload request's commit only
+    assert _phase_count("db_commit") == db_commits
+    assert _phase_count("finish_commit") == finish_commits + 1
@@ -0,0 +1,77 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.dependencies.pagination import PageParams, decode_cursor, encode_cursor
+from app.models import Tag
+from app.repositories.keyset import keyset_page
+
+test_url = "sqlite:///./pagination_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.mark.parametrize("last_id", [0, 1, 42, 2**31, 10**15])
+def test_cursor_round_trip(last_id):
+    cursor = encode_cursor(last_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == last_id
+
+@pytest.mark.parametrize("cursor", ["!!!", "bm90LWFuLWlk", "/w"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+def test_page_params_defaults():
+    params = PageParams(limit=None, cursor=None)
+    assert not params.paginated
+    assert params.after_id is None
+
+    params = PageParams(limit=5, cursor=encode_cursor(7))
+    assert params.paginated
+    assert params.after_id == 7
+    assert params.fetch_limit == 6
+
+def test_keyset_pages_cover_every_row_once(db):
+    db.add_all(Tag(name=f"tag-{i}") for i in range(23))
+    db.commit()
+    expected = [tag.id for tag in db.query(Tag).order_by(Tag.id)]
+
+    seen = []
+    cursor = None
+    while True:
+        params = PageParams(limit=5, cursor=cursor)
+        rows = keyset_page(db.query(Tag), Tag.id, params.after_id, params.fetch_limit).all()
+        page = params.paginate(rows, lambda tag: tag.id)
+        seen.extend(page.items)
+        assert len(page.items) <= 5
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+def test_last_full_page_has_no_cursor(db):
+    db.add_all(Tag(name=f"tag-{i}") for i in range(5))
+    db.commit()
+
+    params = PageParams(limit=5, cursor=None)
+    rows = keyset_page(db.query(Tag), Tag.id, params.after_id, params.fetch_limit).all()
+    page = params.paginate(rows)
+    assert len(page.items) == 5
+    assert page.next_cursor is None
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from app.config import settings
+from app.services.password_hasher import PasswordHasher
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    # One hash running and one waiting; a third is turned away
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_SIZE", 1)
+    hasher = PasswordHasher()
+    yield hasher
+    hasher.shutdown()
+
+
+class SlowHash:
+    """Stands in for bcrypt: blocks until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, password: str) -> str:
+        self.started.set()
+        assert self.release.wait(timeout=5)
+        return f"hashed:{password}"
+
+
+def test_full_pool_returns_503(hasher):
+    slow_hash = SlowHash()
+    hasher.hash = slow_hash
+
+    async def overflow():
+        admitted = [asyncio.create_task(hasher.hash_async(str(n))) for n in range(2)]
+        await asyncio.to_thread(slow_hash.started.wait, 5)
+        try:
+            with pytest.raises(HTTPException) as exc:
+                await hasher.hash_async("one too many")
+        finally:
+            slow_hash.release.set()
+        results = await asyncio.gather(*admitted)
+        # The slots are free again
+        results.append(await hasher.hash_async("later"))
+        return exc.value, results
+
+    error, results = asyncio.run(overflow())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert results == ["hashed:0", "hashed:1", "hashed:later"]
+
+    stats = hasher.get_stats()["hash"]
+    assert stats["succeeded"] == 3
+    assert stats["rejected"] == 1
+    assert stats["queue_seconds"] > 0
+
+def test_failed_hash_frees_its_slot(hasher):
+    def broken_hash(password: str) -> str:
+        raise ValueError("boom")
+
+    hasher.hash = broken_hash
+
+    async def fail_three_times():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await hasher.hash_async("password")
+
+    asyncio.run(fail_three_times())
+    stats = hasher.get_stats()["hash"]
+    assert stats["failed"] == 3
+    assert stats["rejected"] == 0
+
+def test_pool_disabled_runs_inline(hasher):
+    hasher.workers = 0
+    hasher.hash = lambda password: f"hashed:{password}"
+
+    async def hash_many():
+        return await asyncio.gather(*(hasher.hash_async(str(n)) for n in range(5)))
+
+    assert asyncio.run(hash_many()) == [f"hashed:{n}" for n in range(5)]
+    assert hasher.get_stats()["hash"]["rejected"] == 0
@@ -0,0 +1,135 @@
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from app.services.stream_service import MAX_RANGES, StreamService
+
+FILE_SIZE = 1000
+CONTENT = bytes(range(256)) * 3 + bytes(FILE_SIZE - 768)
+
+
+@pytest.fixture
+def client(tmp_path):
+    file_path = tmp_path / "book.pdf"
+    file_path.write_bytes(CONTENT)
+
+    app = FastAPI()
+
+    @app.get("/file")
+    def serve(request: Request):
+        return StreamService.file_response(request, file_path, media_type="application/pdf")
+
+    return TestClient(app)
+
+
+# parse_range_header
+
+def test_single_range():
+    assert StreamService.parse_range_header("bytes=0-99", FILE_SIZE) == [(0, 99)]
+
+def test_open_ended_range():
+    assert StreamService.parse_range_header("bytes=900-", FILE_SIZE) == [(900, 999)]
+
+def test_suffix_range():
+    assert StreamService.parse_range_header("bytes=-100", FILE_SIZE) == [(900, 999)]
+
+def test_suffix_longer_than_file():
+    assert StreamService.parse_range_header("bytes=-5000", FILE_SIZE) == [(0, 999)]
+
+def test_end_clamped_to_file():
+    assert StreamService.parse_range_header("bytes=500-5000", FILE_SIZE) == [(500, 999)]
+
+def test_overlapping_and_adjacent_ranges_merged():
+    ranges = StreamService.parse_range_header("bytes=200-299, 0-99, 50-149, 150-160", FILE_SIZE)
+    assert ranges == [(0, 160), (200, 299)]
+
+def test_unsatisfiable_range():
+    with pytest.raises(HTTPException) as exc:
+        StreamService.parse_range_header("bytes=1000-1100", FILE_SIZE)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == f"bytes */{FILE_SIZE}"
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",
+    "bytes=",
+    "bytes=abc-def",
+    "bytes=10",
+    "bytes=50-10",
+])
+def test_missing_or_malformed_range_ignored(header):
+    assert StreamService.parse_range_header(header, FILE_SIZE) is None
+
+def test_too_many_ranges_ignored():
+    spec = ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1))
+    assert StreamService.parse_range_header(f"bytes={spec}", FILE_SIZE) is None
+
+def test_max_ranges_allowed():
+    spec = ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES))
+    assert len(StreamService.parse_range_header(f"bytes={spec}", FILE_SIZE)) == MAX_RANGES
+
+
+# file_response
+
+def test_full_response(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(FILE_SIZE)
+
+def test_range_response(client):
+    response = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{FILE_SIZE}"
+
+def test_unsatisfiable_range_response(client):
+    response = client.get("/file", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+
+
+# Validators
+
+def test_full_response_has_validators(client):
+    response = client.get("/file")
+    assert response.headers["etag"]
+    assert response.headers["last-modified"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+def test_if_none_match_returns_304(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+def test_if_none_match_weak_and_list(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+
+def test_if_none_match_mismatch_returns_200(client):
+    response = client.get("/file", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+def test_if_modified_since_returns_304(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    response = client.get("/file", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+def test_if_range_matching_etag_returns_206(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+def test_if_range_stale_etag_returns_full_file(client):
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_if_range_matching_date_returns_206(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": last_modified})
+    assert response.status_code == 206
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.repositories import BookRepo
+from app.schemas import BookCreate, TagCreate
+from app.services.tag_index import TagIndex, iter_ids, tag_index
+
+test_url = "sqlite:///./tag_index_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def index():
+    index = TagIndex()
+    index.set_book(1, ["Fantasy", "dragons"])
+    index.set_book(2, ["fantasy"])
+    index.set_book(3, ["history"])
+    index.set_book(4, [])
+    return index
+
+
+def _ids(bitmap: int) -> list[int]:
+    return list(iter_ids(bitmap))
+
+def _book(uid: str, *tags: str) -> BookCreate:
+    return BookCreate(
+        title=uid, uid=uid, file_type="application/pdf", extension="pdf",
+        file_path=f"{uid}.pdf", tags=[TagCreate(name=tag) for tag in tags],
+    )
+
+
+def test_iter_ids_after_id():
+    bitmap = (1 << 2) | (1 << 5) | (1 << 64)
+    assert list(iter_ids(bitmap)) == [2, 5, 64]
+    assert list(iter_ids(bitmap, after_id=2)) == [5, 64]
+    assert list(iter_ids(bitmap, after_id=64)) == []
+
+def test_filter_modes(index):
+    assert _ids(index.filter(None)) == [1, 2, 3, 4]
+    assert _ids(index.filter(["FANTASY", "history"], "any")) == [1, 2, 3]
+    assert _ids(index.filter(["fantasy", "dragons"], "all")) == [1]
+    assert _ids(index.filter(None, exclude_tags=["fantasy"])) == [3, 4]
+    assert _ids(index.filter(["unknown"])) == []
+
+def test_facets(index):
+    assert index.facets() == {"fantasy": 2, "dragons": 1, "history": 1}
+    assert index.facets(index.filter(["dragons"])) == {"fantasy": 1, "dragons": 1}
+
+def test_set_book_replaces_old_tags(index):
+    index.set_book(1, ["history"])
+
+    assert _ids(index.filter(["fantasy"])) == [2]
+    # The last book with the tag is gone, so the tag is too
+    assert "dragons" not in index.facets()
+    assert _ids(index.filter(["history"])) == [1, 3]
+
+def test_set_book_without_tags(index):
+    index.set_book(2, [])
+
+    assert _ids(index.filter(["fantasy"])) == [1]
+    assert 2 in _ids(index.filter(None))
+
+def test_remove_book(index):
+    index.remove_book(1)
+
+    assert _ids(index.filter(None)) == [2, 3, 4]
+    assert index.facets() == {"fantasy": 1, "history": 1}
+    # Removing an unknown book is a no-op
+    index.remove_book(99)
+    assert _ids(index.filter(None)) == [2, 3, 4]
+
+def test_page_ids(index):
+    matches = index.filter(None)
+    assert index.page_ids(matches, None, 2) == [1, 2]
+    assert index.page_ids(matches, 2, 2) == [3, 4]
+    assert index.page_ids(matches, 4, 2) == []
+
+def test_book_repo_keeps_index_in_sync(db):
+    repo = BookRepo(db)
+    first = repo.create_book(_book("first", "Fantasy", "dragons"))
+    second = repo.create_book(_book("second", "fantasy"))
+    tag_index.build(db)
+    assert _ids(tag_index.filter(["fantasy"])) == [first.id, second.id]
+
+    repo.update_book("first", _book("first", "history"))
+    assert _ids(tag_index.filter(["fantasy"])) == [second.id]
+    assert _ids(tag_index.filter(["history"])) == [first.id]
+    assert "dragons" not in tag_index.facets()
+
+    repo.delete_book("second")
+    assert _ids(tag_index.filter(None)) == [first.id]
+    assert tag_index.facets() == {"history": 1}
+
+def test_build_matches_incremental_updates(db):
+    tag_index.build(db)
+    repo = BookRepo(db)
+    repo.create_book(_book("first", "Fantasy", "dragons"))
+    repo.create_book(_book("second", "fantasy"))
+    repo.update_book("first", _book("first", "history"))
+    repo.delete_book("second")
+    incremental = tag_index.facets()
+
+    tag_index.build(db)
+    assert tag_index.facets() == incremental
@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app import migrations
+from app.database import Base
+from app.models import Audio, Book, Tag, Video
+from app.repositories import BookRepo, TagRepo
+from app.repositories.tag_repo import AsyncTagRepo
+
+test_url = "sqlite:///./tag_repo_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def tagged(db):
+    """One tag per kind of item using it, plus one nothing uses."""
+    book_tag, audio_tag, video_tag, unused = TagRepo(db).get_or_create_tags(["book", "audio", "video", "unused"])
+    db.add_all([
+        _book("first", [book_tag]),
+        Audio(title="Song", file_path="song.mp3", tags=[audio_tag]),
+        Video(title="Clip", file_path="clip.mp4", tags=[video_tag]),
+    ])
+    db.commit()
+    return book_tag, audio_tag, video_tag, unused
+
+
+def _book(uid: str, tags: list[Tag]) -> Book:
+    return Book(title=uid, uid=uid, file_type="application/pdf", extension="pdf", file_path=f"{uid}.pdf", tags=tags)
+
+
+def test_get_or_create_tags_matches_case_insensitively(db):
+    repo = TagRepo(db)
+    existing = repo.get_or_create_tags(["Fantasy"])[0]
+    db.commit()
+
+    tags = repo.get_or_create_tags(["  FANTASY ", "Science  Fiction", "fantasy", ""])
+    db.commit()
+    assert [t.name for t in tags] == ["fantasy", "science fiction"]
+    assert tags[0].id == existing.id
+    assert db.query(Tag).count() == 2
+
+def test_get_or_create_tags_created_meanwhile(db, monkeypatch):
+    repo = TagRepo(db)
+    find = TagRepo._find
+    calls = []
+
+    def find_then_race(self, names):
+        found = find(self, names)
+        if not calls:
+            # Another request creates the tag after our SELECT, before our INSERT
+            other = test_local()
+            try:
+                other.add(Tag(name="dragons"))
+                other.commit()
+            finally:
+                other.close()
+        calls.append(names)
+        return found
+
+    monkeypatch.setattr(TagRepo, "_find", find_then_race)
+    tags = repo.get_or_create_tags(["dragons", "wyverns"])
+    db.commit()
+
+    assert [t.name for t in tags] == ["dragons", "wyverns"]
+    assert all(t.id is not None for t in tags)
+    # The tag lost to the ON CONFLICT is looked up again
+    assert calls == [["dragons", "wyverns"], ["dragons"]]
+    assert db.query(Tag).count() == 2
+
+
+def test_migration_merges_tags_differing_in_case(db, monkeypatch):
+    # A database from before tag names were unique regardless of case
+    db.execute(text("DROP INDEX ix_tags_name_lower"))
+    db.execute(text("INSERT INTO tags (id, name) VALUES (1, 'fantasy'), (2, 'Fantasy'), (3, 'FANTASY'), (4, 'history')"))
+    db.add_all([_book("first", []), _book("second", []), Video(id=1, title="Clip", file_path="clip.mp4")])
+    db.flush()
+    first, second = db.query(Book).order_by(Book.id)
+    db.execute(text(
+        "INSERT INTO book_tags (book_id, tag_id) VALUES "
+        f"({first.id}, 1), ({first.id}, 2), ({second.id}, 3), ({second.id}, 4)"
+    ))
+    db.execute(text("INSERT INTO video_tags (video_id, tag_id) VALUES (1, 2)"))
+    db.commit()
+
+    monkeypatch.setattr(migrations, "engine", engine)
+    migrations.upgrade_schema()
+
+    db.expire_all()
+    assert [(t.id, t.name) for t in db.query(Tag).order_by(Tag.id)] == [(1, "fantasy"), (4, "history")]
+    # The first book had both spellings and keeps a single link
+    assert [t.id for t in db.get(Book, first.id).tags] == [1]
+    assert sorted(t.id for t in db.get(Book, second.id).tags) == [1, 4]
+    assert [t.id for t in db.get(Video, 1).tags] == [1]
+    # The unique index is back, so the duplicates cannot return
+    with pytest.raises(IntegrityError):
+        db.execute(text("INSERT INTO tags (name) VALUES ('Fantasy')"))
+    db.rollback()
+
+
+def _tag_names(db) -> list[str]:
+    return sorted(name for (name,) in db.query(Tag.name))
+
+def test_delete_orphans_keeps_tags_in_use(db, tagged):
+    assert TagRepo(db).delete_orphans([tag.id for tag in tagged]) == 1
+    db.commit()
+    assert _tag_names(db) == ["audio", "book", "video"]
+
+def test_delete_orphans_only_checks_given_tags(db, tagged):
+    repo = TagRepo(db)
+    assert repo.delete_orphans([]) == 0
+    assert repo.delete_orphans([tagged[0].id]) == 0
+    assert repo.delete_orphans(None) == 1
+    db.commit()
+    assert _tag_names(db) == ["audio", "book", "video"]
+
+def test_deleting_book_keeps_tag_shared_with_video(db, tagged):
+    video = db.query(Video).one()
+    video.tags.append(tagged[0])
+    db.commit()
+
+    BookRepo(db).delete_book("first")
+    assert _tag_names(db) == ["audio", "book", "unused", "video"]
+
+    db.delete(video)
+    db.commit()
+    assert TagRepo(db).delete_orphans([tagged[0].id, tagged[2].id]) == 2
+    db.commit()
+    assert _tag_names(db) == ["audio", "unused"]
+
+def test_async_delete_orphans_keeps_tags_in_use(db, tagged):
+    tag_ids = [tag.id for tag in tagged]
+
+    async def delete_orphans() -> int:
+        async_engine = create_async_engine("sqlite+aiosqlite:///./tag_repo_test.db")
+        try:
+            async with async_sessionmaker(async_engine, class_=AsyncSession)() as session:
+                deleted = await AsyncTagRepo(session).delete_orphans(tag_ids)
+                await session.commit()
+                return deleted
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(delete_orphans()) == 1
+    assert _tag_names(db) == ["audio", "book", "video"]
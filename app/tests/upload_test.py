@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.video import Video
+from app.schemas.upload_schema import UploadSessionCreate
+from app.services import video_service
+from app.services.upload_service import UploadService
+
+test_url = "sqlite:///./upload_test.db"
+
+engine = create_engine(test_url, connect_args={"check_same_thread": False})
+
+test_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+CONTENT = b"\x00\x00\x00\x18ftypmp42 resumable video bytes"
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = test_local()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def service(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(video_service, "VIDS_DIR", tmp_path / "vids")
+    upload_service = UploadService(db)
+    upload_service.session_dir = tmp_path / "sessions"
+    return upload_service
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _create_video_upload(service: UploadService) -> str:
+    return service.create_session(UploadSessionCreate(
+        kind="video", filename="clip.mp4", size=len(CONTENT), title="Clip", tags="nature, Clips"
+    )).id
+
+
+def test_chunks_resume_at_offset(service):
+    upload_id = _create_video_upload(service)
+
+    upload = asyncio.run(service.append_chunk(upload_id, 0, _chunks(CONTENT[:10])))
+    assert upload.offset == 10
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(service.append_chunk(upload_id, 0, _chunks(CONTENT[10:])))
+    assert exc.value.status_code == 409
+    assert exc.value.headers["Upload-Offset"] == "10"
+
+    upload = asyncio.run(service.append_chunk(upload_id, 10, _chunks(CONTENT[10:])))
+    assert upload.offset == len(CONTENT)
+
+def test_finalize_incomplete_upload(service):
+    upload_id = _create_video_upload(service)
+    asyncio.run(service.append_chunk(upload_id, 0, _chunks(CONTENT[:5])))
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(service.finalize(upload_id))
+    assert exc.value.status_code == 409
+
+def test_finalize_stores_video(db, service):
+    upload_id = _create_video_upload(service)
+    asyncio.run(service.append_chunk(upload_id, 0, _chunks(CONTENT)))
+
+    video = asyncio.run(service.finalize(upload_id))
+    assert video.title == "Clip"
+    assert sorted(t.name for t in video.tags) == ["clips", "nature"]
+    assert not service.part_path(upload_id).exists()
+
+    with pytest.raises(HTTPException) as exc:
+        service.get_session(upload_id)
+    assert exc.value.status_code == 404
+
+def test_concurrent_finalize_stores_once(db, service):
+    upload_id = _create_video_upload(service)
+    asyncio.run(service.append_chunk(upload_id, 0, _chunks(CONTENT)))
+
+    async def finalize_twice():
+        return await asyncio.gather(
+            service.finalize(upload_id), service.finalize(upload_id), return_exceptions=True
+        )
+
+    results = asyncio.run(finalize_twice())
+    errors = [r for r in results if isinstance(r, HTTPException)]
+    assert len(errors) == 1
+    assert errors[0].status_code == 409
+    assert db.query(Video).count() == 1